@@ -0,0 +1,70 @@
+"""Report the memory of idle and active AICare sessions.
+
+An idle session is set up with its methods, a sensor and a detector. An active
+session has also chatted, so its routine ask is pending, and has a message
+waiting to be said and a cyclic detection armed. The bytes are the Python
+allocations traced by `tracemalloc`, the threads are the ones alive meanwhile,
+each of which also reserves a stack outside of these bytes.
+
+    python benchmarks/memory.py [n_sessions]
+"""
+from __future__ import annotations
+import gc
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ai_care import AICare, Detector  # noqa: E402
+
+
+class IdleDetector(Detector):
+
+    def detect(self) -> bool:
+        return False
+
+
+def create_session() -> AICare:
+    ai_care = AICare()
+    ai_care.register_to_llm_method(lambda chat_context, to_llm_messages: "AA000101:")
+    ai_care.register_to_user_method(lambda message: None)
+    ai_care.register_sensor("time", lambda: 0, "The current time.")
+    ai_care.register_detector(IdleDetector(name="idle", annotation="Never triggers."))
+    return ai_care
+
+
+def activate(ai_care: AICare) -> None:
+    ai_care.chat_update(chat_context=[{"role": "user", "content": "Hello"}])
+    ai_care.ability.speak_after(delay=3600, message="Are you still there?")
+    ai_care.set_cyclic_detection(["idle"], iter([3600.0]))
+
+
+def measure(n_sessions: int, active: bool) -> tuple[float, float]:
+    gc.collect()
+    threads_before = threading.active_count()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    sessions = [create_session() for _ in range(n_sessions)]
+    if active:
+        for ai_care in sessions:
+            activate(ai_care)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    threads = threading.active_count() - threads_before
+    for ai_care in sessions:
+        ai_care.reset()
+    return (after - before) / n_sessions, threads / n_sessions
+
+
+def main() -> None:
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for label, active in (("idle", False), ("active", True)):
+        bytes_per_session, threads_per_session = measure(n_sessions, active)
+        print(f"{label:>6}: {bytes_per_session:9.0f} bytes/session, {threads_per_session:.2f} threads/session")
+
+
+if __name__ == "__main__":
+    main()
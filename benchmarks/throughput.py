@@ -0,0 +1,86 @@
+"""Report the throughput of AICare under concurrent chat updates and timers.
+
+Several threads share one session: they either call `chat_update`, or set and
+clear timers. The operations per second are reported along with whether the GIL
+is enabled. Save a run with `--save` and compare a later run to it with
+`--baseline`, e.g. a baseline from a worktree of an earlier commit:
+
+    git worktree add /tmp/ai-care-baseline <commit>
+    python /tmp/ai-care-baseline/benchmarks/throughput.py --save baseline.json
+    python benchmarks/throughput.py --baseline baseline.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ai_care import AICare  # noqa: E402
+
+
+def run_concurrently(target: Callable[[], None], n_threads: int, n_operations: int) -> float:
+    barrier = threading.Barrier(n_threads)
+    def worker():
+        barrier.wait()
+        for _ in range(n_operations):
+            target()
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start_time
+
+
+def chat_update(n_threads: int, n_operations: int) -> float:
+    ai_care = AICare()
+    ai_care.set_config(key="delay", value=3600)
+    ai_care.register_to_llm_method(lambda chat_context, to_llm_messages: "AA000101:")
+    elapsed = run_concurrently(lambda: ai_care.chat_update(chat_context=[]), n_threads, n_operations)
+    ai_care.clear_timer(clear_preserved=True)
+    return n_threads * n_operations / elapsed
+
+
+def timers(n_threads: int, n_operations: int) -> float:
+    ai_care = AICare()
+    def set_and_clear():
+        ai_care.set_timer(interval=3600, function=lambda: None)
+        ai_care.set_timer(interval=3600, function=lambda: None, preserve=True)
+        ai_care.cancel_current_task()
+        ai_care.clear_timer(clear_preserved=False)
+    elapsed = run_concurrently(set_and_clear, n_threads, n_operations)
+    ai_care.clear_timer(clear_preserved=True)
+    return n_threads * n_operations / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=200, help="Operations per thread.")
+    parser.add_argument("--save", type=Path, help="Save the results to this JSON file.")
+    parser.add_argument("--baseline", type=Path, help="Compare to the results saved in this JSON file.")
+    args = parser.parse_args()
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    results = {
+        "chat_update": chat_update(args.threads, args.operations),
+        "set_timer/clear_timer": timers(args.threads, args.operations),
+    }
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    print(f"GIL enabled: {gil_enabled}, {args.threads} threads")
+    for name, ops_per_second in results.items():
+        line = f"{name:>22}: {ops_per_second:9.0f} ops/s"
+        if name in baseline:
+            line += f" (baseline {baseline[name]:.0f} ops/s, x{ops_per_second / baseline[name]:.2f})"
+        print(line)
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
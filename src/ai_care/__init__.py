@@ -1,4 +1,22 @@
 from .ai_care import AICare, Detector, AICareContext
+from .batching import BatchLLMDispatcher
+from .coalesce import ChunkCoalescer
+from .decision_cache import DecisionCache
+from .decision_log import DecisionLogger
+from .delay_policy import DelayPolicy, PercentileDelayPolicy
+from .hibernation import SessionStore, FileSessionStore, SQLiteSessionStore
+from .process_pool import ProcessDetector, ProcessExecutor
+from .profiling import Profiler
+from .rate_limit import RateLimited, RateLimiter, RollingBudget, TokenBucket
+from .scheduling import AskPriority, DeadlineExpired, LLMScheduler
+from .sensor_history import SensorHistory
+from .sensor_payload import SensorSerializer
+from .sessions import AICareSessions
+from .tick_grid import TickGrid
+from .tool_calling import ToolCall
+from .vectorized import BatchDetector, BatchDetectorRunner
+from .tracing import Tracer, InMemorySpanExporter, JsonlFileSpanExporter
+from .pre_decision import PreDecider, ThresholdPreDecider, LogisticPreDecider
 from ._version import __title__, __version__
 
 
@@ -7,5 +25,37 @@ __all__ = [
     "__version__",
     "AICare",
     "Detector",
+    "BatchDetector",
+    "BatchDetectorRunner",
     "AICareContext",
+    "AICareSessions",
+    "SensorHistory",
+    "SensorSerializer",
+    "SessionStore",
+    "FileSessionStore",
+    "SQLiteSessionStore",
+    "BatchLLMDispatcher",
+    "ChunkCoalescer",
+    "DecisionCache",
+    "DecisionLogger",
+    "DelayPolicy",
+    "PercentileDelayPolicy",
+    "PreDecider",
+    "ThresholdPreDecider",
+    "LogisticPreDecider",
+    "ProcessDetector",
+    "ProcessExecutor",
+    "Profiler",
+    "RateLimited",
+    "RateLimiter",
+    "RollingBudget",
+    "TokenBucket",
+    "AskPriority",
+    "DeadlineExpired",
+    "LLMScheduler",
+    "TickGrid",
+    "ToolCall",
+    "Tracer",
+    "InMemorySpanExporter",
+    "JsonlFileSpanExporter",
 ]
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import functools
 import inspect
 import logging
 from enum import Enum, unique
@@ -6,7 +7,7 @@ from typing import TYPE_CHECKING, Generator
 
 
 if TYPE_CHECKING:
-    from .ai_care import AICare
+    from .ai_care import AICare, AICareContext
 
 
 logger = logging.getLogger("ai_care")
@@ -69,6 +70,15 @@ def _ability_parameter(
 
     return decorator
 
+@functools.lru_cache(maxsize=256)
+def _unknown_names_content(kind: str, names: frozenset[str]) -> str:
+    # Shared by the asks that send the same names.
+    return f"There are no {str(set(names))} {kind}. Please use the correct {kind} name."
+
+def _unknown_names_message(kind: str, names: frozenset[str]) -> AICareContext:
+    # A new message for each ask, only the content is shared.
+    return {"role": "ai_care", "content": _unknown_names_content(kind, names)}
+
 def _auto_depth(depth_param_name: str = "_depth_left"):
     def decorator(func):
         func._auto_depth_ = True
@@ -148,14 +158,24 @@ class Ability:
     def detect_env(self, delay: float | int, sensors: list[str], _depth_left: int) -> None:
         def detect_env_callback(sensors_list: list[str]):
             sensor_data = {}
+            sensor_trends = {}
             for sensor in sensors_list:
                 data = self.ai_care.get_sensor_data(sensor)
                 sensor_data[sensor] = data
+                trend = self.ai_care.sensor_trend(sensor)
+                if trend is not None and trend["count"] > 1:
+                    sensor_trends[sensor] = trend
+            content = f"The results of the sensor are as follows: {self.ai_care.render_sensor_readings(sensor_data)}."
+            if sensor_trends:
+                content += (
+                    " The recent trends of the sensors are as follows: "
+                    f"{self.ai_care.render_sensor_readings(sensor_trends, summarize=False)}."
+                )
             self.ai_care.ask(
                 messages_list=[
                     {
                         "role": "ai_care",
-                        "content": f"The results of the sensor are as follows: {str(sensor_data)}.",
+                        "content": content,
                     },
                 ],
                 depth_left = _depth_left - 1,
@@ -163,12 +183,7 @@ class Ability:
         not_existed_sensors_set = set(sensors) - set(self.ai_care.sensors)
         if not_existed_sensors_set:
             self.ai_care.ask(
-                messages_list=[
-                    {
-                        "role": "ai_care",
-                        "content": f"There are no {str(not_existed_sensors_set)} sensor. Please use the correct sensor name.",
-                    }
-                ],
+                messages_list=[_unknown_names_message("sensor", frozenset(not_existed_sensors_set))],
                 depth_left = _depth_left - 1,
             )
             return
@@ -201,12 +216,7 @@ class Ability:
         not_existed_detectors_set = set(detectors) - set(self.ai_care.detectors)
         if not_existed_detectors_set:
             self.ai_care.ask(
-                messages_list=[
-                    {
-                        "role": "ai_care",
-                        "content": f"There are no {str(not_existed_detectors_set)} detector. Please use the correct detector name.",
-                    }
-                ],
+                messages_list=[_unknown_names_message("detector", frozenset(not_existed_detectors_set))],
                 depth_left = _depth_left - 1,
             )
             return
@@ -224,9 +234,8 @@ class Ability:
     )
     @_auto_depth(depth_param_name="_depth_left")
     def ask_later(self, delay: int | float, _depth_left: int) -> None:
-        if self.ai_care._ask_later_count_left <= 0:
+        if not self.ai_care._consume_ask_later_count():
             return
-        self.ai_care._ask_later_count_left -= 1
         self.ai_care.set_timer(
             interval=delay,
             function=self.ai_care.ask,
@@ -266,12 +275,7 @@ class Ability:
         not_existed_detectors_set = set(detectors) - set(self.ai_care.detectors)
         if not_existed_detectors_set:
             self.ai_care.ask(
-                messages_list=[
-                    {
-                        "role": "ai_care",
-                        "content": f"There are no {str(not_existed_detectors_set)} detector. Please use the correct detector name.",
-                    }
-                ],
+                messages_list=[_unknown_names_message("detector", frozenset(not_existed_detectors_set))],
                 depth_left = _depth_left - 1,
             )
             return
@@ -1,26 +1,63 @@
 from __future__ import annotations
+import contextlib
+import hashlib
 import itertools
+import json
 import logging
 import time
 import threading
 from abc import ABCMeta, abstractmethod
-from typing import Callable, Any, Generator, TypedDict, Literal, cast
+from typing import TYPE_CHECKING, Callable, Any, Generator, Iterable, Iterator, TypedDict, Literal, cast
 
-from .abilities import Ability
+from .abilities import Ability, Choice
+from .batching import BatchLLMDispatcher, BatchToLLMMethod
 from .choice_execute import choice_execute
+from .coalesce import ChunkCoalescer
+from .decision_cache import DecisionCache
+from .decision_log import DecisionLogger
+from .delay_policy import DelayPolicy
+from .latency import LatencyStats
 from .parse_response import parse_response
-from .render_prompt import render_basic_prompt
+from .pre_decision import PreDecider, collect_features
+from .rate_limit import RateLimited, RateLimiter
+from .render_prompt import prompt_cache_key, render_dynamic_facts, render_prompt_prefix
+from .scheduling import AskPriority, DeadlineExpired, LLMScheduler
+from .sensor_history import SensorHistory
+from .sensor_payload import SensorSerializer, Summarizer
+from .tick_grid import TickGrid
+from .timer_queue import QueuedTimer, TimerQueue
+from .timer_registry import TimerRegistry
+from .tool_calling import ToolCall, ToolCallingLLMMethod, parse_tool_call, render_ability_tools
+from .profiling import Profiler
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    from .process_pool import ProcessExecutor
 
 
 logger = logging.getLogger("ai_care")
 ChatContext = Any
-ConfigKey = Literal["delay", "ask_later_count_limit", "ask_depth", "n_chat_intervals"]
+_NULL_PHASE = contextlib.nullcontext()
+ConfigKey = Literal["delay", "ask_later_count_limit", "ask_depth", "n_chat_intervals", "speculative"]
+# The timers of all the sessions wait here, rather than each on a thread of its own.
+_TIMER_QUEUE = TimerQueue()
 
 
 class AICare:
+    # `__dict__` is kept for subclasses and for replacing methods on an instance.
+    __slots__ = (
+        "timers", "detectors", "sensors", "ability", "chat_context", "_to_llm_method", "_to_user_method",
+        "guide", "_unique_id", "_last_chat_time", "_chat_intervals", "_tags", "_config",
+        "_ask_later_count_left", "_valid_msg_count", "_invalid_msg_count", "_stream_mode", "_ask_context",
+        "_task_num", "_cancel_task_lock", "_state_lock", "_ask_context_lock", "_latency_stats",
+        "_decision_cache", "_chat_context_fingerprint", "_pre_decider", "_choice_history", "_ask_timer",
+        "_tracer", "_profiler", "_decision_logger", "_chunk_coalescer", "_log_session_id", "_llm_scheduler",
+        "_tenant_priority", "_delay_policy", "_pending_delay", "_rate_limiter", "_process_executor",
+        "_sensor_serializer", "_tool_calling", "_tick_grid", "_asks_in_flight", "__dict__",
+    )
 
     def __init__(self) -> None:
-        self.timers: dict[int, AICareTimer] = {}
+        self.timers: TimerRegistry = TimerRegistry()
         self.detectors: dict[str, Detector] = {}
         self.sensors: dict[str, dict] = {}
         self.ability: Ability = Ability(self)
@@ -38,7 +75,13 @@ class AICare:
         self._last_chat_time: float | None = None
         self._chat_intervals: list[float] = []
         self._tags: dict[str, list[Detector]] = {}
-        self._config: dict[str, Any] = {"delay": 100, "ask_later_count_limit": 1, "ask_depth": 1, "n_chat_intervals": 20}
+        self._config: dict[str, Any] = {
+            "delay": 100,
+            "ask_later_count_limit": 1,
+            "ask_depth": 1,
+            "n_chat_intervals": 20,
+            "speculative": False,
+        }
         self._ask_later_count_left = self._config["ask_later_count_limit"]
         self._valid_msg_count: int = 0
         self._invalid_msg_count: int = 0
@@ -46,23 +89,110 @@ class AICare:
         self._ask_context: list[AICareContext] = []
         self._task_num: int = 1
         self._cancel_task_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._ask_context_lock = threading.Lock()
+        self._latency_stats = LatencyStats()
+        self._decision_cache: DecisionCache | None = None
+        self._chat_context_fingerprint: Callable[[ChatContext], str | None] | None = None
+        self._pre_decider: PreDecider | None = None
+        self._choice_history: ChoiceHistory = ChoiceHistory(maxlen=20)
+        self._ask_timer = AICareReschedulableTimer(function=self._fire_scheduled_ask)
+        self._tracer: Tracer | None = None
+        self._profiler: Profiler | None = None
+        self._decision_logger: DecisionLogger | None = None
+        self._chunk_coalescer: ChunkCoalescer | None = None
+        self._log_session_id: str | None = None
+        self._llm_scheduler: LLMScheduler | None = None
+        self._tenant_priority: int = 0
+        self._delay_policy: DelayPolicy | None = None
+        self._pending_delay: float | None = None
+        self._rate_limiter: RateLimiter | None = None
+        self._process_executor: ProcessExecutor | None = None
+        self._sensor_serializer: SensorSerializer | None = SensorSerializer()
+        self._tool_calling: bool = False
+        self._tick_grid: TickGrid | None = None
+        self._asks_in_flight: int = 0
     
     @property
     def health(self) -> float:
         return self._valid_msg_count / (self._valid_msg_count + self._invalid_msg_count)
 
-    def cancel_current_task(self):
+    @property
+    def latency_stats(self) -> dict[str, float | int]:
+        """Decision latency of the LLM and how often speculative asks were wasted."""
+        return self._latency_stats.as_dict()
+
+    def cancel_current_task(self) -> int:
+        """Invalidate the current task and return the new task number."""
         with self._cancel_task_lock:
             self._task_num += 1
+            return self._task_num
 
     def reset(self) -> None:
-        self._valid_msg_count = 0
-        self._invalid_msg_count = 0
-        self._last_chat_time = None
-        self._chat_intervals = []
+        with self._state_lock:
+            self._valid_msg_count = 0
+            self._invalid_msg_count = 0
+            self._last_chat_time = None
+            self._chat_intervals = []
+            self._pending_delay = None
         self.cancel_current_task()
         self.clear_timer(clear_preserved=True)
 
+    @property
+    def idle(self) -> bool:
+        """Whether no timer is pending, including the routine ask after a chat, and no ask is running."""
+        return not self.timers and not self._ask_timer.armed and self._asks_in_flight == 0
+
+    def _begin_ask(self) -> None:
+        with self._state_lock:
+            self._asks_in_flight += 1
+
+    def _end_ask(self) -> None:
+        with self._state_lock:
+            self._asks_in_flight -= 1
+
+    def export_state(self) -> dict[str, Any]:
+        """Return the conversation state of this instance, which can be pickled.
+
+        The registered methods, sensors, detectors and config are not part of the state,
+        they are set up again before `restore_state` is called.
+        """
+        with self._state_lock:
+            return {
+                "chat_context": self.chat_context,
+                "chat_intervals": list(self._chat_intervals),
+                "seconds_since_last_chat": (
+                    None if self._last_chat_time is None else time.monotonic() - self._last_chat_time
+                ),
+                "exported_at": time.time(),
+                "ask_later_count_left": self._ask_later_count_left,
+                "valid_msg_count": self._valid_msg_count,
+                "invalid_msg_count": self._invalid_msg_count,
+                "choice_history": [choice.value for choice in self._choice_history],
+                "choice_sources": self._choice_history.sources,
+                "pending_delay": self._pending_delay,
+            }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """Restore the conversation state returned by `export_state`."""
+        with self._state_lock:
+            self.chat_context = state["chat_context"]
+            self._chat_intervals = list(state["chat_intervals"])
+            if state["seconds_since_last_chat"] is None:
+                self._last_chat_time = None
+            else:
+                elapsed = state["seconds_since_last_chat"] + max(0.0, time.time() - state["exported_at"])
+                self._last_chat_time = time.monotonic() - elapsed
+            self._ask_later_count_left = state["ask_later_count_left"]
+            self._valid_msg_count = state["valid_msg_count"]
+            self._invalid_msg_count = state["invalid_msg_count"]
+            self._choice_history.clear()
+            self._choice_history.extend(
+                (Choice(value) for value in state["choice_history"]),
+                state.get("choice_sources"),
+            )
+            self._pending_delay = state["pending_delay"]
+
     def set_guide(self, guide: str) -> None:
         """Set guidance information.
 
@@ -90,6 +220,78 @@ class AICare:
     ) -> None:
         """Register the method used by AICare to send message to llm."""
         self._to_llm_method = to_llm_method
+        self._tool_calling = False
+
+    def register_tool_calling_llm_method(self, tool_calling_llm_method: ToolCallingLLMMethod) -> None:
+        """Register a method that sends messages to the LLM along with the abilities as tools.
+
+        It receives the chat context, the messages and the function-calling definitions
+        of `render_ability_tools`, and returns the `ToolCall` made by the LLM. The tool
+        call is dispatched to the ability as is, and the prompt no longer explains the
+        text protocol. A text response is still parsed with that protocol.
+        """
+        def to_llm_method(chat_context: ChatContext, messages_list: list[AICareContext]) -> ToolCall | str | Generator[str, None, None]:
+            return tool_calling_llm_method(chat_context, messages_list, render_ability_tools(self))
+        self._to_llm_method = to_llm_method
+        self._tool_calling = True
+
+    def register_batch_to_llm_method(
+        self,
+        batch_to_llm_method: BatchToLLMMethod | BatchLLMDispatcher,
+        max_batch_size: int = 16,
+        max_wait: float = 0.05,
+    ) -> BatchLLMDispatcher:
+        """Register a method that sends a batch of requests to the LLM in one call.
+
+        The method receives a list of (chat_context, messages) pairs and returns the
+        responses in the same order. Pass the same `BatchLLMDispatcher` to several
+        AICare instances to batch the requests of all of them together.
+        """
+        if isinstance(batch_to_llm_method, BatchLLMDispatcher):
+            dispatcher = batch_to_llm_method
+        else:
+            dispatcher = BatchLLMDispatcher(batch_to_llm_method, max_batch_size=max_batch_size, max_wait=max_wait)
+        self._to_llm_method = dispatcher.submit
+        self._tool_calling = False
+        return dispatcher
+
+    def register_llm_scheduler(self, llm_scheduler: LLMScheduler | None, tenant_priority: int = 0) -> None:
+        """Queue the requests to the LLM by priority and deadline, None disables it.
+
+        `tenant_priority` is added to the priority of every ask of this instance,
+        so that the sessions of some tenants go first when sharing a scheduler.
+        """
+        self._llm_scheduler = llm_scheduler
+        self._tenant_priority = tenant_priority
+
+    def register_delay_policy(self, delay_policy: DelayPolicy | None) -> None:
+        """Compute the delay before the routine ask from the chat intervals, None uses the `delay` config."""
+        with self._state_lock:
+            self._delay_policy = delay_policy
+            self._pending_delay = None
+
+    def register_rate_limiter(self, rate_limiter: RateLimiter | None) -> None:
+        """Limit the calls to the LLM and the size of prompts and completions, None disables it."""
+        self._rate_limiter = rate_limiter
+
+    def register_process_executor(self, process_executor: ProcessExecutor | None) -> None:
+        """Run the `ProcessDetector`s and the sensors registered with `in_process` in a process pool.
+
+        None runs them in this process again.
+        """
+        self._process_executor = process_executor
+
+    def register_tick_grid(self, tick_grid: TickGrid | None) -> None:
+        """Fire the cyclic detections on a tick grid, which can be shared by sessions, None disables it."""
+        self._tick_grid = tick_grid
+
+    def register_sensor_serializer(self, sensor_serializer: SensorSerializer | None) -> None:
+        """Set how sensor readings are serialized into the prompt, None uses their plain `str`."""
+        self._sensor_serializer = sensor_serializer
+
+    @property
+    def sensor_serializer(self) -> SensorSerializer | None:
+        return self._sensor_serializer
 
     def register_to_user_method(
         self,
@@ -98,24 +300,121 @@ class AICare:
         """Register the method used by AICare to send message to user."""
         self._to_user_method = to_user_method
 
-    def to_llm_method(self, chat_context: ChatContext, messages_list: list[AICareContext]) -> str | Generator[str, None, None]:
+    def register_decision_cache(
+        self,
+        decision_cache: DecisionCache | None,
+        chat_context_fingerprint: Callable[[ChatContext], str | None] | None = None,
+    ) -> None:
+        """Register a cache of decisions in front of `to_llm_method`, None disables it.
+
+        `chat_context_fingerprint` maps a chat context to a string that identifies it
+        for caching purposes. Returning None means the decision for that chat context
+        must not be cached. Without a fingerprint function, no chat context is cached.
+        """
+        self._decision_cache = decision_cache
+        self._chat_context_fingerprint = chat_context_fingerprint
+
+    def register_pre_decider(self, pre_decider: PreDecider | None) -> None:
+        """Register a local decision stage in front of `to_llm_method`, None disables it."""
+        self._pre_decider = pre_decider
+
+    def register_tracer(self, tracer: Tracer | None) -> None:
+        """Register a tracer which records each decision cycle as spans, None disables tracing."""
+        self._tracer = tracer
+
+    def register_decision_logger(self, decision_logger: DecisionLogger | None, session_id: str | None = None) -> None:
+        """Register a structured log of decision events, None disables it.
+
+        `session_id` is recorded in every event, so that a logger can be shared by several AICare instances.
+        """
+        self._decision_logger = decision_logger
+        self._log_session_id = session_id
+
+    def _log_event(self, event: str, **fields: Any) -> None:
+        if self._decision_logger is None:
+            return
+        self._decision_logger.emit(
+            {"event": event, "session": self._log_session_id, "task_num": self._get_task_num(), **fields}
+        )
+
+    def enable_profiling(self, profiler: Profiler | None = None) -> Profiler:
+        """Aggregate the timings of the hot paths, abilities, sensors and detectors.
+
+        A profiler can be shared by several AICare instances, a new one is created by default.
+        """
+        self._profiler = profiler or Profiler()
+        return self._profiler
+
+    def disable_profiling(self) -> None:
+        self._profiler = None
+
+    @property
+    def profile(self) -> dict[str, dict[str, float | int]]:
+        """The aggregated timings per phase, empty when profiling is off."""
+        return {} if self._profiler is None else self._profiler.snapshot()
+
+    def _record_timing(self, profile_key: str, duration: float) -> None:
+        if self._profiler is not None:
+            self._profiler.record(profile_key, duration)
+
+    def _phase(self, name: str, profile_key: str | None = None, **attributes: Any) -> contextlib.AbstractContextManager:
+        """Trace and profile a phase of the decision cycle, a shared no-op context when both are off."""
+        if self._tracer is None and self._profiler is None:
+            return _NULL_PHASE
+        return self._instrumented_phase(name, profile_key or name, attributes)
+
+    @contextlib.contextmanager
+    def _instrumented_phase(self, name: str, profile_key: str, attributes: dict[str, Any]) -> Generator[None, None, None]:
+        tracer = self._tracer
+        profiler = self._profiler
+        start_time = time.perf_counter()
+        try:
+            if tracer is not None:
+                with tracer.span(name, task_num=self._get_task_num(), **attributes):
+                    yield
+            else:
+                yield
+        finally:
+            if profiler is not None:
+                profiler.record(profile_key, time.perf_counter() - start_time)
+
+    def register_chunk_coalescer(self, chunk_coalescer: ChunkCoalescer | None) -> None:
+        """Register a stage that merges small streamed chunks before `to_user_method`, None disables it."""
+        self._chunk_coalescer = chunk_coalescer
+
+    def to_llm_method(self, chat_context: ChatContext, messages_list: list[AICareContext]) -> ToolCall | str | Generator[str, None, None]:
         return self._to_llm_method(chat_context, messages_list)
 
     def to_user_method(self, message: str | Generator[str, None, None]) -> None:
+        task_num = self._get_task_num()
         with self._cancel_task_lock:
-            if self._check_task_validity():
-                if isinstance(message, str):
-                    self._to_user_method = cast(Callable[[str], None], self._to_user_method)
-                    self._to_user_method(message)
-                elif isinstance(message, Generator):
-                    self._to_user_method = cast(Callable[[Generator[str, None, None]], None], self._to_user_method)
-                    self._to_user_method(message)
-                else:
-                    assert False
+            if not self._check_task_validity():
+                return
+        # The lock is not held while delivering, a stream is checked for cancellation chunk by chunk instead.
+        if isinstance(message, str):
+            self._to_user_method = cast(Callable[[str], None], self._to_user_method)
+            self._to_user_method(message)
+        elif isinstance(message, Generator):
+            self._to_user_method = cast(Callable[[Generator[str, None, None]], None], self._to_user_method)
+            if self._chunk_coalescer is not None:
+                message = self._chunk_coalescer(message)
+            self._to_user_method(self._cancellable_stream(message, task_num))
+        else:
+            assert False
+
+    def _cancellable_stream(self, stream: Generator[str, None, None], task_num: int) -> Generator[str, None, None]:
+        """Yield the chunks of the stream until the task it belongs to is cancelled."""
+        try:
+            for chunk in stream:
+                if task_num < self._task_num:
+                    return
+                yield chunk
+        finally:
+            stream.close()
 
     def _check_task_validity(self) -> bool:
         thread_instance = threading.current_thread()
-        if isinstance(thread_instance, AICareTimer) or isinstance(thread_instance, AICareThread):
+        if isinstance(thread_instance, AICareThread):
             _task_num = thread_instance._task_num
         else:
             _task_num = self._task_num
@@ -125,37 +424,157 @@ class AICare:
             return True
 
     def chat_update(self, chat_context: ChatContext) -> None:
-        self._task_num += 1
-        time_now = time.monotonic()
-        if self._last_chat_time is not None:
-            self._insert_chat_interval(time_now - self._last_chat_time)
-        self._last_chat_time = time_now
-        self.chat_context = chat_context
-        self._ask_later_count_left = self._config["ask_later_count_limit"]
-        self.clear_timer(clear_preserved=False)
-        self._ask_context = []
-        self.set_timer(
-            interval=self._config["delay"],
-            function=self.ask,
-            kwargs={
-                "messages_list": [
+        if self._profiler is not None:
+            with self._profiler.measure("chat_update"):
+                self._chat_update([(chat_context, time.monotonic())])
+        else:
+            self._chat_update([(chat_context, time.monotonic())])
+
+    def chat_update_many(self, events: Iterable[tuple[ChatContext, float | None]]) -> None:
+        """Apply a batch of chat updates at once.
+
+        Each event is a (chat_context, timestamp) pair, where the timestamp is a
+        `time.time()` value or None for now. The chat intervals of all the events
+        are recorded, but only the final state is kept and scheduled, as if
+        `chat_update` had been called for the last event only. Events older than
+        the last chat already recorded are ignored, and a batch of such events
+        changes nothing.
+        """
+        time_offset = time.monotonic() - time.time()
+        monotonic_now = time.monotonic()
+        chat_events = [
+            (chat_context, monotonic_now if timestamp is None else min(timestamp + time_offset, monotonic_now))
+            for chat_context, timestamp in sorted(
+                events, key=lambda event: float("inf") if event[1] is None else event[1]
+            )
+        ]
+        if not chat_events:
+            return
+        if self._profiler is not None:
+            with self._profiler.measure("chat_update"):
+                self._chat_update(chat_events)
+        else:
+            self._chat_update(chat_events)
+
+    def _chat_update(self, chat_events: list[tuple[ChatContext, float]]) -> None:
+        """Record chats at the given `time.monotonic()` times, in order, and schedule the ask after the last one."""
+        delay = self._config["delay"]
+        with self._state_lock:
+            if self._last_chat_time is not None:
+                # Stale events, older than a chat already recorded.
+                last_chat_time = self._last_chat_time
+                chat_events = [event for event in chat_events if event[1] >= last_chat_time]
+                if not chat_events:
+                    return
+            # Taken under the lock, so that the chat context written below is the one of the newest task.
+            task_num = self.cancel_current_task()
+            with self._ask_context_lock:
+                self._ask_context = []
+            delay_policy = self._delay_policy
+            for _, chat_time in chat_events:
+                if self._last_chat_time is not None:
+                    interval = chat_time - self._last_chat_time
+                    self._insert_chat_interval(interval)
+                    if delay_policy is not None and self._pending_delay is not None:
+                        delay_policy.record(interval, self._pending_delay, delay)
+                self._last_chat_time = chat_time
+                if delay_policy is not None:
+                    self._pending_delay = delay_policy.next_delay(self._chat_intervals, delay)
+            self.chat_context, last_chat_time = chat_events[-1]
+            self._ask_later_count_left = self._config["ask_later_count_limit"]
+            if self._pending_delay is not None and delay_policy is not None:
+                delay = self._pending_delay
+        self.clear_timer(task_num_authority=task_num, clear_preserved=False)
+        ask_kwargs: dict[str, Any] = {"_routine": True, "_scheduled_at": last_chat_time}
+        if self._config["speculative"]:
+            # Start asking ahead of time so that the decision is ready at the deadline.
+            ask_kwargs["_hold_until"] = last_chat_time + delay
+            delay = max(0.0, delay - self._latency_stats.predicted_latency)
+        delay = max(0.0, delay - (time.monotonic() - last_chat_time))
+        self._ask_timer.reschedule(interval=delay, task_num=task_num, kwargs=ask_kwargs)
+
+    def _fire_scheduled_ask(self, task_num: int, kwargs: dict[str, Any]) -> None:
+        # Counted from now, so that the session is not idle between the timer and the ask.
+        self._begin_ask()
+        ask_thread = AICareThread(target=self._scheduled_ask, kwargs=kwargs, daemon=True)
+        ask_thread._task_num = task_num
+        ask_thread._priority = AskPriority.ROUTINE
+        try:
+            ask_thread.start()
+        except BaseException:
+            self._end_ask()
+            raise
+
+    def _scheduled_ask(self, _scheduled_at: float, **kwargs) -> None:
+        try:
+            self._run_scheduled_ask(_scheduled_at, **kwargs)
+        finally:
+            self._end_ask()
+
+    def _run_scheduled_ask(self, _scheduled_at: float, **kwargs) -> None:
+        with self._phase("decision_cycle"):
+            if self._tracer is not None:
+                self._tracer.record_span("timer_delay", task_num=self._get_task_num(), start_time=_scheduled_at)
+            # The prompt is rendered when the timer fires rather than on every chat update.
+            # The static prefix is a message of its own, so that backends can cache it.
+            with self._phase("render_basic_prompt"):
+                prompt_prefix = render_prompt_prefix(self)
+                facts = render_dynamic_facts(self)
+            self.ask(
+                messages_list=[
                     {
                         "role": "ai_care",
-                        "content": render_basic_prompt(self),
-                    }
+                        "content": prompt_prefix,
+                        "cache_key": prompt_cache_key(prompt_prefix),
+                    },
+                    {
+                        "role": "ai_care",
+                        "content": facts,
+                    },
                 ],
-            },
-            task_num=self._task_num,
-        )
+                **kwargs,
+            )
 
     def _insert_chat_interval(self, interval: float) -> None:
-        if len(self._chat_intervals) >= self._config["n_chat_intervals"]:
-            self._chat_intervals.pop(0)
-        self._chat_intervals.append(interval)
+        # Copy on write, so that readers always see a consistent list without locking.
+        n_chat_intervals = self._config["n_chat_intervals"]
+        start = max(0, len(self._chat_intervals) - n_chat_intervals + 1)
+        self._chat_intervals = [*self._chat_intervals[start:], interval]
+
+    def _record_msg_validity(self, valid: bool) -> None:
+        with self._state_lock:
+            if valid:
+                self._valid_msg_count += 1
+            else:
+                self._invalid_msg_count += 1
+
+    def _consume_ask_later_count(self) -> bool:
+        """Use up one ask later, return False if there is none left."""
+        with self._state_lock:
+            if self._ask_later_count_left <= 0:
+                return False
+            self._ask_later_count_left -= 1
+            return True
+
+    def _extend_ask_context(self, messages_list: list[AICareContext]) -> bool:
+        """Add the messages to the ask context, unless the task is no longer valid.
+
+        The task is checked under the lock, so that an ask from an older task cannot
+        add its messages to the fresh context of a newer one. Return the validity.
+        """
+        with self._ask_context_lock:
+            if not self._check_task_validity():
+                return False
+            self._ask_context.extend(messages_list)
+            return True
+
+    def _ask_context_snapshot(self) -> list[AICareContext]:
+        with self._ask_context_lock:
+            return list(self._ask_context)
 
     def set_config(self, key: ConfigKey, value: Any) -> None:
         # Valid check.
-        if key not in {"delay", "ask_later_count_limit", "ask_depth", "n_chat_intervals"}:
+        if key not in {"delay", "ask_later_count_limit", "ask_depth", "n_chat_intervals", "speculative"}:
             raise TypeError(f"AICare does not accept {key} as a config.")
         self._config[key] = value
 
@@ -177,8 +596,8 @@ class AICare:
         timer._task_num = task_num or self._get_task_num()
         timer._preserve_ = preserve
         timer.daemon = daemon
+        self.timers.add(id, timer)
         timer.start()
-        self.timers[id] = timer
         return id
 
     def _get_task_num(self) -> int:
@@ -192,7 +611,6 @@ class AICare:
         clear_preserved: bool = True,
         default_task_num_authority_external: Literal["Highest", "Lowest"] = "Highest",
     ) -> None:
-        keys = list(self.timers.keys())
         if task_num_authority is None:
             thread_instance = threading.current_thread()
             task_num_authority = getattr(
@@ -201,11 +619,10 @@ class AICare:
                 self._task_num if default_task_num_authority_external == "Highest" else 0,
             )
         
-        for key in keys:
-            timer = self.timers[key]
-            if timer._task_num <= task_num_authority and timer._preserve_ <= clear_preserved:
-                self.timers.pop(key)
-                timer.cancel()
+        for timer in self.timers.pop_up_to(task_num_authority, include_preserved=clear_preserved):
+            timer.cancel()
+        if self._ask_timer._task_num <= task_num_authority:
+            self._ask_timer.cancel()
 
     def timer_cancel(self, id: int) -> None:
         timer = self.timers.pop(id, None)
@@ -213,36 +630,239 @@ class AICare:
             timer.cancel()
 
     def _timer_wrap(self, function: Callable, id: int, *args, **kwargs) -> None:
+        timer = self.timers.get(id)
+        if self._tracer is not None and timer is not None:
+            self._tracer.record_span(
+                "timer_delay",
+                task_num=self._get_task_num(),
+                start_time=timer._scheduled_at,
+                function=getattr(function, "__name__", repr(function)),
+            )
         function(*args, **kwargs)
-        try:
-            del self.timers[id]
-        except KeyError:
-            pass
+        self.timers.pop(id)
 
     def ask(
         self,
         messages_list: list[AICareContext],
         chat_context: ChatContext | None = None,
-        depth_left: int | None = None
+        depth_left: int | None = None,
+        priority: int | None = None,
+        deadline: float | None = None,
+        _hold_until: float | None = None,
+        _routine: bool = False,
     ) -> None:
+        """Ask the LLM to make a choice.
+
+        `priority` and `deadline` (in seconds from now) are used by the registered
+        `LLMScheduler`. By default the priority comes from where the ask originates,
+        see `AskPriority`, and the deadline from the scheduler.
+        If `_hold_until` is given, this is a speculative ask: the decision is made
+        ahead of time but only executed once the `time.monotonic()` deadline has been
+        reached and the task is still valid.
+        `_routine` marks the routine check scheduled by `chat_update`.
+        """
         if depth_left is None:
             depth_left = self._config["ask_depth"]
         assert depth_left is not None
         if depth_left < 0:
             return
+        if priority is None:
+            priority = self._origin_priority(_routine)
+        self._begin_ask()
+        try:
+            with self._phase("ask", depth_left=depth_left):
+                self._ask(messages_list, chat_context, depth_left, _hold_until, _routine, priority, deadline)
+        finally:
+            self._end_ask()
+
+    def _origin_priority(self, routine: bool) -> int:
+        if routine:
+            return AskPriority.ROUTINE
+        # Asks made on an AICare thread inherit its priority, other callers are external events.
+        return getattr(threading.current_thread(), "_priority", AskPriority.DETECTOR)
+
+    def _ask(
+        self,
+        messages_list: list[AICareContext],
+        chat_context: ChatContext | None,
+        depth_left: int,
+        hold_until: float | None,
+        routine: bool,
+        priority: int = AskPriority.DETECTOR,
+        deadline: float | None = None,
+    ) -> None:
         self.clear_timer(clear_preserved=False)
         if chat_context is None:
             chat_context = self.chat_context
-        self._ask_context.extend(messages_list)
-        if not self._check_task_validity():
-            return
-        response = self.to_llm_method(chat_context, self._ask_context)
+        if not self._extend_ask_context(messages_list):
+            return self._cancel_ask("before_decision", hold_until)
+        start_time = time.monotonic()
+        try:
+            decision = self._decide(chat_context, routine=routine, priority=priority, deadline=deadline)
+        except DeadlineExpired:
+            return self._cancel_ask("deadline_expired", hold_until)
+        except RateLimited:
+            return self._cancel_ask("rate_limited", hold_until)
+        if decision is None:
+            return self._cancel_ask("after_llm", hold_until)
+        choice_code, content, source = decision
+        if self._decision_logger is not None:
+            self._log_decision(choice_code, content, source, depth_left, time.monotonic() - start_time)
+        if hold_until is not None:
+            with self._phase("speculative_hold"):
+                hold_time = hold_until - time.monotonic()
+                if hold_time > 0:
+                    time.sleep(hold_time)
+            if not self._check_task_validity():
+                return self._cancel_ask("speculative_hold", hold_until)
+            self._latency_stats.record_speculation(wasted=False)
         if not self._check_task_validity():
-            return
-        choice_code, content = parse_response(self, response)
+            return self._cancel_ask("before_execute", None)
+        with self._phase("choice_execute", choice_code=choice_code):
+            choice_execute(ai_care=self, choice_code=choice_code, content=content, depth_left=depth_left, source=source)
+
+    def _decide(
+        self,
+        chat_context: ChatContext,
+        routine: bool = False,
+        priority: int = AskPriority.DETECTOR,
+        deadline: float | None = None,
+    ) -> tuple[str, str | dict[str, Any] | Generator[str, None, None], str] | None:
+        """Get the choice for the current ask context and where it came from.
+
+        Return None if the task became invalid.
+        Raise `DeadlineExpired` if the request was dropped by the scheduler
+        and `RateLimited` if it was dropped by the rate limiter.
+        """
+        if self._pre_decider is not None:
+            with self._phase("pre_decision"):
+                if self._choice_history.trailing("pre_decision") >= self._pre_decider.max_local_streak:
+                    # Let the LLM decide again, so that local decisions cannot go on by themselves.
+                    local_choice = None
+                else:
+                    features = collect_features(self, sensors=self._pre_decider.sensors, routine=routine)
+                    local_choice = self._pre_decider.decide(features)
+                self._pre_decider.record(decided_locally=local_choice is not None)
+            if local_choice is not None:
+                return local_choice.value, "", "pre_decision"
+        ask_context = self._ask_context_snapshot()
+        cache_key = None
+        if self._decision_cache is not None and self._chat_context_fingerprint is not None:
+            fingerprint = self._chat_context_fingerprint(chat_context)
+            if fingerprint is not None:
+                cache_key = self._decision_cache.make_key(ask_context, fingerprint)
+                cached_decision = self._decision_cache.get(cache_key)
+                if cached_decision is not None:
+                    return *cached_decision, "cache"
+        rate_limiter = self._rate_limiter
+        if rate_limiter is not None:
+            with self._phase("rate_limit"):
+                prompt_size = sum(rate_limiter.count(message["content"]) for message in ask_context)
+                allowed = rate_limiter.acquire(prompt_size, still_valid=self._check_task_validity)
+            if not allowed:
+                if not self._check_task_validity():
+                    return None
+                if rate_limiter.on_limit == "local":
+                    return rate_limiter.local_choice.value, "", "rate_limited"
+                raise RateLimited(f"The request of task {self._get_task_num()} hit a rate limit.")
+        start_time = time.monotonic()
+        if self._llm_scheduler is None:
+            response = self._traced_to_llm_method(chat_context, ask_context)
+        else:
+            scheduler = self._llm_scheduler
+            if deadline is None:
+                deadline = scheduler.deadline_for(priority)
+            response = scheduler.run(
+                lambda: self._traced_to_llm_method(chat_context, ask_context),
+                priority=priority + self._tenant_priority,
+                deadline=start_time + deadline,
+            )
+        if rate_limiter is not None:
+            response = rate_limiter.count_completion(response)
         if not self._check_task_validity():
-            return
-        choice_execute(ai_care=self, choice_code=choice_code, content=content, depth_left=depth_left)
+            if isinstance(response, Generator):
+                response.close()
+            return None
+        with self._phase("parse_response"):
+            if isinstance(response, dict):
+                choice_code, content = parse_tool_call(self, response)
+            else:
+                choice_code, content = parse_response(self, response)
+        self._latency_stats.record_llm_call(time.monotonic() - start_time)
+        if cache_key is not None:
+            assert self._decision_cache is not None
+            self._decision_cache.put(cache_key, choice_code, content)
+        return choice_code, content, "llm"
+
+    def _log_decision(
+        self,
+        choice_code: str,
+        content: str | dict[str, Any] | Generator[str, None, None],
+        source: str,
+        depth_left: int,
+        latency: float,
+    ) -> None:
+        ask_context = self._ask_context_snapshot()
+        prompt_hash = hashlib.blake2b(
+            json.dumps(ask_context, ensure_ascii=False).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        try:
+            choice_name: str | None = Choice(choice_code).name
+        except ValueError:
+            choice_name = None
+        self._log_event(
+            "decision",
+            prompt_hash=prompt_hash,
+            source=source,
+            choice=choice_name,
+            choice_code=choice_code,
+            valid=choice_name is not None and choice_name != Choice.ERROR.name,
+            params=content if isinstance(content, (str, dict)) and choice_name != Choice.SPEAK_NOW.name else None,
+            depth_left=depth_left,
+            retry=depth_left < self._config["ask_depth"],
+            latency=latency,
+        )
+
+    def _cancel_ask(self, stage: str, hold_until: float | None) -> None:
+        self._discard_speculation(hold_until)
+        self._log_event("cancelled", stage=stage)
+
+    def _traced_to_llm_method(
+        self,
+        chat_context: ChatContext,
+        ask_context: list[AICareContext],
+    ) -> str | Generator[str, None, None]:
+        if self._tracer is None:
+            return self.to_llm_method(chat_context, ask_context)
+        tracer = self._tracer
+        span = tracer.start_span("to_llm_method", task_num=self._get_task_num())
+        try:
+            response = self.to_llm_method(chat_context, ask_context)
+        except BaseException as e:
+            span.attributes["error"] = repr(e)
+            tracer.end_span(span)
+            raise
+        if not isinstance(response, Generator):
+            tracer.end_span(span)
+            return response
+        def first_chunk_traced(response: Generator[str, None, None]) -> Generator[str, None, None]:
+            # For a stream, the span lasts until the first chunk arrives.
+            ended = False
+            try:
+                for chunk in response:
+                    if not ended:
+                        span.add_event("first_chunk")
+                        tracer.end_span(span)
+                        ended = True
+                    yield chunk
+            finally:
+                if not ended:
+                    tracer.end_span(span)
+        return first_chunk_traced(response)
+
+    def _discard_speculation(self, hold_until: float | None) -> None:
+        if hold_until is not None:
+            self._latency_stats.record_speculation(wasted=True)
 
     def set_cyclic_detection(
         self,
@@ -254,7 +874,7 @@ class AICare:
             for detector in detectors:
                 self.release_detector(detector)
             try:
-                self.set_timer(
+                self._set_cyclic_timer(
                     interval=next(interval_gen),
                     function=callback,
                     preserve=not cancel_after_trigger_ask,
@@ -262,7 +882,7 @@ class AICare:
             except StopIteration:
                 pass
         try:
-            self.set_timer(
+            self._set_cyclic_timer(
                 interval=next(interval_gen),
                 function=callback,
                 preserve=not cancel_after_trigger_ask,
@@ -270,6 +890,18 @@ class AICare:
         except StopIteration:
             pass
 
+    def _set_cyclic_timer(self, interval: float | int, function: Callable[[], None], preserve: bool) -> int:
+        tick_grid = self._tick_grid
+        if tick_grid is None:
+            return self.set_timer(interval=interval, function=function, preserve=preserve)
+        id = next(self._unique_id)
+        def fire() -> None:
+            function()
+            self.timers.pop(id)
+        # Registered like the other timers, so that clearing the timers cancels it.
+        self.timers.add(id, tick_grid.schedule(interval, fire, task_num=self._get_task_num(), preserve=preserve))
+        return id
+
     def trigger(
         self,
         messages_list: list[AICareContext] | None = None,
@@ -284,14 +916,12 @@ class AICare:
                 self.release_detector(detector.name)
 
     def register_detector(self, detector: Detector) -> None:
-        if detector.name in self.detectors:
-            raise ValueError("A detector with the same name already exists.")
-        detector.ai_care = self
-        self.detectors[detector.name] = detector
-        tag = detector.tag
-        if tag not in self._tags:
-            self._tags[tag] = []
-        self._tags[tag].append(detector)
+        with self._state_lock:
+            if detector.name in self.detectors:
+                raise ValueError("A detector with the same name already exists.")
+            detector.ai_care = self
+            self.detectors[detector.name] = detector
+            self._tags.setdefault(detector.tag, []).append(detector)
 
     def release_detector(self, name: str | list[str]) -> None:
         if isinstance(name, list):
@@ -302,24 +932,99 @@ class AICare:
             if name not in self.detectors:
                 raise ValueError(f"There is no detector named {name}.")
             detector = self.detectors[name]
-            ai_care_thread = AICareThread(target=detector.release)
+            ai_care_thread = AICareThread(target=self._release_detector, args=(detector,))
             ai_care_thread._task_num = self._get_task_num()
             ai_care_thread.start()
 
-    def register_sensor(self, name: str, function: Callable[[], Any], annotation: str) -> None:
-        if name in self.sensors:
-            raise ValueError(f"The sensor named {name} has already been registered.")
-        self.sensors[name] = {"name": name, "function": function, "annotation": annotation}
+    def _release_detector(self, detector: Detector) -> None:
+        with self._phase("detector", profile_key=f"detector.{detector.name}", detector=detector.name):
+            detector.release()
+
+    def register_sensor(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        annotation: str,
+        in_process: bool = False,
+        history: int | None = None,
+        history_window: float | None = None,
+        max_bytes: int | None = None,
+        summarizer: Summarizer | None = None,
+    ) -> None:
+        """Register a sensor.
+
+        With `in_process`, the sensor runs in the registered process pool, `function`
+        and its result must then be picklable.
+        With `history`, the last `history` numeric readings are kept, and their trend over
+        the last `history_window` seconds (all of them by default) is reported with the readings.
+        `max_bytes` overrides the byte budget of the readings in the prompt and `summarizer`
+        turns a reading into what is put into the prompt, see `SensorSerializer`.
+        """
+        with self._state_lock:
+            if name in self.sensors:
+                raise ValueError(f"The sensor named {name} has already been registered.")
+            self.sensors[name] = {"name": name, "function": function, "annotation": annotation}
+            if in_process:
+                self.sensors[name]["in_process"] = True
+            if history is not None:
+                self.sensors[name]["history"] = SensorHistory(history)
+                self.sensors[name]["history_window"] = history_window
+            if max_bytes is not None:
+                self.sensors[name]["max_bytes"] = max_bytes
+            if summarizer is not None:
+                self.sensors[name]["summarizer"] = summarizer
 
     def get_sensor_data(self, name: str) -> Any:
         if name not in self.sensors:
             raise ValueError("No sensor named {name}.")
-        sensor_function = self.sensors[name]["function"]
-        data = sensor_function()
+        sensor = self.sensors[name]
+        sensor_function = sensor["function"]
+        process_executor = self._process_executor
+        with self._phase("get_sensor_data", profile_key=f"sensor.{name}", sensor=name):
+            if process_executor is not None and sensor.get("in_process"):
+                data = process_executor.run(sensor_function)
+            else:
+                data = sensor_function()
+        history = sensor.get("history")
+        if history is not None and isinstance(data, (int, float)) and not isinstance(data, bool):
+            history.append(data)
         return data
 
+    def render_sensor_readings(self, readings: dict[str, Any], summarize: bool = True) -> str:
+        """Serialize readings by sensor name for the prompt with the budgets and summarizers of the sensors."""
+        sensor_serializer = self._sensor_serializer
+        if sensor_serializer is None:
+            return str(readings)
+        sensors = [self.sensors.get(name, {}) for name in readings]
+        budgets = {sensor["name"]: sensor["max_bytes"] for sensor in sensors if "max_bytes" in sensor}
+        summarizers = (
+            {sensor["name"]: sensor["summarizer"] for sensor in sensors if "summarizer" in sensor} if summarize else None
+        )
+        return sensor_serializer.serialize(readings, budgets, summarizers)
+
+    def record_sensor_reading(self, name: str, value: float, timestamp: float | None = None) -> None:
+        """Add a reading to the history of the sensor, `timestamp` is a `time.monotonic()` value."""
+        history = self.sensors[name].get("history")
+        if history is None:
+            raise ValueError(f"The sensor named {name} does not keep a history.")
+        history.append(value, timestamp)
+
+    def sensor_trend(self, name: str, window: float | None = None) -> dict[str, float | int] | None:
+        """The aggregates of the recent readings of the sensor, see `SensorHistory.aggregates`.
+
+        `window` defaults to the `history_window` of the sensor. Return None if the
+        sensor keeps no history or has no reading in the window.
+        """
+        sensor = self.sensors[name]
+        history = sensor.get("history")
+        if history is None:
+            return None
+        return history.aggregates(sensor.get("history_window") if window is None else window)
+
 
 class Detector(metaclass=ABCMeta):
+    __slots__ = ("name", "annotation", "tag", "ai_care")
+
     def __init__(self, name: str, annotation: str, tag: str = '') -> None:
         self.name = name
         self.annotation = annotation
@@ -335,20 +1040,168 @@ class Detector(metaclass=ABCMeta):
         self.detect()
 
 
-class AICareContext(TypedDict):
+class _AICareContextRequired(TypedDict):
     role: Literal["ai_care", "assistant"]
     content: str
 
 
-class AICareTimer(threading.Timer):
-    def __init__(self, *args, preserve: bool = False, daemon: bool = True, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._preserve_: bool = preserve
-        self._task_num: int = 0
+class AICareContext(_AICareContextRequired, total=False):
+    # A hash of the content, set on the static prompt prefix, which
+    # `to_llm_method` can use to mark a prompt cache breakpoint.
+    cache_key: str
+
+
+class AICareTimer(QueuedTimer):
+    """A timer that runs `function(*args, **kwargs)` on a new AICareThread when it is due.
+
+    Until then it is a record in the timer queue shared by all the sessions, not a thread.
+    """
+    __slots__ = ("interval", "args", "kwargs", "daemon", "_priority", "_scheduled_at")
+
+    def __init__(
+        self,
+        interval: float,
+        function: Callable,
+        args: tuple | None = None,
+        kwargs: dict | None = None,
+        *,
+        preserve: bool = False,
+        daemon: bool = True,
+    ) -> None:
+        super().__init__(function, preserve=preserve)
+        self.interval = interval
+        self.args = args or ()
+        self.kwargs = kwargs or {}
         self.daemon = daemon
+        self._priority: int = AskPriority.TIMER
+        self._scheduled_at: float = time.monotonic()
+
+    def start(self) -> None:
+        _TIMER_QUEUE.push(self, self.interval)
+
+    def fire(self) -> None:
+        thread = AICareThread(target=self.function, args=self.args, kwargs=self.kwargs, daemon=self.daemon)
+        thread._task_num = self._task_num
+        thread._priority = self._priority
+        thread.start()
 
 
 class AICareThread(threading.Thread):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._task_num: int = 0
+        self._priority: int = AskPriority.DETECTOR
+
+
+class AICareReschedulableTimer:
+    """A timer whose deadline can be moved without creating a new thread.
+
+    The deadline is a record in the timer queue shared by all the sessions. Moving
+    it cancels the pending record and queues a new one, so rescheduling costs the
+    same no matter how often it happens and no thread waits for the deadline.
+    When the deadline is reached, `function(task_num, kwargs)` is called in the thread of the queue.
+    """
+    __slots__ = ("_function", "_lock", "_timer", "_kwargs", "_task_num", "_preserve_")
+
+    def __init__(self, function: Callable[[int, dict[str, Any]], None]) -> None:
+        self._function = function
+        self._lock = threading.Lock()
+        self._timer: QueuedTimer | None = None
+        self._kwargs: dict[str, Any] = {}
+        self._task_num: int = 0
+        self._preserve_: bool = False
+
+    @property
+    def armed(self) -> bool:
+        return self._timer is not None
+
+    def reschedule(self, interval: float | int, task_num: int, kwargs: dict[str, Any] | None = None) -> None:
+        with self._lock:
+            if task_num < self._task_num:
+                # A newer task has already been scheduled by another thread.
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._task_num = task_num
+            self._kwargs = kwargs or {}
+            def fire() -> None:
+                self._fire(timer)
+            timer = self._timer = QueuedTimer(fire, task_num)
+            _TIMER_QUEUE.push(timer, interval)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _fire(self, timer: QueuedTimer) -> None:
+        with self._lock:
+            if self._timer is not timer:
+                # Moved or cancelled while it was being fired.
+                return
+            task_num = self._task_num
+            kwargs = self._kwargs
+        # Still armed while `function` runs, so that the owner never looks idle in between.
+        try:
+            self._function(task_num, kwargs)
+        finally:
+            with self._lock:
+                if self._timer is timer:
+                    self._timer = None
+
+
+class ChoiceHistory:
+    """The last `maxlen` choices, oldest first, in a plain list rather than a preallocated deque.
+
+    Each choice is kept with where it came from, the `source` of the decision
+    ("llm", "cache", "pre_decision", "rate_limited"). Indexing and iterating give the choices.
+    """
+    __slots__ = ("maxlen", "_entries")
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = maxlen
+        # (choice, source) pairs, so that a choice and its source are added in one step.
+        self._entries: list[tuple[Choice, str]] = []
+
+    def append(self, choice: Choice, source: str = "llm") -> None:
+        self._entries.append((choice, source))
+        while len(self._entries) > self.maxlen:
+            try:
+                del self._entries[0]
+            except IndexError:
+                break
+
+    def extend(self, choices: Iterable[Choice], sources: Iterable[str] | None = None) -> None:
+        choices = list(choices)
+        for choice, source in zip(choices, ["llm"] * len(choices) if sources is None else sources):
+            self.append(choice, source)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def sources(self) -> list[str]:
+        return [source for _, source in list(self._entries)]
+
+    def from_source(self, source: str) -> list[Choice]:
+        """Return the choices that came from `source`, oldest first."""
+        return [choice for choice, choice_source in list(self._entries) if choice_source == source]
+
+    def trailing(self, source: str) -> int:
+        """Return how many of the latest choices in a row came from `source`."""
+        count = 0
+        for _, choice_source in reversed(list(self._entries)):
+            if choice_source != source:
+                break
+            count += 1
+        return count
+
+    def __getitem__(self, index: int) -> Choice:
+        return self._entries[index][0]
+
+    def __iter__(self) -> Iterator[Choice]:
+        return (choice for choice, _ in list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
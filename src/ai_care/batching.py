@@ -0,0 +1,112 @@
+from __future__ import annotations
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Generator
+
+
+if TYPE_CHECKING:
+    from .ai_care import AICareContext, ChatContext
+
+
+BatchToLLMMethod = Callable[
+    [list[tuple["ChatContext", list["AICareContext"]]]],
+    list["str | Generator[str, None, None]"],
+]
+
+
+class _PendingRequest:
+    __slots__ = ("chat_context", "messages", "done", "result", "error")
+
+    def __init__(self, chat_context: ChatContext, messages: list[AICareContext]) -> None:
+        self.chat_context = chat_context
+        self.messages = messages
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class BatchLLMDispatcher:
+    """Group the LLM requests of many sessions into batched calls.
+
+    Requests submitted within `max_wait` seconds of the first pending one, up to
+    `max_batch_size` of them, are sent together in one call of `batch_to_llm_method`.
+    It receives a list of (chat_context, messages) pairs and must return the
+    responses in the same order. Each caller blocks until its own response is back.
+
+    Args:
+        batch_to_llm_method: The method that sends a batch of requests to the LLM.
+        max_batch_size: The maximum number of requests in a batch.
+        max_wait: The maximum number of seconds a request waits for a batch to fill up.
+    """
+
+    def __init__(self, batch_to_llm_method: BatchToLLMMethod, max_batch_size: int = 16, max_wait: float = 0.05) -> None:
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, but received {max_batch_size}.")
+        self.batch_to_llm_method = batch_to_llm_method
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: list[_PendingRequest] = []
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self.batches: int = 0
+        self.requests: int = 0
+
+    @property
+    def stats(self) -> dict[str, float | int]:
+        with self._condition:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            }
+
+    def submit(self, chat_context: ChatContext, messages: list[AICareContext]) -> str | Generator[str, None, None]:
+        """Send one request as part of a batch and wait for its response.
+
+        It has the signature of a `to_llm_method`.
+        """
+        request = _PendingRequest(chat_context, messages)
+        with self._condition:
+            self._pending.append(request)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    # Exit when idle, the next submit starts a new thread.
+                    self._thread = None
+                    return
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                self.batches += 1
+                self.requests += len(batch)
+            # The batch is sent on its own thread, so that the next batch can fill up meanwhile.
+            threading.Thread(target=self._send_batch, args=(batch,), daemon=True).start()
+
+    def _send_batch(self, batch: list[_PendingRequest]) -> None:
+        try:
+            results = self.batch_to_llm_method([(request.chat_context, request.messages) for request in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} responses from the batch method, but received {len(results)}.")
+        except BaseException as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        for request, result in zip(batch, results):
+            request.result = result
+            request.done.set()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 import json
 import logging
-from typing import TYPE_CHECKING, Generator
+import time
+from typing import TYPE_CHECKING, Any, Generator
 
 from .abilities import Choice
 
@@ -13,7 +14,26 @@ if TYPE_CHECKING:
     from .ai_care import AICare
 
 
-def choice_execute(ai_care: AICare, choice_code: str, content: str | Generator[str, None, None], depth_left: int) -> None:
+# The contents of the fixed messages are shared by all the asks that send them, each ask
+# gets its own message, which the `to_llm_method` of the user may modify.
+_PARSE_ERROR_CONTENT = (
+    "Failed to correctly parse the parameter. "
+    "Please send the correct parameters in JSON format, "
+    "or make a choice again."
+)
+_NOT_DICT_CONTENT = (
+    "The parameters should be a dictionary in JSON format."
+    "Please send the correct parameters in JSON format, or make a choice again."
+)
+
+
+def choice_execute(
+    ai_care: AICare,
+    choice_code: str,
+    content: str | dict[str, Any] | Generator[str, None, None],
+    depth_left: int,
+    source: str = "llm",
+) -> None:
     try:
         choice = Choice(choice_code)
     except ValueError as e:
@@ -36,14 +56,17 @@ def choice_execute(ai_care: AICare, choice_code: str, content: str | Generator[s
     if choice == Choice.ERROR:
         ai_care.ask(messages_list=[], depth_left = depth_left - 1)
         return
-    logger.info(f"Choice: {choice.name}")
-
-    if isinstance(content, str):
-        ai_care._ask_context.append(
-            {
-                "role": "assistant",
-                "content": f"AA00{choice_code}{choice_code}:{content}",
-            }
+    logger.info("Choice: %s", choice.name)
+    ai_care._choice_history.append(choice, source)
+
+    if isinstance(content, (str, dict)):
+        ai_care._extend_ask_context(
+            [
+                {
+                    "role": "assistant",
+                    "content": _render_choice_record(ai_care, choice, content),
+                }
+            ]
         )
     elif isinstance(content, Generator):
         # This case has been handled in parse_response.
@@ -51,47 +74,30 @@ def choice_execute(ai_care: AICare, choice_code: str, content: str | Generator[s
     else:
         assert False
 
-    ability_method = ai_care.ability.abilities[choice.name.lower()]
+    ability_name = choice.name.lower()
+    ability_method = ai_care.ability.abilities[ability_name]
     
     if choice == Choice.STAY_SILENT:
+        start_time = time.perf_counter()
         ability_method()
+        ai_care._record_timing(f"ability.{ability_name}", time.perf_counter() - start_time)
         return
     
     if choice == Choice.SPEAK_NOW:
         params = {"content": content}
+    elif isinstance(content, dict):
+        # A tool call, whose arguments are already parsed.
+        params = content
     else:
         assert isinstance(content, str)
         try:
             params = json.loads(content)
         except json.JSONDecodeError as e:
             logger.warning(f"Failed to correctly parse the parameter. Parameter json string: {content}. Error: {e}.")
-            ai_care.ask(
-                messages_list=[
-                    {
-                        "role": "ai_care",
-                        "content": (
-                            "Failed to correctly parse the parameter. "
-                            "Please send the correct parameters in JSON format, "
-                            "or make a choice again."
-                        ),
-                    },
-                ],
-                depth_left = depth_left - 1,
-            )
+            ai_care.ask(messages_list=[{"role": "ai_care", "content": _PARSE_ERROR_CONTENT}], depth_left = depth_left - 1)
             return
         if not isinstance(params, dict):
-            ai_care.ask(
-                messages_list=[
-                    {
-                        "role": "ai_care",
-                        "content": (
-                            "The parameters should be a dictionary in JSON format."
-                            "Please send the correct parameters in JSON format, or make a choice again."
-                        ),
-                    },
-                ],
-                depth_left = depth_left - 1,
-            )
+            ai_care.ask(messages_list=[{"role": "ai_care", "content": _NOT_DICT_CONTENT}], depth_left = depth_left - 1)
             return
 
     ability_params = {}
@@ -121,5 +127,17 @@ def choice_execute(ai_care: AICare, choice_code: str, content: str | Generator[s
         )
         return
 
-    logger.info(f"Choice parameters: {str(ability_params)}")
+    logger.info("Choice parameters: %s", ability_params)
+    start_time = time.perf_counter()
     ability_method(**ability_params)
+    ai_care._record_timing(f"ability.{ability_name}", time.perf_counter() - start_time)
+
+
+def _render_choice_record(ai_care: AICare, choice: Choice, content: str | dict[str, Any]) -> str:
+    """Render the choice as the LLM made it, a tool call or a text response."""
+    if ai_care._tool_calling is True:
+        arguments = {"content": content} if choice == Choice.SPEAK_NOW else content or {}
+        return json.dumps({"name": choice.name.lower(), "arguments": arguments}, ensure_ascii=False)
+    if isinstance(content, dict):
+        content = json.dumps(content, ensure_ascii=False)
+    return f"AA00{choice.value}{choice.value}:{content}"
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Generator
+
+
+_SENTENCE_ENDINGS = frozenset(".!?;\n。！？；…")
+_END_OF_STREAM = object()
+
+
+class ChunkCoalescer:
+    """Merge the small chunks of a stream into fewer, larger ones.
+
+    The buffered text is flushed when it reaches `max_chars` characters, when the
+    oldest buffered chunk has waited `max_delay` seconds, or at the end of a sentence
+    when `sentence_boundary` is True. The text itself is never changed, only how it
+    is split into chunks. A coalescer can be shared by several AICare instances.
+
+    Args:
+        max_chars: Flush when the buffer reaches this many characters, None to disable.
+        max_delay: Flush when the buffer is this many seconds old, None to disable.
+        sentence_boundary: Flush when the buffer ends a sentence.
+    """
+
+    def __init__(
+        self,
+        max_chars: int | None = 64,
+        max_delay: float | None = 0.03,
+        sentence_boundary: bool = True,
+    ) -> None:
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.sentence_boundary = sentence_boundary
+        self._lock = threading.Lock()
+        self.chunks_in: int = 0
+        self.chunks_out: int = 0
+
+    @property
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "chunks_in": self.chunks_in,
+                "chunks_out": self.chunks_out,
+                "coalescing_ratio": self.chunks_in / self.chunks_out if self.chunks_out else 0.0,
+            }
+
+    def _should_flush(self, buffer: list[str], size: int) -> bool:
+        if self.max_chars is not None and size >= self.max_chars:
+            return True
+        if self.sentence_boundary:
+            last_chunk = buffer[-1].rstrip(" ")
+            return bool(last_chunk) and last_chunk[-1] in _SENTENCE_ENDINGS
+        return False
+
+    def __call__(self, stream: Generator[str, None, None]) -> Generator[str, None, None]:
+        if self.max_delay is None:
+            return self._coalesce(stream)
+        return self._coalesce_with_deadline(stream)
+
+    def _coalesce(self, stream: Generator[str, None, None]) -> Generator[str, None, None]:
+        buffer: list[str] = []
+        size = 0
+        try:
+            for chunk in stream:
+                self._count_in()
+                buffer.append(chunk)
+                size += len(chunk)
+                if self._should_flush(buffer, size):
+                    yield self._flush(buffer)
+                    buffer, size = [], 0
+            if buffer:
+                yield self._flush(buffer)
+        finally:
+            stream.close()
+
+    def _coalesce_with_deadline(self, stream: Generator[str, None, None]) -> Generator[str, None, None]:
+        # The stream is read on its own thread, so that the buffer can be flushed
+        # on time even while the next chunk has not arrived yet.
+        assert self.max_delay is not None
+        chunks: queue.SimpleQueue = queue.SimpleQueue()
+        stopped = threading.Event()
+
+        def read_stream() -> None:
+            try:
+                for chunk in stream:
+                    chunks.put(chunk)
+                    if stopped.is_set():
+                        break
+            except BaseException as e:
+                chunks.put(e)
+            finally:
+                stream.close()
+                chunks.put(_END_OF_STREAM)
+
+        threading.Thread(target=read_stream, daemon=True).start()
+        buffer: list[str] = []
+        size = 0
+        deadline = 0.0
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=max(0.0, deadline - time.monotonic())) if buffer else chunks.get()
+                except queue.Empty:
+                    yield self._flush(buffer)
+                    buffer, size = [], 0
+                    continue
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self._count_in()
+                if not buffer:
+                    deadline = time.monotonic() + self.max_delay
+                buffer.append(item)
+                size += len(item)
+                if self._should_flush(buffer, size):
+                    yield self._flush(buffer)
+                    buffer, size = [], 0
+            if buffer:
+                yield self._flush(buffer)
+        finally:
+            stopped.set()
+
+    def _count_in(self) -> None:
+        with self._lock:
+            self.chunks_in += 1
+
+    def _flush(self, buffer: list[str]) -> str:
+        with self._lock:
+            self.chunks_out += 1
+        return "".join(buffer)
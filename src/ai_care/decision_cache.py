@@ -0,0 +1,112 @@
+from __future__ import annotations
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generator, Iterable
+
+from .abilities import Choice
+
+
+if TYPE_CHECKING:
+    from .ai_care import AICareContext
+
+
+_FLOAT_PATTERN = re.compile(r"\d+\.\d+")
+
+
+class DecisionCache:
+    """An LRU/TTL cache of LLM decisions.
+
+    The cache can be shared by many AICare instances. A decision is keyed on the
+    messages sent to the LLM, with volatile float values (such as chat intervals and
+    the seconds since the last chat) bucketed, and a fingerprint of the chat context.
+    Only decisions whose choice is in `cacheable_choices` are stored.
+
+    Args:
+        maxsize: The maximum number of cached decisions.
+        ttl: The number of seconds a decision stays valid, None means no expiry.
+        cacheable_choices: The choices that are allowed to be cached.
+        time_bucket: The width in seconds of the buckets used for volatile float values.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        cacheable_choices: Iterable[Choice] = (Choice.STAY_SILENT,),
+        time_bucket: float = 30,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, but received {maxsize}.")
+        if time_bucket <= 0:
+            raise ValueError(f"time_bucket must be positive, but received {time_bucket}.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cacheable_choices = frozenset(cacheable_choices)
+        self.time_bucket = time_bucket
+        self._entries: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def make_key(self, messages: list[AICareContext], chat_context_fingerprint: str) -> str:
+        normalized = [
+            [message["role"], _FLOAT_PATTERN.sub(self._bucket, message["content"])]
+            for message in messages
+        ]
+        payload = json.dumps([normalized, chat_context_fingerprint], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _bucket(self, match: re.Match) -> str:
+        return str(math.floor(float(match.group()) / self.time_bucket))
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, choice_code: str, content: str | Generator[str, None, None]) -> bool:
+        """Store a decision if its choice is cacheable. Return whether it was stored."""
+        try:
+            choice = Choice(choice_code)
+        except ValueError:
+            return False
+        if choice not in self.cacheable_choices or not isinstance(content, str):
+            return False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), choice_code, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
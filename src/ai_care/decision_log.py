@@ -0,0 +1,111 @@
+from __future__ import annotations
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+
+class DecisionLogger:
+    """A structured log of decision events written in the background.
+
+    Events are put into a bounded in-memory queue and never block the caller: when
+    the queue is full the event is dropped and counted. A background thread writes
+    the events in batches as JSON lines, each batch as one gzip member when
+    `compress` is True, so the file can be read with `gzip.open` as a whole.
+
+    Args:
+        path: The file the events are appended to.
+        max_queue_size: The maximum number of events waiting to be written.
+        batch_size: The maximum number of events written at once.
+        flush_interval: The maximum number of seconds an event waits before being written.
+        compress: Whether to write gzip compressed JSON lines.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        max_queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        compress: bool = True,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=max_queue_size)
+        self._counter_lock = threading.Lock()
+        self.emitted: int = 0
+        self.dropped: int = 0
+        self.written: int = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def emit(self, event: dict[str, Any]) -> bool:
+        """Queue an event without blocking. Return False if it was dropped."""
+        if self._closed:
+            return False
+        event.setdefault("time", time.time())
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return False
+        with self._counter_lock:
+            self.emitted += 1
+        return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write the queued events and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._counter_lock:
+            return {
+                "emitted": self.emitted,
+                "dropped": self.dropped,
+                "written": self.written,
+                "queued": self._queue.qsize(),
+            }
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: list[dict[str, Any]] = []
+            event = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    event = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        data = "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in batch)
+        if self.compress:
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(data)
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+        with self._counter_lock:
+            self.written += len(batch)
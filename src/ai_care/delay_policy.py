@@ -0,0 +1,93 @@
+from __future__ import annotations
+import threading
+from abc import ABCMeta, abstractmethod
+
+
+class DelayPolicy(metaclass=ABCMeta):
+    """Decide how long to wait after a chat before the routine ask.
+
+    A policy also counts how many routine asks it avoided compared with the fixed
+    `delay` config: once the next chat arrives, the ask of the previous one is
+    known to have fired or not under each delay. A policy can be shared by
+    several AICare instances.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.fixed_asks: int = 0
+        self.adaptive_asks: int = 0
+        self.intervals: int = 0
+
+    @abstractmethod
+    def next_delay(self, chat_intervals: list[float], fixed_delay: float) -> float:
+        """Return the delay in seconds before the routine ask.
+
+        Args:
+            chat_intervals: The last intervals between chats of the user, oldest first.
+            fixed_delay: The `delay` config.
+        """
+        ...
+
+    def record(self, interval: float, delay: float, fixed_delay: float) -> None:
+        """Record the interval until the next chat of an ask scheduled with `delay`."""
+        with self._lock:
+            self.intervals += 1
+            self.fixed_asks += interval >= fixed_delay
+            self.adaptive_asks += interval >= delay
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """`avoided_asks` is negative when the policy asked more often than the fixed delay."""
+        with self._lock:
+            return {
+                "intervals": self.intervals,
+                "fixed_asks": self.fixed_asks,
+                "adaptive_asks": self.adaptive_asks,
+                "avoided_asks": self.fixed_asks - self.adaptive_asks,
+            }
+
+
+class PercentileDelayPolicy(DelayPolicy):
+    """Wait a percentile of the chat intervals plus a margin, within limits.
+
+    A user who usually answers within a few seconds is asked about shortly after
+    the interval they rarely exceed, a slow one is given more time. Until
+    `min_samples` intervals are known, the fixed delay is used.
+
+    Args:
+        percentile: The percentile of the chat intervals, between 0 and 1.
+        margin: The seconds added to the percentile.
+        min_delay: The lower limit of the delay in seconds.
+        max_delay: The upper limit of the delay in seconds.
+        min_samples: The number of intervals needed before adapting.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.9,
+        margin: float = 5.0,
+        min_delay: float = 10.0,
+        max_delay: float = 600.0,
+        min_samples: int = 5,
+    ) -> None:
+        super().__init__()
+        if not 0 <= percentile <= 1:
+            raise ValueError(f"percentile must be in [0, 1], but received {percentile}.")
+        if min_delay > max_delay:
+            raise ValueError(f"min_delay must not exceed max_delay, but received {min_delay} > {max_delay}.")
+        self.percentile = percentile
+        self.margin = margin
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+
+    def next_delay(self, chat_intervals: list[float], fixed_delay: float) -> float:
+        if len(chat_intervals) < max(1, self.min_samples):
+            return fixed_delay
+        intervals = sorted(chat_intervals)
+        # Linear interpolation between the closest ranks.
+        rank = self.percentile * (len(intervals) - 1)
+        lower = int(rank)
+        upper = min(lower + 1, len(intervals) - 1)
+        value = intervals[lower] + (intervals[upper] - intervals[lower]) * (rank - lower)
+        return min(self.max_delay, max(self.min_delay, value + self.margin))
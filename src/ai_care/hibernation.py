@@ -0,0 +1,109 @@
+from __future__ import annotations
+import os
+import pickle
+import sqlite3
+import threading
+from abc import ABCMeta, abstractmethod
+from typing import Any
+from urllib.parse import quote
+
+
+class SessionStore(metaclass=ABCMeta):
+    """Where hibernated sessions are kept, as the state dict of `AICare.export_state`.
+
+    The state is pickled, only use a store that is not writable by untrusted parties.
+    """
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        """Return the state of the session, None if it is not in the store."""
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def __contains__(self, session_id: object) -> bool:
+        ...
+
+
+class FileSessionStore(SessionStore):
+    """Keep each hibernated session in its own file of `directory`."""
+
+    def __init__(self, directory: str | os.PathLike) -> None:
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, quote(session_id, safe="") + ".pickle")
+
+    def save(self, session_id: str, state: dict[str, Any]) -> None:
+        path = self._path(session_id)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Replacing makes the write atomic, a crash never leaves a partial state behind.
+        os.replace(temp_path, path)
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, session_id: object) -> bool:
+        return isinstance(session_id, str) and os.path.exists(self._path(session_id))
+
+
+class SQLiteSessionStore(SessionStore):
+    """Keep the hibernated sessions in a table of an SQLite database."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ai_care_sessions (session_id TEXT PRIMARY KEY, state BLOB NOT NULL)"
+            )
+
+    def save(self, session_id: str, state: dict[str, Any]) -> None:
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO ai_care_sessions (session_id, state) VALUES (?, ?)", (session_id, data)
+            )
+
+    def load(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM ai_care_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM ai_care_sessions WHERE session_id = ?", (session_id,))
+
+    def __contains__(self, session_id: object) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM ai_care_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
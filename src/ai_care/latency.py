@@ -0,0 +1,63 @@
+from __future__ import annotations
+import threading
+
+
+class LatencyStats:
+    """Running statistics of the decision latency of `to_llm_method`.
+
+    The latency is measured from the call of `to_llm_method` until the choice
+    has been parsed, which is the time the LLM needs to make a decision.
+    The running estimate is an exponentially weighted moving average and is
+    used to start speculative asks ahead of their deadline.
+    """
+    __slots__ = (
+        "_alpha", "_lock", "_estimate", "llm_calls", "total_latency", "max_latency",
+        "speculative_asks", "speculative_wasted",
+    )
+
+    def __init__(self, alpha: float = 0.2) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], but received {alpha}.")
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self._estimate: float | None = None
+        self.llm_calls: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+        self.speculative_asks: int = 0
+        self.speculative_wasted: int = 0
+
+    @property
+    def predicted_latency(self) -> float:
+        """The current estimate of the decision latency, 0 if nothing has been measured yet."""
+        return self._estimate or 0.0
+
+    def record_llm_call(self, latency: float) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if self._estimate is None:
+                self._estimate = latency
+            else:
+                self._estimate += self._alpha * (latency - self._estimate)
+
+    def record_speculation(self, wasted: bool) -> None:
+        with self._lock:
+            self.speculative_asks += 1
+            if wasted:
+                self.speculative_wasted += 1
+
+    def as_dict(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "llm_calls": self.llm_calls,
+                "mean_latency": self.total_latency / self.llm_calls if self.llm_calls else 0.0,
+                "max_latency": self.max_latency,
+                "predicted_latency": self.predicted_latency,
+                "speculative_asks": self.speculative_asks,
+                "speculative_wasted": self.speculative_wasted,
+                "speculative_waste_ratio": (
+                    self.speculative_wasted / self.speculative_asks if self.speculative_asks else 0.0
+                ),
+            }
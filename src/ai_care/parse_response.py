@@ -25,10 +25,7 @@ def parse_response(
             return '00', ''
         choice_code = prefix[2]
         check_valid = prefix[3]
-        if choice_code == check_valid:
-            ai_care._valid_msg_count += 1
-        else:
-            ai_care._invalid_msg_count += 1
+        ai_care._record_msg_validity(choice_code == check_valid)
         assert isinstance(choice_code, str)
         return choice_code, content or ""
     elif isinstance(response, Generator):
@@ -46,10 +43,7 @@ def parse_response(
             if all(prefix) and len(buffer) >= 9 and not found_choice:
                 choice_code = prefix[2]
                 check_valid = prefix[3]
-                if choice_code == check_valid:
-                    ai_care._valid_msg_count += 1
-                else:
-                    ai_care._invalid_msg_count += 1
+                ai_care._record_msg_validity(choice_code == check_valid)
                 try:
                     choice = Choice(choice_code)
                 except ValueError as e:
@@ -75,11 +69,13 @@ def parse_response(
                 for item in response:
                     yield item
                     gen_content_record.append(item)
-                ai_care._ask_context.append(
-                    {
-                        "role": "ai_care",
-                        "content": ''.join(gen_content_record),
-                    }
+                ai_care._extend_ask_context(
+                    [
+                        {
+                            "role": "ai_care",
+                            "content": ''.join(gen_content_record),
+                        }
+                    ]
                 )
             return choice.value, response_content_gen()
         else:
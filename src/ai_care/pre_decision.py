@@ -0,0 +1,258 @@
+from __future__ import annotations
+import math
+import statistics
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, TypedDict
+
+from .abilities import Choice
+
+
+if TYPE_CHECKING:
+    from .ai_care import AICare
+
+
+class PreDecisionFeatures(TypedDict):
+    routine: bool
+    chat_intervals: list[float]
+    mean_chat_interval: float | None
+    median_chat_interval: float | None
+    last_chat_interval: float | None
+    seconds_since_last_chat: float | None
+    sensor_data: Mapping[str, Any]
+    recent_choices: list[Choice]
+
+
+class _LazySensorData(Mapping):
+    """The readings of the sensors, each read the first time it is looked up."""
+
+    def __init__(self, ai_care: AICare, sensors: Iterable[str]) -> None:
+        self._ai_care = ai_care
+        self._sensors = list(sensors)
+        self._readings: dict[str, Any] = {}
+
+    def __getitem__(self, sensor: str) -> Any:
+        if sensor not in self._readings:
+            if sensor not in self._sensors:
+                raise KeyError(sensor)
+            self._readings[sensor] = self._ai_care.get_sensor_data(sensor)
+        return self._readings[sensor]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sensors)
+
+    def __len__(self) -> int:
+        return len(self._sensors)
+
+
+def collect_features(ai_care: AICare, sensors: Iterable[str] = (), routine: bool = False) -> PreDecisionFeatures:
+    """Collect the cheap features used to make a decision without the LLM.
+
+    The sensors are only read when the decider looks up their readings in `sensor_data`.
+    """
+    intervals = list(ai_care._chat_intervals)
+    return {
+        "routine": routine,
+        "chat_intervals": intervals,
+        "mean_chat_interval": statistics.fmean(intervals) if intervals else None,
+        "median_chat_interval": statistics.median(intervals) if intervals else None,
+        "last_chat_interval": intervals[-1] if intervals else None,
+        "seconds_since_last_chat": (
+            time.monotonic() - ai_care._last_chat_time if ai_care._last_chat_time is not None else None
+        ),
+        "sensor_data": _LazySensorData(ai_care, sensors),
+        # Only the choices of the LLM, local decisions must not feed the next ones.
+        "recent_choices": ai_care._choice_history.from_source("llm"),
+    }
+
+
+class PreDecider(metaclass=ABCMeta):
+    """A local decision stage in front of `to_llm_method`.
+
+    A pre-decider either makes a decision locally or passes the case on to the LLM.
+    A locally made choice is executed without content, so only choices without
+    parameters, such as `Choice.STAY_SILENT`, can be decided locally.
+    The features only hold the choices made by the LLM, and after `max_local_streak`
+    local decisions in a row the LLM is consulted again.
+
+    Args:
+        sensors: The sensors whose readings are included in the features.
+        max_local_streak: The maximal number of local decisions in a row.
+    """
+
+    def __init__(self, sensors: Iterable[str] = (), max_local_streak: int = 3) -> None:
+        if max_local_streak < 1:
+            raise ValueError(f"max_local_streak must be at least 1, but received {max_local_streak}.")
+        self.sensors = list(sensors)
+        self.max_local_streak = max_local_streak
+        self._lock = threading.Lock()
+        self.local_decisions: int = 0
+        self.llm_decisions: int = 0
+
+    @abstractmethod
+    def decide(self, features: PreDecisionFeatures) -> Choice | None:
+        """Return the choice made locally, or None to pass the case on to the LLM."""
+        ...
+
+    def record(self, decided_locally: bool) -> None:
+        with self._lock:
+            if decided_locally:
+                self.local_decisions += 1
+            else:
+                self.llm_decisions += 1
+
+    @property
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            total = self.local_decisions + self.llm_decisions
+            return {
+                "local_decisions": self.local_decisions,
+                "llm_decisions": self.llm_decisions,
+                "local_ratio": self.local_decisions / total if total else 0.0,
+            }
+
+
+class ThresholdPreDecider(PreDecider):
+    """Stay silent on routine checks when simple threshold rules say so.
+
+    Only routine checks (the ask scheduled by `chat_update`) are decided locally.
+    The choice is `STAY_SILENT` if any of the configured rules matches.
+
+    Args:
+        silent_streak: Stay silent if the last `silent_streak` choices of the LLM were all `STAY_SILENT`.
+        slow_chatter_ratio: Stay silent if the median chat interval of the user is longer than
+            `slow_chatter_ratio` times the seconds since the last chat, that is, the user usually
+            takes longer than this to speak again.
+        min_seconds_since_last_chat: Stay silent if the user spoke less than this many seconds ago.
+        sensors: The sensors whose readings are included in the features.
+        max_local_streak: The maximal number of local decisions in a row.
+    """
+
+    def __init__(
+        self,
+        silent_streak: int | None = None,
+        slow_chatter_ratio: float | None = None,
+        min_seconds_since_last_chat: float | None = None,
+        sensors: Iterable[str] = (),
+        max_local_streak: int = 3,
+    ) -> None:
+        super().__init__(sensors=sensors, max_local_streak=max_local_streak)
+        self.silent_streak = silent_streak
+        self.slow_chatter_ratio = slow_chatter_ratio
+        self.min_seconds_since_last_chat = min_seconds_since_last_chat
+
+    def decide(self, features: PreDecisionFeatures) -> Choice | None:
+        if not features["routine"]:
+            return None
+        recent_choices = features["recent_choices"]
+        if (
+            self.silent_streak is not None
+            and len(recent_choices) >= self.silent_streak
+            and all(choice == Choice.STAY_SILENT for choice in recent_choices[-self.silent_streak:])
+        ):
+            return Choice.STAY_SILENT
+        seconds_since_last_chat = features["seconds_since_last_chat"]
+        if seconds_since_last_chat is None:
+            return None
+        if self.min_seconds_since_last_chat is not None and seconds_since_last_chat < self.min_seconds_since_last_chat:
+            return Choice.STAY_SILENT
+        median_chat_interval = features["median_chat_interval"]
+        if (
+            self.slow_chatter_ratio is not None
+            and median_chat_interval is not None
+            and median_chat_interval > self.slow_chatter_ratio * seconds_since_last_chat
+        ):
+            return Choice.STAY_SILENT
+        return None
+
+
+class LogisticPreDecider(PreDecider):
+    """Stay silent on routine checks when a logistic model is confident enough.
+
+    The model estimates the probability that the LLM would choose `STAY_SILENT`
+    from the features of `feature_vector`. It can be trained from logged decisions with `fit`.
+
+    Args:
+        weights: The weights of the features.
+        bias: The bias of the model.
+        threshold: The minimal probability of `STAY_SILENT` to decide locally.
+        sensors: The sensors whose readings are included in the features.
+        max_local_streak: The maximal number of local decisions in a row.
+    """
+
+    n_features = 5
+
+    def __init__(
+        self,
+        weights: list[float],
+        bias: float = 0.0,
+        threshold: float = 0.9,
+        sensors: Iterable[str] = (),
+        max_local_streak: int = 3,
+    ) -> None:
+        super().__init__(sensors=sensors, max_local_streak=max_local_streak)
+        if len(weights) != self.n_features:
+            raise ValueError(f"Expected {self.n_features} weights, but received {len(weights)}.")
+        self.weights = list(weights)
+        self.bias = bias
+        self.threshold = threshold
+
+    @staticmethod
+    def feature_vector(features: PreDecisionFeatures) -> list[float]:
+        recent_choices = features["recent_choices"]
+        silent_ratio = (
+            sum(choice == Choice.STAY_SILENT for choice in recent_choices) / len(recent_choices)
+            if recent_choices else 0.0
+        )
+        return [
+            math.log1p(features["seconds_since_last_chat"] or 0.0),
+            math.log1p(features["median_chat_interval"] or 0.0),
+            math.log1p(features["last_chat_interval"] or 0.0),
+            math.log1p(len(features["chat_intervals"])),
+            silent_ratio,
+        ]
+
+    def probability(self, features: PreDecisionFeatures) -> float:
+        z = self.bias + sum(w * x for w, x in zip(self.weights, self.feature_vector(features)))
+        return 1 / (1 + math.exp(-max(min(z, 60.0), -60.0)))
+
+    def decide(self, features: PreDecisionFeatures) -> Choice | None:
+        if not features["routine"]:
+            return None
+        if self.probability(features) >= self.threshold:
+            return Choice.STAY_SILENT
+        return None
+
+    @classmethod
+    def fit(
+        cls,
+        samples: Iterable[tuple[PreDecisionFeatures, Choice]],
+        threshold: float = 0.9,
+        epochs: int = 200,
+        learning_rate: float = 0.1,
+        sensors: Iterable[str] = (),
+        max_local_streak: int = 3,
+    ) -> LogisticPreDecider:
+        """Train the model with gradient descent from logged (features, choice made by the LLM) pairs."""
+        data = [
+            (cls.feature_vector(features), 1.0 if choice == Choice.STAY_SILENT else 0.0)
+            for features, choice in samples
+        ]
+        if not data:
+            raise ValueError("At least one sample is required to fit the model.")
+        weights = [0.0] * cls.n_features
+        bias = 0.0
+        for _ in range(epochs):
+            weight_gradients = [0.0] * cls.n_features
+            bias_gradient = 0.0
+            for x, y in data:
+                z = bias + sum(w * xi for w, xi in zip(weights, x))
+                error = 1 / (1 + math.exp(-max(min(z, 60.0), -60.0))) - y
+                for i, xi in enumerate(x):
+                    weight_gradients[i] += error * xi
+                bias_gradient += error
+            weights = [w - learning_rate * g / len(data) for w, g in zip(weights, weight_gradients)]
+            bias -= learning_rate * bias_gradient / len(data)
+        return cls(weights=weights, bias=bias, threshold=threshold, sensors=sensors, max_local_streak=max_local_streak)
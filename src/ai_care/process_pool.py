@@ -0,0 +1,156 @@
+from __future__ import annotations
+import multiprocessing
+import os
+from abc import abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable
+
+from .ai_care import Detector
+
+
+_BytesLike = (bytes, bytearray, memoryview)
+
+
+class _SharedPayload:
+    """A bytes payload passed between processes through shared memory instead of a pipe."""
+    __slots__ = ("name", "size")
+
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+
+    @classmethod
+    def create(cls, data: bytes | bytearray | memoryview) -> tuple[_SharedPayload, SharedMemory]:
+        size = memoryview(data).nbytes
+        shared_memory = SharedMemory(create=True, size=max(1, size))
+        shared_memory.buf[:size] = memoryview(data).cast("B")
+        return cls(shared_memory.name, size), shared_memory
+
+    def read(self, unlink: bool = False) -> bytes:
+        shared_memory = SharedMemory(name=self.name)
+        try:
+            return bytes(shared_memory.buf[:self.size])
+        finally:
+            shared_memory.close()
+            if unlink:
+                shared_memory.unlink()
+
+
+def _run_in_worker(function: Callable, args: tuple, threshold: int) -> Any:
+    args = tuple(arg.read() if isinstance(arg, _SharedPayload) else arg for arg in args)
+    result = function(*args)
+    if isinstance(result, _BytesLike) and memoryview(result).nbytes >= threshold:
+        payload, shared_memory = _SharedPayload.create(result)
+        # The parent unlinks the segment once it has read it.
+        shared_memory.close()
+        return payload
+    return result
+
+
+class ProcessExecutor:
+    """Run CPU-heavy detectors and sensors in a pool of processes.
+
+    Functions, arguments and results must be picklable. Arguments and results of
+    bytes, bytearray or memoryview of at least `shared_memory_threshold` bytes are
+    passed through shared memory rather than pickled through the pipe.
+    An executor can be shared by several AICare instances.
+
+    Args:
+        max_workers: The number of processes, the number of CPUs by default.
+        shared_memory_threshold: The size in bytes from which payloads go through shared memory.
+        mp_context: The multiprocessing context or start method name of the processes.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        shared_memory_threshold: int = 1 << 20,
+        mp_context: multiprocessing.context.BaseContext | str | None = None,
+    ) -> None:
+        if isinstance(mp_context, str):
+            mp_context = multiprocessing.get_context(mp_context)
+        self.shared_memory_threshold = shared_memory_threshold
+        # The worker processes must share the resource tracker of this process, which
+        # tracks the shared memory segments whichever process creates or unlinks them.
+        if os.name == "posix":
+            resource_tracker.ensure_running()
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+
+    def submit(self, function: Callable, *args: Any) -> Future:
+        shared_memories: list[SharedMemory] = []
+        worker_args = []
+        for arg in args:
+            if isinstance(arg, _BytesLike) and memoryview(arg).nbytes >= self.shared_memory_threshold:
+                payload, shared_memory = _SharedPayload.create(arg)
+                shared_memories.append(shared_memory)
+                worker_args.append(payload)
+            else:
+                worker_args.append(arg)
+        try:
+            worker_future = self._executor.submit(_run_in_worker, function, tuple(worker_args), self.shared_memory_threshold)
+        except BaseException:
+            _release(shared_memories)
+            raise
+        future: Future = Future()
+
+        def done(worker_future: Future) -> None:
+            _release(shared_memories)
+            try:
+                result = worker_future.result()
+                if isinstance(result, _SharedPayload):
+                    result = result.read(unlink=True)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        worker_future.add_done_callback(done)
+        return future
+
+    def run(self, function: Callable, *args: Any) -> Any:
+        """Run `function(*args)` in a worker process and wait for the result."""
+        return self.submit(function, *args).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def _release(shared_memories: list[SharedMemory]) -> None:
+    for shared_memory in shared_memories:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+class ProcessDetector(Detector):
+    """A detector whose CPU-heavy work runs in the process pool of its AICare.
+
+    `function` must be picklable, e.g. a module level function. It is called with
+    the arguments returned by `inputs`, which runs in this process, and its result
+    is passed to `handle_result`, which runs on the detector thread and may call
+    `self.ai_care.trigger` or `ask` on the owning session. Without a registered
+    process pool, `function` runs on the detector thread.
+    """
+    __slots__ = ("function",)
+
+    def __init__(self, name: str, annotation: str, function: Callable[..., Any], tag: str = '') -> None:
+        super().__init__(name=name, annotation=annotation, tag=tag)
+        self.function = function
+
+    def inputs(self) -> tuple:
+        """Return the arguments of `function`."""
+        return ()
+
+    @abstractmethod
+    def handle_result(self, result: Any) -> bool:
+        """Act on the result of `function` and return whether it has triggered ai_care."""
+        ...
+
+    def detect(self) -> bool:
+        process_executor = None if self.ai_care is None else self.ai_care._process_executor
+        if process_executor is None:
+            result = self.function(*self.inputs())
+        else:
+            result = process_executor.run(self.function, *self.inputs())
+        return self.handle_result(result)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+import json
+import math
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Generator, TextIO
+
+
+class QuantileSketch:
+    """A compact sketch of a distribution of positive values with relative accuracy.
+
+    Values are counted in logarithmic buckets, so any quantile is estimated within
+    `relative_accuracy` of the true value, while the memory only grows with the
+    logarithm of the range of the values.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), but received {relative_accuracy}.")
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self._gamma = gamma
+        self._buckets: dict[int, int] = {}
+        self._zero_count: int = 0
+        self.count: int = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= 0:
+            self._zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        if not 0 <= q <= 1:
+            raise ValueError(f"q must be in [0, 1], but received {q}.")
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                # The middle of the bucket (gamma^(key-1), gamma^key].
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+
+class Profiler:
+    """Aggregate the timings of named phases: count, total and quantiles.
+
+    A profiler can be shared by several AICare instances. Read it at runtime with
+    `snapshot` or dump it on a signal with `install_signal_handler`.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self._relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self._totals: dict[str, float] = {}
+        self._sketches: dict[str, QuantileSketch] = {}
+
+    def record(self, name: str, duration: float) -> None:
+        with self._lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = QuantileSketch(self._relative_accuracy)
+                self._totals[name] = 0.0
+            sketch.add(duration)
+            self._totals[name] += duration
+
+    @contextmanager
+    def measure(self, name: str) -> Generator[None, None, None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def snapshot(self) -> dict[str, dict[str, float | int]]:
+        with self._lock:
+            return {
+                name: {
+                    "count": sketch.count,
+                    "total": self._totals[name],
+                    "mean": self._totals[name] / sketch.count,
+                    "p50": sketch.quantile(0.5),
+                    "p95": sketch.quantile(0.95),
+                    "p99": sketch.quantile(0.99),
+                }
+                for name, sketch in self._sketches.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals = {}
+            self._sketches = {}
+
+    def dump(self, file: TextIO | None = None) -> None:
+        file = file or sys.stderr
+        json.dump(self.snapshot(), file, indent=2, sort_keys=True)
+        file.write("\n")
+        file.flush()
+
+    def install_signal_handler(self, signum: int | None = None, file: TextIO | None = None) -> Any:
+        """Dump the snapshot to `file` (stderr by default) when the process receives `signum`.
+
+        `signum` defaults to SIGUSR1, which does not exist on Windows.
+        This must be called from the main thread. Return the previous handler.
+        The dump runs on a short-lived thread, since the signal may interrupt the
+        main thread while it holds the lock of the profiler.
+        """
+        if signum is None:
+            signum = signal.SIGUSR1
+        def handler(signum, frame):
+            threading.Thread(target=self.dump, args=(file,), daemon=True).start()
+        return signal.signal(signum, handler)
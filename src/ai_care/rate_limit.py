@@ -0,0 +1,230 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Generator, Iterable, Literal
+
+from .abilities import Choice
+
+
+OnLimit = Literal["defer", "local", "drop"]
+
+
+class RateLimited(Exception):
+    """A request to the LLM was dropped because a rate limit or a budget was hit."""
+
+
+class TokenBucket:
+    """Allow `calls_per_minute` calls on average with bursts of up to `burst` calls.
+
+    Share a bucket between the rate limiters of several sessions to limit them
+    together, for example per tenant or globally.
+    """
+
+    def __init__(self, calls_per_minute: float, burst: float | None = None, name: str = "") -> None:
+        if calls_per_minute <= 0:
+            raise ValueError(f"calls_per_minute must be positive, but received {calls_per_minute}.")
+        self.rate = calls_per_minute / 60
+        self.capacity = float(burst if burst is not None else max(1.0, calls_per_minute))
+        self.name = name
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def time_until_available(self, now: float, n: float = 1) -> float:
+        self._refill(now)
+        if self._tokens >= n:
+            return 0.0
+        if n > self.capacity:
+            return float("inf")
+        return (n - self._tokens) / self.rate
+
+    def take(self, n: float = 1) -> None:
+        self._tokens -= n
+
+
+class RollingBudget:
+    """Allow at most `limit` units, e.g. characters or tokens, in any `window` seconds."""
+
+    def __init__(self, limit: int, window: float = 3600.0, name: str = "") -> None:
+        self.limit = limit
+        self.window = window
+        self.name = name
+        self._spendings: deque[tuple[float, int]] = deque()
+        self.spent: int = 0
+
+    def _expire(self, now: float) -> None:
+        while self._spendings and self._spendings[0][0] + self.window <= now:
+            _, amount = self._spendings.popleft()
+            self.spent -= amount
+
+    def time_until_available(self, now: float, amount: int) -> float:
+        self._expire(now)
+        if self.spent + amount <= self.limit:
+            return 0.0
+        if amount > self.limit:
+            return float("inf")
+        freed = 0
+        for spent_at, spent_amount in self._spendings:
+            freed += spent_amount
+            if self.spent - freed + amount <= self.limit:
+                return spent_at + self.window - now
+        return float("inf")
+
+    def spend(self, now: float, amount: int) -> None:
+        if amount <= 0:
+            return
+        self._expire(now)
+        self._spendings.append((now, amount))
+        self.spent += amount
+
+
+class RateLimiter:
+    """Limit the calls to the LLM and the size of the prompts and completions.
+
+    A request is sent once every bucket has a token and the budgets have room for
+    its prompt and for more completion. Otherwise, depending on `on_limit`:
+    "defer" waits until the limits allow it, for at most `max_defer` seconds before
+    dropping it, "local" makes `local_choice` without the LLM and "drop" cancels the ask.
+
+    Use one rate limiter per session. Buckets and budgets can be shared between the
+    rate limiters of several sessions, so that they are limited per tenant or globally.
+
+    Args:
+        buckets: The token buckets of calls, each call takes a token from all of them.
+        prompt_budget: The budget of prompt size, None for no limit.
+        completion_budget: The budget of completion size, None for no limit.
+        on_limit: What to do when a limit is hit: "defer", "local" or "drop".
+        max_defer: The maximum number of seconds a request is deferred.
+        local_choice: The choice made locally when `on_limit` is "local", one without parameters.
+        count: Measure the size of a text, in characters by default. Pass a tokenizer to count tokens.
+    """
+
+    # Buckets and budgets may be shared by several rate limiters, they are all updated under this lock.
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        buckets: Iterable[TokenBucket] = (),
+        prompt_budget: RollingBudget | None = None,
+        completion_budget: RollingBudget | None = None,
+        on_limit: OnLimit = "defer",
+        max_defer: float = 60.0,
+        local_choice: Choice = Choice.STAY_SILENT,
+        count: Callable[[str], int] = len,
+    ) -> None:
+        if on_limit not in ("defer", "local", "drop"):
+            raise ValueError(f"on_limit must be 'defer', 'local' or 'drop', but received {on_limit!r}.")
+        self.buckets = list(buckets)
+        self.prompt_budget = prompt_budget
+        self.completion_budget = completion_budget
+        self.on_limit = on_limit
+        self.max_defer = max_defer
+        self.local_choice = local_choice
+        self.count = count
+        self.allowed: int = 0
+        self.deferred: int = 0
+        self.local: int = 0
+        self.dropped: int = 0
+
+    def _time_until_allowed(self, now: float, prompt_size: int) -> float:
+        wait = 0.0
+        for bucket in self.buckets:
+            wait = max(wait, bucket.time_until_available(now))
+        if self.prompt_budget is not None:
+            wait = max(wait, self.prompt_budget.time_until_available(now, prompt_size))
+        if self.completion_budget is not None:
+            wait = max(wait, self.completion_budget.time_until_available(now, 1))
+        return wait
+
+    def try_acquire(self, prompt_size: int) -> float:
+        """Take the tokens and spend the prompt budget if allowed now and return 0.
+
+        Otherwise return the number of seconds until it may be allowed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._time_until_allowed(now, prompt_size)
+            if wait > 0:
+                return wait
+            for bucket in self.buckets:
+                bucket.take()
+            if self.prompt_budget is not None:
+                self.prompt_budget.spend(now, prompt_size)
+            self.allowed += 1
+            return 0.0
+
+    def acquire(self, prompt_size: int, still_valid: Callable[[], bool]) -> bool:
+        """Wait, if deferring, until the request is allowed. Return whether it is allowed.
+
+        Stop waiting as soon as `still_valid` returns False.
+        """
+        wait = self.try_acquire(prompt_size)
+        if wait == 0:
+            return True
+        if self.on_limit == "defer":
+            deadline = time.monotonic() + self.max_defer
+            deferred = False
+            while wait != float("inf") and time.monotonic() + wait <= deadline and still_valid():
+                if not deferred:
+                    deferred = True
+                    with self._lock:
+                        self.deferred += 1
+                time.sleep(min(wait, 1.0))
+                wait = self.try_acquire(prompt_size)
+                if wait == 0:
+                    return True
+        with self._lock:
+            if self.on_limit == "local":
+                self.local += 1
+            else:
+                self.dropped += 1
+        return False
+
+    def record_completion(self, text: str) -> None:
+        if self.completion_budget is None:
+            return
+        with self._lock:
+            self.completion_budget.spend(time.monotonic(), self.count(text))
+
+    def count_completion(
+        self,
+        response: str | dict[str, Any] | Generator[str, None, None],
+    ) -> str | dict[str, Any] | Generator[str, None, None]:
+        """Record the size of the response, chunk by chunk for a stream."""
+        if self.completion_budget is None:
+            return response
+        if isinstance(response, str):
+            self.record_completion(response)
+            return response
+        if isinstance(response, dict):
+            # A tool call, counted as its JSON text.
+            self.record_completion(json.dumps(response, ensure_ascii=False))
+            return response
+        def counted(stream: Generator[str, None, None]) -> Generator[str, None, None]:
+            try:
+                for chunk in stream:
+                    self.record_completion(chunk)
+                    yield chunk
+            finally:
+                stream.close()
+        return counted(response)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = {
+                "allowed": self.allowed,
+                "deferred": self.deferred,
+                "local": self.local,
+                "dropped": self.dropped,
+            }
+            if self.prompt_budget is not None:
+                stats["prompt_spent"] = self.prompt_budget.spent
+            if self.completion_budget is not None:
+                stats["completion_spent"] = self.completion_budget.spent
+            return stats
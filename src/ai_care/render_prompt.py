@@ -1,4 +1,5 @@
 from __future__ import annotations
+import hashlib
 import textwrap
 import time
 from typing import TYPE_CHECKING
@@ -16,28 +17,36 @@ def render_basic_prompt(
     inactive_sensors_list: list[str] | None = None,
     inactive_detectors_list: list[str] | None = None,
 ) -> str:
+    return render_prompt_prefix(
+        ai_care,
+        inactive_abilities_list=inactive_abilities_list,
+        inactive_sensors_list=inactive_sensors_list,
+        inactive_detectors_list=inactive_detectors_list,
+    ) + render_dynamic_facts(ai_care)
+
+
+def render_prompt_prefix(
+    ai_care: AICare,
+    inactive_abilities_list: list[Choice] | None = None,
+    inactive_sensors_list: list[str] | None = None,
+    inactive_detectors_list: list[str] | None = None,
+) -> str:
+    """Render the static part of the prompt, which is byte-stable as long as the setup does not change.
+
+    It holds the instructions, abilities, sensors, detectors and guide, and is
+    followed by the facts of `render_dynamic_facts`.
+    """
     inactive_abilities_set = set() if inactive_abilities_list is None else set(inactive_abilities_list)
     inactive_sensors_set = set() if inactive_sensors_list is None else set(inactive_sensors_list)
     inactive_detectors_set = set() if inactive_detectors_list is None else set(inactive_detectors_list)
     if ai_care._ask_later_count_left <= 0:
         inactive_abilities_set.add(Choice.ASK_LATER)
     
-    abilities_dict = ai_care.ability.abilities
-    
-    intervals_info = (
-        f"""The intervals of the last {len(ai_care._chat_intervals)} times the user conversed with you are recorded in the following list (unit in seconds):
-        {str(ai_care._chat_intervals)}
-        """ if ai_care._chat_intervals else ""
-    ) + (
-        f"""It has been {time.monotonic() - ai_care._last_chat_time} seconds since the last time the user spoke with you."""
-        if ai_care._last_chat_time is not None else ""
-    )
-
-    sorted_abilities = sorted(abilities_dict.values(), key=lambda x: Choice[x.__name__.upper()].value)
-    abilities_info = ''.join(_render_ability_description(ability_method).lstrip()
-        for ability_method in sorted_abilities
-        if ability_method not in inactive_abilities_set
-    ).replace('\n', '\n        ')
+    if ai_care._tool_calling:
+        # The choices are passed as tools, see `render_ability_tools`.
+        response_info = "Reply by calling exactly one of the provided tools, each of them is a choice you can make."
+    else:
+        response_info = _render_text_protocol(ai_care, inactive_abilities_set)
 
     prompt = textwrap.dedent(
         f"""
@@ -50,26 +59,7 @@ def render_basic_prompt(
         However, if you are chatting with the user like a friend,
         then you may need to proactively continue the conversation like a friend when the user doesn't speak.
 
-        When replying to this message, you must follow the rules below:
-        ========================RESPONSE RULES=======================
-        1. Start with eight characters followed by an English colon.
-        The first two characters of these eight must be 'AA', the third and fourth must be '00',
-        the fifth and sixth are the code of your choice.
-        The seventh and eighth characters should repeat the fifth and sixth characters.
-        2. After the colon is the content corresponding to the chosen option.
-        If it involves a function call, this part of the content must be in the format of a JSON string.
-        =============================================================
-
-        Here are the choices you can make:
-        ===========================CHOICES===========================
-        {abilities_info}
-        =============================================================
-        You must choose one of the options provided above as your reply.
-        
-        Response Examples:
-            If you want to remain silent: AA000101:
-            If you want to say to the user: AA000202: [Your content here]
-            If you decide to ask the user what they are doing if they haven't spoken to you in a minute: AA000303: {{"delay":60, "message":"What are you doing?"}}
+        {response_info}
 
         ===========================SENSORS===========================
         Sensors list:
@@ -97,15 +87,72 @@ def render_basic_prompt(
         }
         =============================================================
         
-        ============================FACTS============================
-        {intervals_info}
-        
+        ============================GUIDE============================
         {ai_care.guide}
         =============================================================
         """
     )
     return prompt
 
+
+def _render_text_protocol(ai_care: AICare, inactive_abilities_set: set[Choice]) -> str:
+    abilities_dict = ai_care.ability.abilities
+
+    sorted_abilities = sorted(abilities_dict.values(), key=lambda x: Choice[x.__name__.upper()].value)
+    abilities_info = ''.join(_render_ability_description(ability_method).lstrip()
+        for ability_method in sorted_abilities
+        if ability_method not in inactive_abilities_set
+    ).replace('\n', '\n        ')
+
+    return textwrap.dedent(
+        f"""
+        When replying to this message, you must follow the rules below:
+        ========================RESPONSE RULES=======================
+        1. Start with eight characters followed by an English colon.
+        The first two characters of these eight must be 'AA', the third and fourth must be '00',
+        the fifth and sixth are the code of your choice.
+        The seventh and eighth characters should repeat the fifth and sixth characters.
+        2. After the colon is the content corresponding to the chosen option.
+        If it involves a function call, this part of the content must be in the format of a JSON string.
+        =============================================================
+
+        Here are the choices you can make:
+        ===========================CHOICES===========================
+        {abilities_info}
+        =============================================================
+        You must choose one of the options provided above as your reply.
+        
+        Response Examples:
+            If you want to remain silent: AA000101:
+            If you want to say to the user: AA000202: [Your content here]
+            If you decide to ask the user what they are doing if they haven't spoken to you in a minute: AA000303: {{"delay":60, "message":"What are you doing?"}}
+        """
+    ).strip('\n').replace('\n', '\n        ')
+
+
+def render_dynamic_facts(ai_care: AICare) -> str:
+    """Render the facts that change from one ask to the next."""
+    intervals_info = (
+        f"""The intervals of the last {len(ai_care._chat_intervals)} times the user conversed with you are recorded in the following list (unit in seconds):
+        {str(ai_care._chat_intervals)}
+        """ if ai_care._chat_intervals else ""
+    ) + (
+        f"""It has been {time.monotonic() - ai_care._last_chat_time} seconds since the last time the user spoke with you."""
+        if ai_care._last_chat_time is not None else ""
+    )
+    return textwrap.dedent(
+        f"""
+        ============================FACTS============================
+        {intervals_info}
+        =============================================================
+        """
+    )
+
+
+def prompt_cache_key(prompt_prefix: str) -> str:
+    """A short hash of the prompt prefix, the same for byte-identical prefixes."""
+    return hashlib.blake2b(prompt_prefix.encode("utf-8"), digest_size=8).hexdigest()
+
 def _render_ability_description(ability_method) -> str:
     choice = Choice[ability_method.__name__.upper()]
     content_string = "The content you want to say\n\n" if choice == Choice.SPEAK_NOW \
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Generator
+from enum import IntEnum
+from typing import Any, Callable, TypeVar
+
+from .profiling import QuantileSketch
+
+
+T = TypeVar("T")
+
+
+class AskPriority(IntEnum):
+    """The priority of an ask by where it comes from, higher goes first."""
+    ROUTINE = 0
+    TIMER = 1
+    DETECTOR = 2
+
+
+class DeadlineExpired(Exception):
+    """The deadline of a request passed before it could be sent to the LLM."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "deadline", "granted", "dropped", "event")
+
+    def __init__(self, priority: int, deadline: float) -> None:
+        self.priority = priority
+        self.deadline = deadline
+        self.granted = False
+        self.dropped = False
+        self.event = threading.Event()
+
+
+class _PriorityStats:
+    __slots__ = ("requests", "dropped", "wait", "latency")
+
+    def __init__(self) -> None:
+        self.requests: int = 0
+        self.dropped: int = 0
+        self.wait = QuantileSketch()
+        self.latency = QuantileSketch()
+
+
+class _ScheduledStream(Generator):
+    """A stream from the LLM that holds its scheduler slot until it is exhausted or closed.
+
+    A class rather than a generator function, so that the slot is also released
+    when the stream is dropped before its first chunk.
+    """
+
+    def __init__(self, stream: Generator[Any, Any, Any], on_end: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_end: Callable[[], None] | None = on_end
+
+    def _end(self) -> None:
+        on_end, self._on_end = self._on_end, None
+        if on_end is not None:
+            on_end()
+
+    def send(self, value: Any) -> Any:
+        try:
+            return self._stream.send(value)
+        except BaseException:
+            self._end()
+            raise
+
+    def throw(self, typ: Any, val: Any = None, tb: Any = None) -> Any:
+        try:
+            if val is None and tb is None:
+                return self._stream.throw(typ)
+            return self._stream.throw(typ, val, tb)
+        except BaseException:
+            self._end()
+            raise
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._end()
+
+    def __del__(self) -> None:
+        self._end()
+
+
+class LLMScheduler:
+    """An earliest-deadline-first queue in front of `to_llm_method`.
+
+    At most `max_concurrent` requests are sent to the LLM at the same time. The
+    others wait in a queue ordered by priority, higher first, and by deadline
+    within the same priority. A request whose deadline has passed before its turn
+    comes is dropped and `DeadlineExpired` is raised to its caller. A streamed
+    response holds its slot until the stream is exhausted or closed. A scheduler can
+    be shared by several AICare instances.
+
+    Args:
+        max_concurrent: The maximum number of requests sent to the LLM at the same time.
+        default_deadline: The deadline in seconds of a request without an explicit one.
+        deadlines: The default deadline in seconds per priority, overriding `default_deadline`.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        default_deadline: float = 30.0,
+        deadlines: dict[int, float] | None = None,
+    ) -> None:
+        if max_concurrent <= 0:
+            raise ValueError(f"max_concurrent must be positive, but received {max_concurrent}.")
+        self.max_concurrent = max_concurrent
+        self.default_deadline = default_deadline
+        self.deadlines: dict[int, float] = dict(deadlines or {})
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, float, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._running: int = 0
+        self._stats: dict[int, _PriorityStats] = {}
+
+    def deadline_for(self, priority: int) -> float:
+        """The default deadline in seconds of a request with the given priority."""
+        return self.deadlines.get(priority, self.default_deadline)
+
+    def run(self, function: Callable[[], T], priority: int, deadline: float) -> T:
+        """Call `function` once its turn comes, `deadline` is a `time.monotonic()` time.
+
+        If `function` returns a generator, the slot is held and the latency recorded
+        until it is exhausted or closed. Raise `DeadlineExpired` if the deadline
+        passes before the turn comes.
+        """
+        start_time = time.monotonic()
+        waiter = _Waiter(priority, deadline)
+        with self._lock:
+            stats = self._stats.get(priority)
+            if stats is None:
+                stats = self._stats[priority] = _PriorityStats()
+            stats.requests += 1
+            if self._running < self.max_concurrent and not self._queue:
+                self._running += 1
+                waiter.granted = True
+            else:
+                heapq.heappush(self._queue, (-priority, deadline, next(self._sequence), waiter))
+        if not waiter.granted:
+            waiter.event.wait(max(0.0, deadline - time.monotonic()))
+            with self._lock:
+                if not waiter.granted:
+                    # Still in the queue, it is skipped when it reaches the head.
+                    waiter.dropped = True
+            if waiter.dropped:
+                self._record_drop(stats)
+                raise DeadlineExpired(f"The deadline passed after {time.monotonic() - start_time:.3f} seconds in the queue.")
+        wait_time = time.monotonic() - start_time
+        def end() -> None:
+            self._release()
+            with self._lock:
+                stats.wait.add(wait_time)
+                stats.latency.add(time.monotonic() - start_time)
+        try:
+            result = function()
+        except BaseException:
+            end()
+            raise
+        if isinstance(result, Generator):
+            return _ScheduledStream(result, end)  # type: ignore[return-value]
+        end()
+        return result
+
+    def _record_drop(self, stats: _PriorityStats) -> None:
+        with self._lock:
+            stats.dropped += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._running -= 1
+            now = time.monotonic()
+            while self._queue and self._running < self.max_concurrent:
+                _, deadline, _, waiter = heapq.heappop(self._queue)
+                if waiter.dropped:
+                    continue
+                if deadline <= now:
+                    waiter.dropped = True
+                    waiter.event.set()
+                    continue
+                waiter.granted = True
+                self._running += 1
+                waiter.event.set()
+
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return sum(not waiter.dropped for *_, waiter in self._queue)
+
+    @property
+    def stats(self) -> dict[int, dict[str, float | int]]:
+        """Per priority: requests, dropped, and the p50/p95 of the queue wait and of the total latency."""
+        with self._lock:
+            return {
+                priority: {
+                    "requests": stats.requests,
+                    "dropped": stats.dropped,
+                    "wait_p50": stats.wait.quantile(0.5),
+                    "wait_p95": stats.wait.quantile(0.95),
+                    "latency_p50": stats.latency.quantile(0.5),
+                    "latency_p95": stats.latency.quantile(0.95),
+                }
+                for priority, stats in sorted(self._stats.items())
+            }
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import threading
+import time
+from array import array
+
+
+class SensorHistory:
+    """A ring buffer of the last `capacity` numeric readings of a sensor with their times.
+
+    Readings are kept in two preallocated arrays of doubles, so the memory of a
+    history is fixed and appending never allocates. Times are `time.monotonic()` values.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        if capacity < 2:
+            raise ValueError(f"capacity must be at least 2, but received {capacity}.")
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next: int = 0
+        self._count: int = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float, timestamp: float | None = None) -> None:
+        with self._lock:
+            self._times[self._next] = time.monotonic() if timestamp is None else timestamp
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def readings(self, window: float | None = None, now: float | None = None) -> list[tuple[float, float]]:
+        """Return the (time, value) readings of the last `window` seconds, oldest first."""
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            indices = [(start + i) % self.capacity for i in range(self._count)]
+            readings = [(self._times[i], self._values[i]) for i in indices]
+        if window is not None:
+            since = (time.monotonic() if now is None else now) - window
+            readings = [reading for reading in readings if reading[0] >= since]
+        return readings
+
+    def aggregates(self, window: float | None = None, now: float | None = None) -> dict[str, float | int] | None:
+        """Summarize the readings of the last `window` seconds, None if there is none.
+
+        Return the count, the last value and its age in seconds, the change since the
+        first reading (delta), the min, the max and the slope per second of a least
+        squares fit.
+        """
+        now = time.monotonic() if now is None else now
+        readings = self.readings(window, now)
+        if not readings:
+            return None
+        times = [t for t, _ in readings]
+        values = [v for _, v in readings]
+        n = len(readings)
+        slope = 0.0
+        if n > 1:
+            mean_time = sum(times) / n
+            mean_value = sum(values) / n
+            variance = sum((t - mean_time) ** 2 for t in times)
+            if variance > 0:
+                slope = sum((t - mean_time) * (v - mean_value) for t, v in readings) / variance
+        return {
+            "count": n,
+            "last": values[-1],
+            "age": now - times[-1],
+            "delta": values[-1] - values[0],
+            "min": min(values),
+            "max": max(values),
+            "slope": slope,
+        }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import json
+import math
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable
+
+
+Summarizer = Callable[[Any], Any]
+
+
+class SensorSerializer:
+    """Serialize sensor readings into compact, size-bounded JSON for the prompt.
+
+    Floats are rounded to `float_digits` digits, strings longer than
+    `max_string_chars` are truncated, sequences longer than `max_items` are
+    evenly sampled into `{"sample": [...], "total": n}` and mappings keep their
+    first `max_items` keys. The keys are sorted, so that the same readings always
+    give the same text. A reading is then shrunk further until it fits in its
+    byte budget, the `max_bytes` of the sensor or of the serializer.
+
+    Args:
+        max_bytes: The default byte budget of a reading, None for no limit.
+        float_digits: The number of digits floats are rounded to.
+        max_items: The maximum number of items of a sequence or mapping.
+        max_string_chars: The maximum number of characters of a string.
+        measure_input: Whether to also measure the plain `str` of the readings, for the
+            `bytes_in` and `bytes_saved` stats. It costs a full conversion of the readings
+            per payload, so it is off by default.
+    """
+    __slots__ = (
+        "max_bytes", "float_digits", "max_items", "max_string_chars", "measure_input", "_lock", "payloads", "bytes_in",
+        "bytes_out",
+    )
+
+    _MAX_DEPTH = 4
+
+    def __init__(
+        self,
+        max_bytes: int | None = 1024,
+        float_digits: int = 3,
+        max_items: int = 16,
+        max_string_chars: int = 256,
+        measure_input: bool = False,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.float_digits = float_digits
+        self.max_items = max_items
+        self.max_string_chars = max_string_chars
+        self.measure_input = measure_input
+        self._lock = threading.Lock()
+        self.payloads: int = 0
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+
+    @staticmethod
+    def dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str)
+
+    def serialize(
+        self,
+        readings: dict[str, Any],
+        budgets: Mapping[str, int | None] | None = None,
+        summarizers: Mapping[str, Summarizer] | None = None,
+    ) -> str:
+        """Return the compact JSON of the readings by sensor name.
+
+        `budgets` overrides `max_bytes` per sensor and `summarizers` turns the reading of
+        a sensor into what is serialized, before it is compacted.
+        """
+        budgets = budgets or {}
+        summarizers = summarizers or {}
+        compacted = {}
+        for name, value in readings.items():
+            summarizer = summarizers.get(name)
+            if summarizer is not None:
+                value = summarizer(value)
+            compacted[name] = self.compact(value, budgets.get(name, self.max_bytes))
+        text = self.dumps(compacted)
+        # Compared with the plain `str` of the readings, which was used before.
+        bytes_in = len(str(readings).encode("utf-8")) if self.measure_input else 0
+        with self._lock:
+            self.payloads += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += len(text.encode("utf-8"))
+        return text
+
+    def compact(self, value: Any, max_bytes: int | None = None) -> Any:
+        """Return a JSON-ready, compacted value whose serialization fits in about `max_bytes`."""
+        max_items = self.max_items
+        max_string_chars = self.max_string_chars
+        while True:
+            compacted = self._compact(value, max_items, max_string_chars, 0)
+            if max_bytes is None:
+                return compacted
+            text = self.dumps(compacted)
+            if len(text.encode("utf-8")) <= max_bytes:
+                return compacted
+            if max_items <= 1 and max_string_chars <= 8:
+                break
+            max_items = max(1, max_items // 2)
+            max_string_chars = max(8, max_string_chars // 2)
+        # Still too large, keep the beginning of its text.
+        text = _truncate(str(value), max_bytes)
+        while len(self.dumps(text).encode("utf-8")) > max_bytes and len(text) > 1:
+            text = _truncate(text, len(text) * 3 // 4)
+        return text
+
+    def _compact(self, value: Any, max_items: int, max_string_chars: int, depth: int) -> Any:
+        if value is None or isinstance(value, (bool, int)):
+            return value
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return str(value)
+            return round(value, self.float_digits)
+        if isinstance(value, str):
+            return _truncate(value, max_string_chars)
+        if depth >= self._MAX_DEPTH:
+            return _truncate(str(value), max_string_chars)
+        if isinstance(value, Mapping):
+            keys = sorted(value, key=str)
+            compacted = {
+                str(key): self._compact(value[key], max_items, max_string_chars, depth + 1)
+                for key in keys[:max_items]
+            }
+            if len(keys) > max_items:
+                compacted["…"] = f"{len(keys) - max_items} more"
+            return compacted
+        if isinstance(value, (list, tuple, set, frozenset)):
+            items = sorted(value, key=str) if isinstance(value, (set, frozenset)) else list(value)
+            if len(items) <= max_items:
+                return [self._compact(item, max_items, max_string_chars, depth + 1) for item in items]
+            # Evenly spaced, keeping the first and the last.
+            if max_items == 1:
+                indices = [len(items) - 1]
+            else:
+                indices = [round(i * (len(items) - 1) / (max_items - 1)) for i in range(max_items)]
+            return {
+                "sample": [self._compact(items[i], max_items, max_string_chars, depth + 1) for i in indices],
+                "total": len(items),
+            }
+        return _truncate(str(value), max_string_chars)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """The payloads and their bytes, with `bytes_in` and `bytes_saved` if `measure_input` is set."""
+        with self._lock:
+            stats = {"payloads": self.payloads, "bytes_out": self.bytes_out}
+            if self.measure_input:
+                stats["bytes_in"] = self.bytes_in
+                stats["bytes_saved"] = self.bytes_in - self.bytes_out
+            return stats
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 1)] + "…"
@@ -0,0 +1,188 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from .ai_care import AICare, ChatContext
+from .batching import BatchLLMDispatcher, BatchToLLMMethod
+from .hibernation import SessionStore
+from .tick_grid import TickGrid
+
+
+class AICareSessions:
+    """A container of AICare sessions by session id.
+
+    Sessions are created on first use by `factory`, which receives the session id
+    and returns a fully set up AICare (registered methods, sensors, detectors...).
+    With hibernation, idle sessions are moved to a store and rebuilt by `factory`
+    from their saved state on next use. Iterating and `len` only cover the
+    sessions resident in memory.
+    """
+
+    def __init__(self, factory: Callable[[str], AICare]) -> None:
+        self._factory = factory
+        self._sessions: dict[str, AICare] = {}
+        self._lock = threading.Lock()
+        self._batch_dispatcher: BatchLLMDispatcher | None = None
+        self._tick_grid: TickGrid | None = None
+        self._store: SessionStore | None = None
+        self._idle_timeout: float = 600.0
+        self._last_active: dict[str, float] = {}
+        self._sweeper: threading.Thread | None = None
+        self._stop_sweeper = threading.Event()
+        self.hibernated: int = 0
+        self.rehydrated: int = 0
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def items(self) -> list[tuple[str, AICare]]:
+        """Return the resident sessions, without counting it as a use of them."""
+        return list(self._sessions.items())
+
+    def get(self, session_id: str) -> AICare:
+        """Return the session, creating or rehydrating it if needed."""
+        ai_care = self._sessions.get(session_id)
+        if ai_care is not None:
+            if self._store is None:
+                return ai_care
+            self._last_active[session_id] = time.monotonic()
+            # The session may have been hibernated meanwhile, then it is rehydrated under the lock.
+            if self._sessions.get(session_id) is ai_care:
+                return ai_care
+        with self._lock:
+            return self._get_locked(session_id)
+
+    def _get_locked(self, session_id: str) -> AICare:
+        ai_care = self._sessions.get(session_id)
+        if ai_care is None:
+            ai_care = self._factory(session_id)
+            if self._batch_dispatcher is not None:
+                ai_care.register_batch_to_llm_method(self._batch_dispatcher)
+            if self._tick_grid is not None:
+                ai_care.register_tick_grid(self._tick_grid)
+            if self._store is not None:
+                state = self._store.load(session_id)
+                if state is not None:
+                    ai_care.restore_state(state)
+                    self._store.delete(session_id)
+                    self.rehydrated += 1
+            self._sessions[session_id] = ai_care
+        if self._store is not None:
+            self._last_active[session_id] = time.monotonic()
+        return ai_care
+
+    def register_batch_to_llm_method(
+        self,
+        batch_to_llm_method: BatchToLLMMethod,
+        max_batch_size: int = 16,
+        max_wait: float = 0.05,
+    ) -> BatchLLMDispatcher:
+        """Batch the LLM requests of all the sessions, including the ones created later."""
+        dispatcher = BatchLLMDispatcher(batch_to_llm_method, max_batch_size=max_batch_size, max_wait=max_wait)
+        with self._lock:
+            self._batch_dispatcher = dispatcher
+            sessions = list(self._sessions.values())
+        for ai_care in sessions:
+            ai_care.register_batch_to_llm_method(dispatcher)
+        return dispatcher
+
+    def register_tick_grid(self, tick_grid: TickGrid | None) -> None:
+        """Fire the cyclic detections of all the sessions, including the ones created later, on `tick_grid`."""
+        with self._lock:
+            self._tick_grid = tick_grid
+            sessions = list(self._sessions.values())
+        for ai_care in sessions:
+            ai_care.register_tick_grid(tick_grid)
+
+    def register_hibernation(
+        self,
+        store: SessionStore | None,
+        idle_timeout: float = 600.0,
+        sweep_interval: float | None = None,
+    ) -> None:
+        """Hibernate the sessions idle for `idle_timeout` seconds to `store`, None disables it.
+
+        A session is idle when it has no pending timer and has not been used through
+        this container. Hibernation happens on `hibernate_idle`, which is also called
+        every `sweep_interval` seconds on a background thread if given.
+        """
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        with self._lock:
+            self._store = store
+            self._idle_timeout = idle_timeout
+            now = time.monotonic()
+            self._last_active = {session_id: now for session_id in self._sessions}
+        if store is not None and sweep_interval is not None:
+            self._stop_sweeper = threading.Event()
+            self._sweeper = threading.Thread(
+                target=self._sweep, args=(sweep_interval, self._stop_sweeper), daemon=True
+            )
+            self._sweeper.start()
+
+    def _sweep(self, sweep_interval: float, stop: threading.Event) -> None:
+        while not stop.wait(sweep_interval):
+            self.hibernate_idle()
+
+    def hibernate_idle(self) -> int:
+        """Move the idle sessions to the store and return how many were hibernated."""
+        if self._store is None:
+            return 0
+        count = 0
+        with self._lock:
+            now = time.monotonic()
+            for session_id, ai_care in list(self._sessions.items()):
+                last_active = self._last_active.get(session_id, now)
+                if now - last_active < self._idle_timeout or not ai_care.idle:
+                    continue
+                del self._sessions[session_id]
+                if self._last_active.get(session_id, now) != last_active:
+                    # Used while being removed, see `get`.
+                    self._sessions[session_id] = ai_care
+                    continue
+                self._store.save(session_id, ai_care.export_state())
+                del self._last_active[session_id]
+                count += 1
+            self.hibernated += count
+        return count
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"resident": len(self._sessions), "hibernated": self.hibernated, "rehydrated": self.rehydrated}
+
+    def remove(self, session_id: str) -> AICare | None:
+        """Remove the session and cancel all its tasks and timers, a hibernated one is deleted."""
+        with self._lock:
+            ai_care = self._sessions.pop(session_id, None)
+            self._last_active.pop(session_id, None)
+            if self._store is not None:
+                self._store.delete(session_id)
+        if ai_care is not None:
+            ai_care.reset()
+        return ai_care
+
+    def chat_update(self, session_id: str, chat_context: ChatContext) -> None:
+        self.get(session_id).chat_update(chat_context)
+
+    def chat_update_many(self, events: Iterable[tuple[str, ChatContext, float | None]]) -> None:
+        """Apply a batch of (session_id, chat_context, timestamp) events.
+
+        Events are grouped per session and each session is updated once with
+        `AICare.chat_update_many`. The timestamp is a `time.time()` value or None for now.
+        """
+        grouped: dict[str, list[tuple[ChatContext, float | None]]] = {}
+        for session_id, chat_context, timestamp in events:
+            grouped.setdefault(session_id, []).append((chat_context, timestamp))
+        with self._lock:
+            sessions = [(self._get_locked(session_id), session_events) for session_id, session_events in grouped.items()]
+        for ai_care, session_events in sessions:
+            ai_care.chat_update_many(session_events)
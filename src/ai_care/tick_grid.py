@@ -0,0 +1,31 @@
+from __future__ import annotations
+import math
+
+from .timer_queue import TimerQueue
+
+
+class TickGrid(TimerQueue):
+    """A clock shared by sessions, which fires their cyclic detections on a grid of ticks.
+
+    Ticks are every `tolerance` seconds of `time.monotonic()`. A timer fires on the
+    first tick at or after its due time, so at most `tolerance` seconds late, and all
+    the timers of a tick fire in one wakeup of a single thread. The thread exits when
+    no timer is left. Timers run one after the other and should be quick, as releasing
+    detectors is, since the detectors themselves run on their own threads.
+
+    Args:
+        tolerance: The spacing of the ticks in seconds.
+    """
+
+    def __init__(self, tolerance: float = 1.0) -> None:
+        if tolerance <= 0:
+            raise ValueError(f"tolerance must be positive, but received {tolerance}.")
+        super().__init__()
+        self.tolerance = tolerance
+
+    def tick_for(self, due_time: float) -> float:
+        """Return the first tick at or after `due_time`."""
+        return math.ceil(due_time / self.tolerance) * self.tolerance
+
+    def due_time(self, due_time: float) -> float:
+        return self.tick_for(due_time)
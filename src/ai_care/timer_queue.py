@@ -0,0 +1,133 @@
+from __future__ import annotations
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable
+
+from .scheduling import AskPriority
+
+
+logger = logging.getLogger("ai_care")
+
+
+class QueuedTimer:
+    """A timer waiting in a `TimerQueue`, a small record rather than a thread.
+
+    It can be registered in `AICare.timers` like the other timers.
+    """
+    __slots__ = ("function", "_task_num", "_preserve_", "cancelled", "_queue")
+
+    def __init__(self, function: Callable[[], None], task_num: int = 0, preserve: bool = False) -> None:
+        self.function = function
+        self._task_num = task_num
+        self._preserve_ = preserve
+        self.cancelled = False
+        self._queue: TimerQueue | None = None
+
+    def fire(self) -> None:
+        """Called on the thread of the queue when the timer is due."""
+        self.function()
+
+    def cancel(self) -> None:
+        if not self.cancelled:
+            self.cancelled = True
+            queue = self._queue
+            if queue is not None:
+                queue._discard()
+
+
+class TimerQueue:
+    """Timers of any number of sessions waiting on a single thread.
+
+    Due timers are fired one after the other on that thread, so `fire` should be
+    quick, e.g. start the thread that does the work. The thread starts with the
+    first timer and exits when no timer is left. Cancelled timers are dropped
+    when they are due, or earlier once they are the majority of the queue.
+    """
+
+    _COMPACT_THRESHOLD = 64
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, QueuedTimer]] = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._cancelled: int = 0
+        self.wakeups: int = 0
+        self.fired: int = 0
+
+    def due_time(self, due_time: float) -> float:
+        """Return when a timer due at `due_time` fires."""
+        return due_time
+
+    def schedule(
+        self,
+        interval: float | int,
+        function: Callable[[], None],
+        task_num: int,
+        preserve: bool = False,
+    ) -> QueuedTimer:
+        """Call `function` in `interval` seconds, on behalf of `task_num`."""
+        timer = QueuedTimer(function, task_num, preserve)
+        self.push(timer, interval)
+        return timer
+
+    def push(self, timer: QueuedTimer, interval: float | int) -> None:
+        due_time = self.due_time(time.monotonic() + float(interval))
+        with self._condition:
+            timer._queue = self
+            heapq.heappush(self._heap, (due_time, next(self._seq), timer))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            elif self._heap[0][2] is timer:
+                self._condition.notify()
+
+    def _discard(self) -> None:
+        with self._condition:
+            self._cancelled += 1
+            if self._cancelled >= self._COMPACT_THRESHOLD and self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _run(self) -> None:
+        thread = threading.current_thread()
+        # Like a timer thread, so that what the timers ask or arm inherits their task.
+        thread._priority = AskPriority.TIMER  # type: ignore[attr-defined]
+        while True:
+            with self._condition:
+                if not self._heap:
+                    self._thread = None
+                    self._cancelled = 0
+                    return
+                remaining = self._heap[0][0] - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    timer = heapq.heappop(self._heap)[2]
+                    if timer.cancelled:
+                        self._cancelled = max(0, self._cancelled - 1)
+                    else:
+                        due.append(timer)
+                self.wakeups += 1
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                thread._task_num = timer._task_num  # type: ignore[attr-defined]
+                try:
+                    timer.fire()
+                except Exception:
+                    logger.exception("A timer of the timer queue failed.")
+                self.fired += 1
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._condition:
+            pending = sum(1 for _, _, timer in self._heap if not timer.cancelled)
+            return {"wakeups": self.wakeups, "fired": self.fired, "pending": pending}
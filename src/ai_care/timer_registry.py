@@ -0,0 +1,95 @@
+from __future__ import annotations
+import bisect
+import threading
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+
+class TimerRegistry(Mapping[int, Any]):
+    """Timers by id, indexed by preserve flag and task number.
+
+    Timers are grouped into buckets per (preserve flag, task number) and the task
+    numbers of each preserve flag are kept sorted, so removing all timers at or below
+    a task number only touches the buckets that are removed.
+    A timer must have its `_task_num` and `_preserve_` set before it is added.
+    Changes are made under a lock, reads go directly to the underlying dict.
+    The buckets are created with the first timer, an idle session only holds empty dicts.
+    """
+    __slots__ = ("_timers", "_buckets", "_task_nums", "_lock")
+
+    def __init__(self) -> None:
+        self._timers: dict[int, Any] = {}
+        self._buckets: dict[bool, dict[int, dict[int, Any]]] = {}
+        self._task_nums: dict[bool, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, id: int) -> Any:
+        return self._timers[id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._timers)
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._timers
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._timers!r})"
+
+    def add(self, id: int, timer: Any) -> None:
+        with self._lock:
+            self._pop(id)
+            self._add(id, timer)
+
+    def _add(self, id: int, timer: Any) -> None:
+        preserve = bool(timer._preserve_)
+        task_num = timer._task_num
+        self._timers[id] = timer
+        buckets = self._buckets.setdefault(preserve, {})
+        bucket = buckets.get(task_num)
+        if bucket is None:
+            bucket = buckets[task_num] = {}
+            bisect.insort(self._task_nums.setdefault(preserve, []), task_num)
+        bucket[id] = timer
+
+    def pop(self, id: int, default: Any = None) -> Any:
+        with self._lock:
+            timer = self._pop(id)
+        return default if timer is None else timer
+
+    def _pop(self, id: int) -> Any:
+        timer = self._timers.pop(id, None)
+        if timer is None:
+            return None
+        preserve = bool(timer._preserve_)
+        task_num = timer._task_num
+        buckets = self._buckets[preserve]
+        bucket = buckets[task_num]
+        del bucket[id]
+        if not bucket:
+            del buckets[task_num]
+            task_nums = self._task_nums[preserve]
+            del task_nums[bisect.bisect_left(task_nums, task_num)]
+        return timer
+
+    def pop_up_to(self, task_num: int, include_preserved: bool) -> list[Any]:
+        """Remove and return the timers whose task number is at or below `task_num`."""
+        removed = []
+        with self._lock:
+            for preserve in (False, True) if include_preserved else (False,):
+                self._pop_bucket_prefix(preserve, task_num, removed)
+        return removed
+
+    def _pop_bucket_prefix(self, preserve: bool, task_num: int, removed: list[Any]) -> None:
+        task_nums = self._task_nums.get(preserve)
+        if not task_nums:
+            return
+        end = bisect.bisect_right(task_nums, task_num)
+        buckets = self._buckets[preserve]
+        for bucket_task_num in task_nums[:end]:
+            for id, timer in buckets.pop(bucket_task_num).items():
+                del self._timers[id]
+                removed.append(timer)
+        del task_nums[:end]
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import inspect
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Generator, TypedDict
+
+from .abilities import Choice
+
+
+if TYPE_CHECKING:
+    from .ai_care import AICare, AICareContext, ChatContext
+
+
+logger = logging.getLogger("ai_care")
+
+
+class ToolCall(TypedDict):
+    name: str
+    # A dict, or the JSON string of one as some backends return it.
+    arguments: dict[str, Any] | str
+
+
+ToolCallingLLMMethod = Callable[
+    ["ChatContext", list["AICareContext"], list[dict[str, Any]]],
+    "ToolCall | str | Generator[str, None, None]",
+]
+
+
+_JSON_SCHEMA_TYPES: dict[str, dict[str, Any]] = {
+    "string": {"type": "string"},
+    "str": {"type": "string"},
+    "int": {"type": "integer"},
+    "integer": {"type": "integer"},
+    "float": {"type": "number"},
+    "number": {"type": "number"},
+    "float | int": {"type": "number"},
+    "int | float": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "boolean": {"type": "boolean"},
+    "list[str]": {"type": "array", "items": {"type": "string"}},
+}
+
+
+def render_ability_tools(
+    ai_care: AICare,
+    inactive_abilities_list: list[Choice] | None = None,
+) -> list[dict[str, Any]]:
+    """Render the function-calling definition of each ability, ordered by choice code.
+
+    A definition is `{"name", "description", "parameters"}`, where `parameters` is a
+    JSON schema built from the `_ability_parameter` metadata. The depth parameter of
+    `_auto_depth` abilities is filled in by AICare and is not part of it.
+    """
+    inactive_abilities_set = set() if inactive_abilities_list is None else set(inactive_abilities_list)
+    if ai_care._ask_later_count_left <= 0:
+        inactive_abilities_set.add(Choice.ASK_LATER)
+    tools = []
+    for name, ability_method in sorted(
+        ai_care.ability.abilities.items(), key=lambda item: Choice[item[0].upper()].value
+    ):
+        if Choice[name.upper()] in inactive_abilities_set:
+            continue
+        tools.append(
+            {
+                "name": name,
+                "description": ability_method._ability_description_,
+                "parameters": _render_parameters_schema(ability_method),
+            }
+        )
+    return tools
+
+
+def _render_parameters_schema(ability_method) -> dict[str, Any]:
+    annotations = {
+        name: parameter.annotation
+        for name, parameter in inspect.signature(ability_method).parameters.items()
+    }
+    properties: dict[str, Any] = {}
+    required = []
+    # The decorators are applied bottom-up, so the declared order is the reverse.
+    for param in reversed(ability_method._ability_parameters_):
+        annotation = annotations.get(param["name"])
+        schema = _JSON_SCHEMA_TYPES.get(annotation) if isinstance(annotation, str) else None
+        if schema is None:
+            schema = _JSON_SCHEMA_TYPES.get(param["param_type"], {"type": "string"})
+        schema = {**schema, "description": param["description"]}
+        if param["required"] is False:
+            schema["default"] = param["default_value"]
+        else:
+            required.append(param["name"])
+        properties[param["name"]] = schema
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def parse_tool_call(ai_care: AICare, tool_call: ToolCall) -> tuple[str, str | dict[str, Any]]:
+    """Turn a tool call into a choice code and its content, like `parse_response`.
+
+    The content is the text to say for SPEAK_NOW and the parameters dict for the
+    abilities that take parameters.
+    """
+    ai_care._stream_mode = False
+    name = tool_call.get("name", "")
+    if name not in ai_care.ability.abilities:
+        logger.warning(f"Invalid tool call {name}.")
+        ai_care._record_msg_validity(False)
+        return '00', ''
+    ai_care._record_msg_validity(True)
+    choice = Choice[name.upper()]
+    arguments = tool_call.get("arguments") or {}
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except json.JSONDecodeError:
+            # Said as is for SPEAK_NOW, reported to the LLM by `choice_execute` otherwise.
+            return choice.value, arguments
+    if choice == Choice.STAY_SILENT:
+        return choice.value, ''
+    if choice == Choice.SPEAK_NOW:
+        content = arguments.get("content", "") if isinstance(arguments, dict) else arguments
+        return choice.value, str(content)
+    if not isinstance(arguments, dict):
+        return choice.value, json.dumps(arguments, ensure_ascii=False)
+    return choice.value, arguments
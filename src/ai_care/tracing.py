@@ -0,0 +1,152 @@
+from __future__ import annotations
+import itertools
+import json
+import os
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Generator
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    task_num: int
+    start_time: float
+    end_time: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    events: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end_time is None else self.end_time - self.start_time
+
+    def add_event(self, name: str) -> None:
+        self.events.append((name, time.time()))
+
+    def to_dict(self) -> dict[str, Any]:
+        span_dict = asdict(self)
+        span_dict["duration"] = self.duration
+        return span_dict
+
+
+class SpanExporter(metaclass=ABCMeta):
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Export a finished span."""
+        ...
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = []
+
+
+class JsonlFileSpanExporter(SpanExporter):
+    """Append each finished span as a JSON line to a file."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Record each decision cycle of an AICare as a tree of spans.
+
+    All spans of a task share the trace id derived from the task number, so spans
+    recorded on timer and detector threads are linked to the same cycle. A span
+    without a parent on its own thread becomes a child of the first root span of
+    its task, or the root span of the task if there is none yet.
+
+    Args:
+        exporter: Where finished spans are sent.
+        session_id: Identifies the AICare in the trace ids, a unique one is generated by default.
+        max_tracked_tasks: The number of recent tasks whose root spans are remembered.
+    """
+
+    _session_ids = itertools.count(1)
+
+    def __init__(self, exporter: SpanExporter, session_id: str | None = None, max_tracked_tasks: int = 64) -> None:
+        self.exporter = exporter
+        self.session_id = session_id if session_id is not None else f"session-{next(self._session_ids)}"
+        self._max_tracked_tasks = max_tracked_tasks
+        self._root_spans: OrderedDict[int, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start_span(self, name: str, task_num: int, start_time: float | None = None, **attributes: Any) -> Span:
+        """Start a span, it must be finished with `end_span`.
+
+        `start_time` is a `time.monotonic()` value, so that a span can be started in the past.
+        """
+        stack = self._stack()
+        trace_id = f"{self.session_id}:{task_num}"
+        span_id = os.urandom(8).hex()
+        with self._lock:
+            if stack and stack[-1].trace_id == trace_id:
+                parent_id: str | None = stack[-1].span_id
+            else:
+                parent_id = self._root_spans.get(task_num)
+            if parent_id is None:
+                self._root_spans[task_num] = span_id
+                while len(self._root_spans) > self._max_tracked_tasks:
+                    self._root_spans.popitem(last=False)
+        wall_start = time.time() if start_time is None else time.time() - (time.monotonic() - start_time)
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=span_id,
+            parent_id=parent_id,
+            task_num=task_num,
+            start_time=wall_start,
+            attributes=attributes,
+        )
+
+    def end_span(self, span: Span) -> None:
+        span.end_time = time.time()
+        self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, task_num: int, **attributes: Any) -> Generator[Span, None, None]:
+        span = self.start_span(name, task_num, **attributes)
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            stack.pop()
+            self.end_span(span)
+
+    def record_span(self, name: str, task_num: int, start_time: float, **attributes: Any) -> None:
+        """Record a span that started at the `time.monotonic()` value `start_time` and ends now."""
+        self.end_span(self.start_span(name, task_num, start_time=start_time, **attributes))
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import logging
+import math
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from typing import TYPE_CHECKING, Any
+
+from .ai_care import AICareThread
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .ai_care import AICare, AICareContext
+    from .sessions import AICareSessions
+
+
+logger = logging.getLogger("ai_care")
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Batch detectors require numpy, install it with `pip install ai-care[numpy]`.") from e
+    return numpy
+
+
+SECONDS_SINCE_LAST_CHAT = "seconds_since_last_chat"
+
+
+class BatchDetector(metaclass=ABCMeta):
+    """A detector whose condition is evaluated over the sessions at once with numpy.
+
+    `condition` receives one array per input, with one element per session: the
+    numeric readings of the `sensors` and `SECONDS_SINCE_LAST_CHAT`. A missing value, such
+    as a session without the sensor, with a non-numeric reading or that has never
+    chatted, is NaN. It returns
+    an array of booleans, and the sessions where it is True are triggered with
+    the messages returned by `messages`.
+    """
+
+    def __init__(self, name: str, sensors: list[str] | None = None) -> None:
+        self.name = name
+        self.sensors = list(sensors or [])
+
+    @abstractmethod
+    def condition(self, inputs: dict[str, np.ndarray]) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def messages(self, session_id: str, values: dict[str, float]) -> list[AICareContext]:
+        """Return the messages that trigger the session, given its input values."""
+        ...
+
+
+def _reading(ai_care: AICare, sensor: str) -> float:
+    if sensor not in ai_care.sensors:
+        return math.nan
+    try:
+        return float(ai_care.get_sensor_data(sensor))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class BatchDetectorRunner:
+    """Evaluate batch detectors over the resident sessions of an `AICareSessions`.
+
+    Use `evaluate` on your own schedule, or `start` to evaluate every `interval` seconds.
+    """
+
+    def __init__(self, sessions: AICareSessions) -> None:
+        self.sessions = sessions
+        self.detectors: dict[str, BatchDetector] = {}
+        self._stop: threading.Event | None = None
+        self.evaluations: int = 0
+        self.triggers: int = 0
+
+    def register_detector(self, detector: BatchDetector) -> None:
+        if detector.name in self.detectors:
+            raise ValueError("A batch detector with the same name already exists.")
+        _import_numpy()
+        self.detectors[detector.name] = detector
+
+    def _gather(self, session_list: list[tuple[str, AICare]], sensors: set[str]) -> dict[str, np.ndarray]:
+        numpy = _import_numpy()
+        now = time.monotonic()
+        inputs = {
+            SECONDS_SINCE_LAST_CHAT: numpy.fromiter(
+                (
+                    math.nan if ai_care._last_chat_time is None else now - ai_care._last_chat_time
+                    for _, ai_care in session_list
+                ),
+                dtype=float,
+                count=len(session_list),
+            )
+        }
+        for sensor in sensors:
+            inputs[sensor] = numpy.fromiter(
+                (
+                    _reading(ai_care, sensor) for _, ai_care in session_list
+                ),
+                dtype=float,
+                count=len(session_list),
+            )
+        return inputs
+
+    def evaluate(self) -> dict[str, list[str]]:
+        """Evaluate every detector once and return the triggered session ids per detector."""
+        numpy = _import_numpy()
+        session_list = self.sessions.items()
+        sensors = {sensor for detector in self.detectors.values() for sensor in detector.sensors}
+        inputs = self._gather(session_list, sensors)
+        triggered: dict[str, list[str]] = {}
+        for detector in self.detectors.values():
+            detector_inputs = {name: inputs[name] for name in (SECONDS_SINCE_LAST_CHAT, *detector.sensors)}
+            with numpy.errstate(invalid="ignore"):
+                fired = numpy.flatnonzero(numpy.asarray(detector.condition(detector_inputs), dtype=bool))
+            triggered[detector.name] = []
+            for index in fired:
+                session_id, ai_care = session_list[index]
+                values = {name: float(array[index]) for name, array in detector_inputs.items()}
+                self._trigger(ai_care, detector.messages(session_id, values))
+                triggered[detector.name].append(session_id)
+            self.triggers += len(fired)
+        self.evaluations += 1
+        return triggered
+
+    def _trigger(self, ai_care: AICare, messages_list: list[AICareContext]) -> None:
+        # Each triggered session asks on its own thread, like a released detector.
+        ai_care_thread = AICareThread(target=ai_care.trigger, kwargs={"messages_list": messages_list}, daemon=True)
+        ai_care_thread._task_num = ai_care._get_task_num()
+        ai_care_thread.start()
+
+    def start(self, interval: float) -> None:
+        """Evaluate the detectors every `interval` seconds on a background thread.
+
+        A failed evaluation is logged and the next one runs on schedule.
+        """
+        self.stop()
+        stop = self._stop = threading.Event()
+        def run() -> None:
+            while not stop.wait(interval):
+                try:
+                    self.evaluate()
+                except Exception:
+                    logger.exception("An evaluation of the batch detectors failed.")
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {"evaluations": self.evaluations, "triggers": self.triggers}
@@ -73,7 +73,7 @@ def test_detect_env(ai_care: AICare):
     # Assert
     assert ai_care.ask.called
     _, called_kwargs = ai_care.ask.call_args
-    assert "The results of the sensor are as follows: {'mock_sensor': 'mock_sensor value'}" in called_kwargs["messages_list"][0]["content"]
+    assert 'The results of the sensor are as follows: {"mock_sensor":"mock_sensor value"}' in called_kwargs["messages_list"][0]["content"]
 
     # Action
     ai_care.ability.abilities["detect_env"](delay=0.1, sensors=["mock_sensor_not_existed"], _depth_left=1)
@@ -83,6 +83,23 @@ def test_detect_env(ai_care: AICare):
     _, called_kwargs = ai_care.ask.call_args
     assert "There are no {'mock_sensor_not_existed'} sensor." in called_kwargs["messages_list"][0]["content"]
 
+def test_detect_env_trend(ai_care: AICare):
+    # Setup
+    ai_care.ask = Mock()
+    ai_care.register_sensor("temperature", lambda: 21.0, "The temperature.", history=8)
+    ai_care.record_sensor_reading("temperature", 18.0, timestamp=time.monotonic() - 60)
+
+    # Action
+    ai_care.ability.abilities["detect_env"](delay=0, sensors=["temperature"], _depth_left=1)
+    time.sleep(0.1)
+
+    # Assert
+    _, called_kwargs = ai_care.ask.call_args
+    content = called_kwargs["messages_list"][0]["content"]
+    assert 'The results of the sensor are as follows: {"temperature":21.0}.' in content
+    assert 'The recent trends of the sensors are as follows: {"temperature":{"age":' in content
+    assert '"count":2,"delta":3.0,"last":21.0,"max":21.0,"min":18.0,"slope":0.05}}.' in content
+
 def test_release_detector(ai_care: AICare):
     # Setup
     ai_care.ask = Mock()
@@ -1,8 +1,10 @@
 import pytest
+import threading
 import time
 from unittest.mock import Mock, patch
 
-from ai_care import AICare, Detector
+from ai_care import AICare, Detector, DecisionCache
+from ai_care.ai_care import AICareReschedulableTimer
 
 
 @pytest.fixture
@@ -151,6 +153,136 @@ def test_chat_update(ai_care: AICare):
     assert ai_care.timers == {}
     assert mock_ask.called
 
+def test_speculative_chat_update(ai_care: AICare):
+    # Setup
+    to_llm_method = Mock()
+    to_llm_method.return_value = "AA000202:hi"
+    to_user_method = Mock()
+    ai_care.register_to_llm_method(to_llm_method)
+    ai_care.register_to_user_method(to_user_method)
+    ai_care.set_config(key="delay", value=0.3)
+    ai_care.set_config(key="speculative", value=True)
+    ai_care._latency_stats.record_llm_call(0.2)
+
+    # Action
+    ai_care.chat_update(chat_context=[])
+    time.sleep(0.2)
+
+    # Assert
+    assert to_llm_method.called
+    assert not to_user_method.called
+    time.sleep(0.2)
+    to_user_method.assert_called_with("hi")
+    assert ai_care.latency_stats["speculative_asks"] == 1
+    assert ai_care.latency_stats["speculative_wasted"] == 0
+
+    # Action
+    ai_care.chat_update(chat_context=[])
+    time.sleep(0.2)
+    ai_care.chat_update(chat_context=[])
+    time.sleep(0.15)
+
+    # Assert
+    assert ai_care.latency_stats["speculative_wasted"] == 1
+    assert to_user_method.call_count == 1
+
+def test_reschedulable_timer():
+    # Setup
+    callback = Mock()
+    timer = AICareReschedulableTimer(function=callback)
+
+    # Action
+    timer.reschedule(interval=0.1, task_num=1, kwargs={"n": 1})
+    record = timer._timer
+    time.sleep(0.05)
+    timer.reschedule(interval=0.1, task_num=2, kwargs={"n": 2})
+    time.sleep(0.07)
+
+    # Assert
+    assert not callback.called
+    assert record.cancelled
+    time.sleep(0.05)
+    callback.assert_called_once_with(2, {"n": 2})
+    assert not timer.armed
+
+    # Action
+    timer.reschedule(interval=0.1, task_num=3)
+    record = timer._timer
+    timer.cancel()
+    time.sleep(0.15)
+
+    # Assert
+    assert callback.call_count == 1
+    assert record.cancelled
+    assert not timer.armed
+
+def test_chat_update_reschedules_in_place(ai_care: AICare):
+    # Setup
+    mock_ask = Mock()
+    ai_care.ask = mock_ask
+    ai_care.set_config(key="delay", value=0.1)
+
+    # Action
+    threads_before = threading.active_count()
+    ai_care.chat_update(chat_context=[])
+    for _ in range(10):
+        ai_care.chat_update(chat_context=[])
+
+    # Assert
+    # No thread waits for the deadline of a session.
+    assert threading.active_count() <= threads_before + 1
+    time.sleep(0.2)
+    assert mock_ask.call_count == 1
+    _, called_kwargs = mock_ask.call_args
+    assert "Here are the choices you can make" in called_kwargs["messages_list"][0]["content"]
+
+def test_chat_update_many(ai_care: AICare):
+    # Setup
+    mock_ask = Mock()
+    ai_care.ask = mock_ask
+    ai_care.set_config(key="delay", value=0.1)
+    now = time.time()
+
+    # Action
+    ai_care.chat_update_many([(["second"], now - 1), (["first"], now - 3), (["third"], None)])
+    task_num = ai_care._task_num
+    time.sleep(0.2)
+
+    # Assert
+    assert ai_care.chat_context == ["third"]
+    assert [round(interval) for interval in ai_care._chat_intervals] == [2, 1]
+    assert task_num == 2
+    assert mock_ask.call_count == 1
+
+def test_chat_update_many_stale(ai_care: AICare):
+    # Setup
+    mock_ask = Mock()
+    ai_care.ask = mock_ask
+    ai_care.set_config(key="delay", value=0.1)
+    ai_care.chat_update(chat_context=["first"])
+    last_chat_time = ai_care._last_chat_time
+    task_num = ai_care._task_num
+    now = time.time()
+
+    # Action
+    ai_care.chat_update_many([(["stale"], now - 10)])
+
+    # Assert
+    assert ai_care._chat_intervals == []
+    assert ai_care._last_chat_time == last_chat_time
+    assert ai_care.chat_context == ["first"]
+    assert ai_care._task_num == task_num
+
+    # Action
+    ai_care.chat_update_many([(["second"], None), (["stale"], now - 10)])
+    time.sleep(0.2)
+
+    # Assert
+    assert ai_care.chat_context == ["second"]
+    assert len(ai_care._chat_intervals) == 1
+    assert ai_care._task_num == task_num + 1
+    assert mock_ask.call_count == 1
+
 def test_reset(ai_care: AICare):
     # Setup
     mock_task = Mock()
@@ -186,6 +318,31 @@ def test_check_task_validity(ai_care: AICare):
     # Assert
     assert tasks_validity == [False, True]
 
+def test_cancel_stream_to_user(ai_care: AICare):
+    # Setup
+    received = []
+    def to_user_method(message):
+        for chunk in message:
+            received.append(chunk)
+    def slow_stream():
+        for i in range(10):
+            time.sleep(0.05)
+            yield str(i)
+    ai_care.register_to_user_method(to_user_method)
+
+    # Action
+    ai_care.set_timer(interval=0, function=ai_care.to_user_method, args=(slow_stream(),))
+    time.sleep(0.13)
+    start_time = time.monotonic()
+    ai_care.cancel_current_task()
+    cancel_time = time.monotonic() - start_time
+    time.sleep(0.2)
+
+    # Assert
+    assert cancel_time < 0.05
+    assert 1 <= len(received) <= 3
+    assert received == [str(i) for i in range(len(received))]
+
 def test_ask(ai_care: AICare):
     # Setup
     mock_to_llm_method = Mock()
@@ -213,9 +370,27 @@ def test_ask(ai_care: AICare):
         ai_care=ai_care,
         choice_code="01",
         content="",
-        depth_left=ai_care._config["ask_depth"]
+        depth_left=ai_care._config["ask_depth"],
+        source="llm",
     )
 
+def test_ask_with_decision_cache(ai_care: AICare):
+    # Setup
+    mock_to_llm_method = Mock()
+    mock_to_llm_method.return_value = "AA000101:"
+    ai_care.register_to_llm_method(mock_to_llm_method)
+    decision_cache = DecisionCache()
+    ai_care.register_decision_cache(decision_cache, chat_context_fingerprint=lambda chat_context: "fingerprint")
+
+    # Action
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "prompt"}])
+    ai_care._ask_context = []
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "prompt"}])
+
+    # Assert
+    assert mock_to_llm_method.call_count == 1
+    assert decision_cache.stats["hits"] == 1
+
 def test_trigger(ai_care: AICare):
     # Setup
     mock_ask = Mock()
@@ -327,3 +502,26 @@ def test_set_cyclic_detection(ai_care: AICare):
 
     # Assert
     assert mock_release_detector_method_2.call_count == 2
+
+def test_scheduled_ask_messages(ai_care: AICare):
+    # Setup
+    received_messages = []
+    def to_llm_method(chat_context, messages):
+        received_messages.append(messages)
+        return "AA000101:"
+    ai_care.register_to_llm_method(to_llm_method)
+    ai_care.set_config("delay", 0)
+
+    # Action
+    ai_care.chat_update(None)
+    time.sleep(0.1)
+    ai_care.chat_update(None)
+    time.sleep(0.1)
+
+    # Assert
+    assert len(received_messages) == 2
+    first, second = received_messages
+    assert first[0]["cache_key"] == second[0]["cache_key"]
+    assert first[0]["content"] == second[0]["content"]
+    assert "cache_key" not in first[1]
+    assert "FACTS" in first[1]["content"]
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from ai_care import AICare, AICareSessions
+from ai_care.batching import BatchLLMDispatcher
+
+
+def test_batch_dispatcher():
+    # Setup
+    batches = []
+    def batch_to_llm_method(requests):
+        batches.append(requests)
+        return [f"response to {chat_context}" for chat_context, _ in requests]
+    dispatcher = BatchLLMDispatcher(batch_to_llm_method, max_batch_size=3, max_wait=0.05)
+    results = {}
+    def submit(i):
+        results[i] = dispatcher.submit(i, [])
+
+    # Action
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert results == {i: f"response to {i}" for i in range(5)}
+    assert sorted(len(batch) for batch in batches) == [2, 3]
+    assert dispatcher.stats == {"batches": 2, "requests": 5, "mean_batch_size": 2.5}
+
+def test_batch_dispatcher_error():
+    # Setup
+    dispatcher = BatchLLMDispatcher(lambda requests: [], max_wait=0)
+
+    # Assert
+    with pytest.raises(ValueError):
+        dispatcher.submit(None, [])
+
+def test_sessions_batch_to_llm_method():
+    # Setup
+    batches = []
+    def batch_to_llm_method(requests):
+        batches.append(requests)
+        return ["AA000101:" for _ in requests]
+    sessions = AICareSessions(lambda session_id: AICare())
+    dispatcher = sessions.register_batch_to_llm_method(batch_to_llm_method, max_wait=0.1)
+
+    # Action
+    threads = [
+        threading.Thread(target=sessions.get(session_id).ask, kwargs={"messages_list": []})
+        for session_id in ["a", "b", "c"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert len(batches) == 1
+    assert len(batches[0]) == 3
+    assert dispatcher.stats["requests"] == 3
+    assert all(session._choice_history[-1].name == "STAY_SILENT" for session in map(sessions.get, "abc"))
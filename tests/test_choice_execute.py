@@ -30,6 +30,26 @@ def test_choice_execute_parse_json_error():
     _, called_kwargs = mock_ai_care.ask.call_args
     assert "Failed to correctly parse the parameter." in called_kwargs["messages_list"][0]["content"]
 
+def test_choice_execute_error_messages_not_shared():
+    # Setup
+    mock_ai_care = Mock()
+    mock_ai_care.ability.abilities = {
+        "stay_silent": Mock(),
+        "speak_now": Mock(),
+        "speak_after": Mock()
+    }
+
+    # Action
+    choice_execute(ai_care=mock_ai_care, choice_code="03", content="{wrong json string", depth_left=1)
+    _, called_kwargs = mock_ai_care.ask.call_args
+    # As an adapter that converts the messages for its LLM in place.
+    called_kwargs["messages_list"][0]["role"] = "user"
+    choice_execute(ai_care=mock_ai_care, choice_code="03", content="{wrong json string", depth_left=1)
+
+    # Assert
+    _, called_kwargs = mock_ai_care.ask.call_args
+    assert called_kwargs["messages_list"][0]["role"] == "ai_care"
+
 def test_choice_execute_param_not_dict_error():
     # Setup
     mock_ai_care = Mock()
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from ai_care import AICare
+from ai_care.coalesce import ChunkCoalescer
+from ai_care.parse_response import parse_response
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def test_coalesce_by_size_and_sentence():
+    # Setup
+    coalescer = ChunkCoalescer(max_chars=5, max_delay=None, sentence_boundary=True)
+    stream = (x for x in ["He", "llo", " wo", "rld", ". ", "Bye", "!", "ok"])
+
+    # Action
+    chunks = list(coalescer(stream))
+
+    # Assert
+    assert chunks == ["Hello", " world", ". ", "Bye!", "ok"]
+    assert coalescer.stats["chunks_in"] == 8
+    assert coalescer.stats["chunks_out"] == 5
+
+def test_coalesce_by_time():
+    # Setup
+    coalescer = ChunkCoalescer(max_chars=None, max_delay=0.05, sentence_boundary=False)
+    def slow_stream():
+        yield "a"
+        yield "b"
+        time.sleep(0.15)
+        yield "c"
+    received = []
+
+    # Action
+    start_time = time.monotonic()
+    for chunk in coalescer(slow_stream()):
+        received.append((chunk, time.monotonic() - start_time))
+
+    # Assert
+    assert [chunk for chunk, _ in received] == ["ab", "c"]
+    assert received[0][1] < 0.12
+
+def test_coalesce_keeps_transcript(ai_care: AICare):
+    # Setup
+    chunks = ["AA000202:", "Hi", " there", ",", " how", " are", " you", "?"]
+    coalescer = ChunkCoalescer(max_chars=8, max_delay=0.03)
+    ai_care.register_chunk_coalescer(coalescer)
+    received = []
+    ai_care.register_to_user_method(lambda message: received.extend(message))
+
+    # Action
+    _, content = parse_response(ai_care, (x for x in chunks))
+    ai_care.to_user_method(content)
+
+    # Assert
+    assert "".join(received) == "Hi there, how are you?"
+    assert len(received) < len(chunks) - 1
+    assert ai_care._ask_context[-1]["content"] == "Hi there, how are you?"
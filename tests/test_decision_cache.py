@@ -0,0 +1,58 @@
+import time
+
+from ai_care.abilities import Choice
+from ai_care.decision_cache import DecisionCache
+
+
+def test_make_key():
+    # Setup
+    cache = DecisionCache(time_bucket=30)
+    messages1 = [{"role": "ai_care", "content": "It has been 31.5 seconds since the last time."}]
+    messages2 = [{"role": "ai_care", "content": "It has been 45.25 seconds since the last time."}]
+    messages3 = [{"role": "ai_care", "content": "It has been 61.0 seconds since the last time."}]
+
+    # Assert
+    assert cache.make_key(messages1, "ctx") == cache.make_key(messages2, "ctx")
+    assert cache.make_key(messages1, "ctx") != cache.make_key(messages3, "ctx")
+    assert cache.make_key(messages1, "ctx") != cache.make_key(messages1, "other ctx")
+
+def test_cacheable_choices():
+    # Setup
+    cache = DecisionCache(cacheable_choices=[Choice.STAY_SILENT])
+
+    # Action
+    stored_silent = cache.put("key1", "01", "")
+    stored_speak = cache.put("key2", "02", "hello")
+    stored_invalid = cache.put("key3", "99", "")
+
+    # Assert
+    assert stored_silent
+    assert not stored_speak
+    assert not stored_invalid
+    assert cache.get("key1") == ("01", "")
+    assert cache.get("key2") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+def test_lru_and_ttl_eviction():
+    # Setup
+    cache = DecisionCache(maxsize=2, ttl=0.1)
+
+    # Action
+    cache.put("key1", "01", "")
+    cache.put("key2", "01", "")
+    cache.get("key1")
+    cache.put("key3", "01", "")
+
+    # Assert
+    assert cache.get("key2") is None
+    assert cache.get("key1") == ("01", "")
+    assert cache.stats["evictions"] == 1
+
+    # Action
+    time.sleep(0.15)
+
+    # Assert
+    assert cache.get("key1") is None
+    assert cache.stats["evictions"] == 2
+    assert cache.stats["size"] == 1
@@ -0,0 +1,80 @@
+import gzip
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare
+from ai_care.decision_log import DecisionLogger
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def read_events(path, compress=True) -> list[dict]:
+    opener = gzip.open if compress else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_decision_logger_batches(tmp_path):
+    # Setup
+    path = tmp_path / "decisions.jsonl.gz"
+    decision_logger = DecisionLogger(path, batch_size=3, flush_interval=0.05)
+
+    # Action
+    for i in range(7):
+        decision_logger.emit({"event": "test", "i": i})
+    time.sleep(0.2)
+    decision_logger.emit({"event": "test", "i": 7})
+    decision_logger.close()
+
+    # Assert
+    assert [event["i"] for event in read_events(path)] == list(range(8))
+    assert decision_logger.stats["written"] == 8
+    assert not decision_logger.emit({"event": "after close"})
+
+def test_decision_logger_drops_when_full(tmp_path):
+    # Setup
+    path = tmp_path / "decisions.jsonl"
+    decision_logger = DecisionLogger(path, max_queue_size=2, compress=False)
+    decision_logger._queue.put(None)  # Stop the writer so that the queue stays full.
+    time.sleep(0.05)
+
+    # Action
+    results = [decision_logger.emit({"event": "test"}) for _ in range(4)]
+
+    # Assert
+    assert results == [True, True, False, False]
+    assert decision_logger.stats["dropped"] == 2
+
+def test_ai_care_decision_events(ai_care: AICare, tmp_path):
+    # Setup
+    path = tmp_path / "decisions.jsonl.gz"
+    decision_logger = DecisionLogger(path, flush_interval=0.01)
+    ai_care.register_decision_logger(decision_logger, session_id="session")
+    ai_care.register_to_llm_method(Mock(return_value='AA000606:{"delay": 10}'))
+
+    # Action
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "prompt"}])
+    ai_care.set_timer(interval=0.02, function=ai_care.ask, args=([],))
+    ai_care.cancel_current_task()
+    time.sleep(0.05)
+    decision_logger.close()
+
+    # Assert
+    events = read_events(path)
+    decision = events[0]
+    assert decision["event"] == "decision"
+    assert decision["session"] == "session"
+    assert decision["source"] == "llm"
+    assert decision["choice"] == "ASK_LATER"
+    assert decision["valid"] is True
+    assert decision["params"] == '{"delay": 10}'
+    assert decision["retry"] is False
+    assert len(decision["prompt_hash"]) == 16
+    assert events[1]["event"] == "cancelled"
+    assert events[1]["stage"] == "before_decision"
@@ -0,0 +1,44 @@
+import time
+
+from ai_care import AICare
+from ai_care.delay_policy import PercentileDelayPolicy
+
+
+def test_percentile_delay_policy():
+    # Setup
+    policy = PercentileDelayPolicy(percentile=0.5, margin=1, min_delay=2, max_delay=20, min_samples=3)
+
+    # Assert
+    assert policy.next_delay([1, 2], fixed_delay=100) == 100
+    assert policy.next_delay([1, 3, 5], fixed_delay=100) == 4
+    assert policy.next_delay([0, 0, 0], fixed_delay=100) == 2
+    assert policy.next_delay([50, 60, 70], fixed_delay=100) == 20
+
+def test_delay_policy_stats():
+    # Setup
+    policy = PercentileDelayPolicy()
+
+    # Action
+    policy.record(interval=8, delay=10, fixed_delay=100)
+    policy.record(interval=12, delay=10, fixed_delay=100)
+    policy.record(interval=150, delay=10, fixed_delay=100)
+
+    # Assert
+    assert policy.stats == {"intervals": 3, "fixed_asks": 1, "adaptive_asks": 2, "avoided_asks": -1}
+
+def test_chat_update_with_delay_policy():
+    # Setup
+    ai_care = AICare()
+    policy = PercentileDelayPolicy(percentile=1, margin=0, min_delay=0, min_samples=2)
+    ai_care.register_delay_policy(policy)
+    now = time.time()
+
+    # Action
+    ai_care.chat_update_many([(None, now - 30), (None, now - 25), (None, now - 21), (None, now - 5)])
+
+    # Assert
+    # The delays are 100, 100 (not enough samples yet) and 5 seconds for the intervals of 5, 4 and 16 seconds.
+    assert policy.stats == {"intervals": 3, "fixed_asks": 0, "adaptive_asks": 1, "avoided_asks": -1}
+    assert round(ai_care._pending_delay) == 16
+    assert ai_care._ask_timer.armed
+    ai_care.reset()
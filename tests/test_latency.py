@@ -0,0 +1,33 @@
+import pytest
+
+from ai_care.latency import LatencyStats
+
+
+def test_latency_stats():
+    # Setup
+    stats = LatencyStats(alpha=0.5)
+
+    # Assert
+    assert stats.predicted_latency == 0.0
+
+    # Action
+    stats.record_llm_call(2.0)
+    stats.record_llm_call(4.0)
+    stats.record_speculation(wasted=False)
+    stats.record_speculation(wasted=True)
+    stats.record_speculation(wasted=True)
+    stats.record_speculation(wasted=False)
+
+    # Assert
+    assert stats.predicted_latency == 3.0
+    stats_dict = stats.as_dict()
+    assert stats_dict["llm_calls"] == 2
+    assert stats_dict["mean_latency"] == 3.0
+    assert stats_dict["max_latency"] == 4.0
+    assert stats_dict["speculative_asks"] == 4
+    assert stats_dict["speculative_wasted"] == 2
+    assert stats_dict["speculative_waste_ratio"] == 0.5
+
+def test_latency_stats_invalid_alpha():
+    with pytest.raises(ValueError):
+        LatencyStats(alpha=0)
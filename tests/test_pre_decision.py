@@ -0,0 +1,134 @@
+import pytest
+
+from ai_care import AICare
+from ai_care.abilities import Choice
+from ai_care.pre_decision import LogisticPreDecider, PreDecisionFeatures, ThresholdPreDecider, collect_features
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def make_features(**kwargs) -> PreDecisionFeatures:
+    features: PreDecisionFeatures = {
+        "routine": True,
+        "chat_intervals": [],
+        "mean_chat_interval": None,
+        "median_chat_interval": None,
+        "last_chat_interval": None,
+        "seconds_since_last_chat": None,
+        "sensor_data": {},
+        "recent_choices": [],
+    }
+    features.update(kwargs)  # type: ignore
+    return features
+
+def test_collect_features(ai_care: AICare):
+    # Setup
+    ai_care._chat_intervals = [10.0, 20.0, 60.0]
+    ai_care.register_sensor(name="sensor", function=lambda: 42, annotation="sensor annotation")
+    ai_care._choice_history.append(Choice.STAY_SILENT)
+
+    # Action
+    features = collect_features(ai_care, sensors=["sensor"], routine=True)
+
+    # Assert
+    assert features["routine"] is True
+    assert features["mean_chat_interval"] == 30.0
+    assert features["median_chat_interval"] == 20.0
+    assert features["last_chat_interval"] == 60.0
+    assert features["seconds_since_last_chat"] is None
+    assert features["sensor_data"] == {"sensor": 42}
+    assert features["recent_choices"] == [Choice.STAY_SILENT]
+
+def test_threshold_pre_decider():
+    # Setup
+    pre_decider = ThresholdPreDecider(silent_streak=2, slow_chatter_ratio=1.5)
+
+    # Assert
+    assert pre_decider.decide(make_features(recent_choices=[Choice.STAY_SILENT] * 2)) == Choice.STAY_SILENT
+    assert pre_decider.decide(make_features(recent_choices=[Choice.SPEAK_NOW, Choice.STAY_SILENT])) is None
+    assert pre_decider.decide(
+        make_features(median_chat_interval=200.0, seconds_since_last_chat=100.0)
+    ) == Choice.STAY_SILENT
+    assert pre_decider.decide(make_features(median_chat_interval=120.0, seconds_since_last_chat=100.0)) is None
+    assert pre_decider.decide(
+        make_features(routine=False, recent_choices=[Choice.STAY_SILENT] * 2)
+    ) is None
+
+def test_logistic_pre_decider_fit():
+    # Setup
+    silent_features = make_features(recent_choices=[Choice.STAY_SILENT] * 4)
+    speak_features = make_features(recent_choices=[Choice.SPEAK_NOW] * 4)
+    samples = [(silent_features, Choice.STAY_SILENT), (speak_features, Choice.SPEAK_NOW)] * 10
+
+    # Action
+    pre_decider = LogisticPreDecider.fit(samples, threshold=0.7, epochs=500, learning_rate=1.0)
+
+    # Assert
+    assert pre_decider.decide(silent_features) == Choice.STAY_SILENT
+    assert pre_decider.decide(speak_features) is None
+    with pytest.raises(ValueError):
+        LogisticPreDecider(weights=[1.0])
+
+def test_pre_decider_in_ask(ai_care: AICare):
+    # Setup
+    to_llm_method_calls = []
+    def to_llm_method(chat_context, messages_list):
+        to_llm_method_calls.append(messages_list)
+        return "AA000101:"
+    ai_care.register_to_llm_method(to_llm_method)
+    pre_decider = ThresholdPreDecider(silent_streak=1)
+    ai_care.register_pre_decider(pre_decider)
+
+    # Action
+    ai_care.ask(messages_list=[], _routine=True)
+    ai_care.ask(messages_list=[], _routine=True)
+    ai_care.ask(messages_list=[])
+
+    # Assert
+    assert len(to_llm_method_calls) == 2
+    assert pre_decider.stats == {"local_decisions": 1, "llm_decisions": 2, "local_ratio": 1 / 3}
+
+def test_pre_decider_silent_streak_ends(ai_care: AICare):
+    # Setup
+    to_llm_method_calls = []
+    def to_llm_method(chat_context, messages_list):
+        to_llm_method_calls.append(messages_list)
+        return "AA000101:" if len(to_llm_method_calls) <= 2 else "AA000202:Hello"
+    said = []
+    ai_care.register_to_llm_method(to_llm_method)
+    ai_care.register_to_user_method(said.append)
+    pre_decider = ThresholdPreDecider(silent_streak=2)
+    ai_care.register_pre_decider(pre_decider)
+
+    # Action
+    for _ in range(8):
+        ai_care.ask(messages_list=[], _routine=True)
+
+    # Assert
+    # Two silences of the LLM, three local ones, then the LLM again, which now speaks.
+    assert len(to_llm_method_calls) == 5
+    assert said == ["Hello"] * 3
+    assert ai_care._choice_history.sources[-4:] == ["pre_decision", "llm", "llm", "llm"]
+    assert collect_features(ai_care)["recent_choices"] == [Choice.STAY_SILENT] * 2 + [Choice.SPEAK_NOW] * 3
+
+def test_pre_decider_reads_sensors_lazily(ai_care: AICare):
+    # Setup
+    sensor_reads = []
+    ai_care.register_sensor(name="sensor", function=lambda: sensor_reads.append(True) or 42, annotation="sensor annotation")
+    ai_care.register_to_llm_method(lambda chat_context, messages_list: "AA000101:")
+    pre_decider = ThresholdPreDecider(silent_streak=1, sensors=["sensor"])
+    ai_care.register_pre_decider(pre_decider)
+
+    # Action
+    ai_care.ask(messages_list=[])
+    ai_care.ask(messages_list=[], _routine=True)
+
+    # Assert
+    assert pre_decider.stats["local_decisions"] == 1
+    assert sensor_reads == []
+    assert collect_features(ai_care, sensors=["sensor"])["sensor_data"]["sensor"] == 42
+    assert sensor_reads == [True]
@@ -0,0 +1,82 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare
+from ai_care.process_pool import ProcessDetector, ProcessExecutor
+
+
+def _pid() -> int:
+    return os.getpid()
+
+def _reverse(data: bytes) -> bytes:
+    return data[::-1]
+
+def _count_zeros(data: bytes) -> int:
+    return data.count(0)
+
+
+class ZerosDetector(ProcessDetector):
+    def __init__(self) -> None:
+        super().__init__(name="zeros", annotation="Counts the zeros.", function=_count_zeros)
+        self.frame = bytes(2048)
+
+    def inputs(self) -> tuple:
+        return (self.frame,)
+
+    def handle_result(self, result: int) -> bool:
+        assert self.ai_care is not None
+        if result > 1000:
+            self.ai_care.trigger(messages_list=[{"role": "ai_care", "content": f"{result} zeros."}])
+            return True
+        return False
+
+
+@pytest.fixture(scope="module")
+def process_executor():
+    process_executor = ProcessExecutor(max_workers=1, shared_memory_threshold=1024)
+    yield process_executor
+    process_executor.shutdown()
+
+def test_shared_memory_payloads(process_executor: ProcessExecutor):
+    # Setup
+    small = b"abc"
+    large = bytes(range(256)) * 8
+
+    # Assert
+    assert process_executor.run(_reverse, small) == b"cba"
+    assert process_executor.run(_reverse, large) == large[::-1]
+
+def test_process_sensor(ai_care: AICare, process_executor: ProcessExecutor):
+    # Setup
+    ai_care.register_sensor("pid", _pid, "The process id.", in_process=True)
+    ai_care.register_sensor("local_pid", _pid, "The process id.")
+
+    # Action
+    ai_care.register_process_executor(process_executor)
+
+    # Assert
+    assert ai_care.get_sensor_data("pid") != os.getpid()
+    assert ai_care.get_sensor_data("local_pid") == os.getpid()
+
+def test_process_detector(ai_care: AICare, process_executor: ProcessExecutor):
+    # Setup
+    detector = ZerosDetector()
+    ai_care.register_detector(detector)
+    ai_care.trigger = Mock()
+
+    # Action
+    ai_care.register_process_executor(process_executor)
+    triggered = detector.detect()
+
+    # Assert
+    assert triggered
+    ai_care.trigger.assert_called_once_with(messages_list=[{"role": "ai_care", "content": "2048 zeros."}])
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
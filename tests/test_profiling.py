@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import signal
+import sys
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare, Detector
+from ai_care.profiling import Profiler, QuantileSketch
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def test_quantile_sketch():
+    # Setup
+    sketch = QuantileSketch(relative_accuracy=0.01)
+
+    # Action
+    for value in range(1, 1001):
+        sketch.add(value / 1000)
+    sketch.add(0)
+
+    # Assert
+    assert sketch.count == 1001
+    assert sketch.quantile(0) == 0.0
+    assert sketch.quantile(0.5) == pytest.approx(0.5, rel=0.02)
+    assert sketch.quantile(0.99) == pytest.approx(0.99, rel=0.02)
+    assert len(sketch._buckets) < 400
+
+def test_profiler():
+    # Setup
+    profiler = Profiler()
+
+    # Action
+    profiler.record("phase", 1.0)
+    profiler.record("phase", 3.0)
+    with profiler.measure("measured"):
+        pass
+    output = io.StringIO()
+    profiler.dump(output)
+
+    # Assert
+    snapshot = profiler.snapshot()
+    assert snapshot["phase"]["count"] == 2
+    assert snapshot["phase"]["total"] == 4.0
+    assert snapshot["phase"]["mean"] == 2.0
+    assert snapshot["measured"]["count"] == 1
+    assert json.loads(output.getvalue()) == snapshot
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGUSR1 is not available on Windows.")
+def test_profiler_signal_handler():
+    # Setup
+    profiler = Profiler()
+    profiler.record("phase", 1.0)
+    output = io.StringIO()
+
+    # Action
+    previous_handler = profiler.install_signal_handler(file=output)
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        time.sleep(0.05)
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
+
+    # Assert
+    assert json.loads(output.getvalue())["phase"]["count"] == 1
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGUSR1 is not available on Windows.")
+def test_profiler_signal_during_record():
+    # Setup
+    profiler = Profiler()
+    profiler.record("phase", 1.0)
+    output = io.StringIO()
+
+    # Action
+    previous_handler = profiler.install_signal_handler(file=output)
+    try:
+        # As if the signal arrived while the main thread records a timing.
+        with profiler._lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.05)
+            assert output.getvalue() == ""
+        time.sleep(0.05)
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
+
+    # Assert
+    assert json.loads(output.getvalue())["phase"]["count"] == 1
+
+def test_ai_care_profiling(ai_care: AICare):
+    # Setup
+    class SlowDetector(Detector):
+        def detect(self) -> bool:
+            time.sleep(0.02)
+            return False
+    ai_care.register_detector(SlowDetector(name="slow", annotation=""))
+    ai_care.register_sensor(name="sensor", function=lambda: 1, annotation="")
+    ai_care.register_to_llm_method(Mock(return_value="AA000101:"))
+    ai_care.set_config(key="delay", value=0.05)
+    assert ai_care.profile == {}
+
+    # Action
+    ai_care.enable_profiling()
+    ai_care.chat_update(chat_context=[])
+    ai_care.get_sensor_data("sensor")
+    ai_care.release_detector("slow")
+    time.sleep(0.15)
+
+    # Assert
+    profile = ai_care.profile
+    assert {
+        "chat_update",
+        "render_basic_prompt",
+        "parse_response",
+        "choice_execute",
+        "ability.stay_silent",
+        "sensor.sensor",
+        "detector.slow",
+    } <= set(profile)
+    assert profile["detector.slow"]["p50"] >= 0.015
+
+    # Action
+    ai_care.disable_profiling()
+
+    # Assert
+    assert ai_care.profile == {}
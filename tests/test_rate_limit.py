@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from ai_care import AICare
+from ai_care.abilities import Choice
+from ai_care.rate_limit import RateLimiter, RollingBudget, TokenBucket
+
+
+def _always_valid() -> bool:
+    return True
+
+def test_token_bucket():
+    # Setup
+    bucket = TokenBucket(calls_per_minute=60, burst=2)
+    now = time.monotonic()
+
+    # Action
+    bucket.take()
+    bucket.take()
+
+    # Assert
+    assert bucket.time_until_available(now) == pytest.approx(1, abs=0.05)
+    assert bucket.time_until_available(now + 1) == 0
+
+def test_rolling_budget():
+    # Setup
+    budget = RollingBudget(limit=10, window=60)
+
+    # Action
+    budget.spend(0, 4)
+    budget.spend(10, 4)
+
+    # Assert
+    assert budget.time_until_available(20, 2) == 0
+    assert budget.time_until_available(20, 5) == 40
+    assert budget.time_until_available(20, 11) == float("inf")
+    assert budget.time_until_available(60, 5) == 0
+    assert budget.spent == 4
+
+def test_rate_limiter_shared_bucket():
+    # Setup
+    global_bucket = TokenBucket(calls_per_minute=1, burst=2)
+    limiters = [RateLimiter(buckets=[TokenBucket(calls_per_minute=60), global_bucket], on_limit="drop") for _ in range(2)]
+
+    # Action
+    allowed = [limiter.acquire(0, _always_valid) for limiter in limiters + limiters]
+
+    # Assert
+    assert allowed == [True, True, False, False]
+    assert limiters[0].stats == {"allowed": 1, "deferred": 0, "local": 0, "dropped": 1}
+
+def test_rate_limiter_defer():
+    # Setup
+    limiter = RateLimiter(buckets=[TokenBucket(calls_per_minute=600, burst=1)], on_limit="defer", max_defer=1)
+
+    # Action
+    start_time = time.monotonic()
+    allowed = [limiter.acquire(0, _always_valid) for _ in range(2)]
+
+    # Assert
+    assert allowed == [True, True]
+    assert 0.05 < time.monotonic() - start_time < 0.5
+    assert limiter.stats["deferred"] == 1
+
+def test_ask_with_rate_limiter():
+    # Setup
+    ai_care = AICare()
+    mock_to_llm_method_calls = []
+    def to_llm_method(chat_context, messages):
+        mock_to_llm_method_calls.append(messages)
+        return "AA000101:"
+    ai_care.register_to_llm_method(to_llm_method)
+    rate_limiter = RateLimiter(
+        prompt_budget=RollingBudget(limit=10),
+        completion_budget=RollingBudget(limit=100),
+        on_limit="local",
+        local_choice=Choice.STAY_SILENT,
+    )
+    ai_care.register_rate_limiter(rate_limiter)
+
+    # Action
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "12345"}])
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "12345"}])
+
+    # Assert
+    assert len(mock_to_llm_method_calls) == 1
+    assert ai_care._choice_history[-1] == Choice.STAY_SILENT
+    assert rate_limiter.stats == {
+        "allowed": 1, "deferred": 0, "local": 1, "dropped": 0, "prompt_spent": 5, "completion_spent": 9,
+    }
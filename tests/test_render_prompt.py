@@ -4,7 +4,13 @@ from enum import Enum
 from unittest.mock import Mock, patch
 
 from ai_care import AICare
-from ai_care.render_prompt import _render_ability_description, render_basic_prompt
+from ai_care.render_prompt import (
+    _render_ability_description,
+    prompt_cache_key,
+    render_basic_prompt,
+    render_dynamic_facts,
+    render_prompt_prefix,
+)
 
 
 @pytest.fixture
@@ -94,3 +100,22 @@ def test_render_ability_description():
 def test_render_basic_prompt(ai_care: AICare):
     prompt = render_basic_prompt(ai_care)
     assert isinstance(prompt, str)
+
+def test_render_prompt_prefix_is_stable(ai_care: AICare):
+    # Setup
+    ai_care.set_guide("guide")
+    ai_care.chat_update(None)
+    prefix = render_prompt_prefix(ai_care)
+    facts = render_dynamic_facts(ai_care)
+
+    # Action
+    ai_care.chat_update(None)
+
+    # Assert
+    assert render_prompt_prefix(ai_care) == prefix
+    assert prompt_cache_key(render_prompt_prefix(ai_care)) == prompt_cache_key(prefix)
+    assert "guide" in prefix
+    assert "seconds since the last time the user spoke with you" not in prefix
+    assert "seconds since the last time the user spoke with you" in facts
+    assert render_dynamic_facts(ai_care) != facts
+    ai_care.reset()
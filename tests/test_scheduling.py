@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from ai_care import AICare
+from ai_care.scheduling import AskPriority, DeadlineExpired, LLMScheduler
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def _hold_slot(scheduler: LLMScheduler, release: threading.Event) -> threading.Thread:
+    thread = threading.Thread(
+        target=scheduler.run, args=(release.wait,), kwargs={"priority": 0, "deadline": time.monotonic() + 10}
+    )
+    thread.start()
+    while scheduler.stats.get(0, {}).get("requests", 0) == 0:
+        time.sleep(0.001)
+    return thread
+
+def test_scheduler_order():
+    # Setup
+    scheduler = LLMScheduler(max_concurrent=1)
+    release = threading.Event()
+    holder = _hold_slot(scheduler, release)
+    order = []
+    now = time.monotonic()
+    requests = [("routine", 0, now + 5), ("late_detector", 2, now + 9), ("early_detector", 2, now + 3)]
+    threads = []
+    for name, priority, deadline in requests:
+        thread = threading.Thread(
+            target=scheduler.run,
+            args=(lambda name=name: order.append(name),),
+            kwargs={"priority": priority, "deadline": deadline},
+        )
+        thread.start()
+        threads.append(thread)
+    while scheduler.queued < 3:
+        time.sleep(0.001)
+
+    # Action
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join()
+
+    # Assert
+    assert order == ["early_detector", "late_detector", "routine"]
+    assert scheduler.stats[2]["requests"] == 2
+
+def test_scheduler_drop_expired():
+    # Setup
+    scheduler = LLMScheduler(max_concurrent=1)
+    release = threading.Event()
+    holder = _hold_slot(scheduler, release)
+    function_called = []
+
+    # Action
+    with pytest.raises(DeadlineExpired):
+        scheduler.run(lambda: function_called.append(True), priority=1, deadline=time.monotonic() + 0.05)
+    release.set()
+    holder.join()
+
+    # Assert
+    assert not function_called
+    assert scheduler.stats[1]["dropped"] == 1
+    assert scheduler.queued == 0
+
+def test_ask_with_scheduler(ai_care: AICare):
+    # Setup
+    scheduler = LLMScheduler(max_concurrent=1, deadlines={AskPriority.ROUTINE: 0.05})
+    release = threading.Event()
+    holder = _hold_slot(scheduler, release)
+    ai_care.register_to_llm_method(lambda chat_context, messages: "AA000101:")
+    ai_care.register_llm_scheduler(scheduler, tenant_priority=10)
+
+    # Action
+    ai_care.ask(messages_list=[], _routine=True)
+    release.set()
+    holder.join()
+
+    # Assert
+    assert scheduler.stats[10]["dropped"] == 1
+
+    # Action
+    ai_care.ask(messages_list=[])
+
+    # Assert
+    assert scheduler.stats[12]["requests"] == 1
+    assert ai_care._choice_history[-1].name == "STAY_SILENT"
+
+def test_scheduler_holds_slot_for_stream(ai_care: AICare):
+    # Setup
+    scheduler = LLMScheduler(max_concurrent=1)
+    lock = threading.Lock()
+    open_streams = []
+    peak = []
+    def to_llm_method(chat_context, messages):
+        with lock:
+            open_streams.append(True)
+            peak.append(len(open_streams))
+        try:
+            yield "AA000202:"
+            time.sleep(0.05)
+            yield "Hello"
+        finally:
+            with lock:
+                open_streams.pop()
+    said = []
+    ai_care.register_to_llm_method(to_llm_method)
+    ai_care.register_to_user_method(lambda stream: said.append("".join(stream)))
+    ai_care.register_llm_scheduler(scheduler)
+
+    # Action
+    threads = [threading.Thread(target=ai_care.ask, kwargs={"messages_list": []}) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert said == ["Hello"] * 4
+    assert max(peak) == 1
+    assert scheduler.stats[AskPriority.DETECTOR]["latency_p50"] >= 0.04
+
+def test_scheduler_releases_unread_stream():
+    # Setup
+    scheduler = LLMScheduler(max_concurrent=1)
+    def stream():
+        yield "chunk"
+
+    # Action
+    response = scheduler.run(stream, priority=0, deadline=time.monotonic() + 1)
+    with pytest.raises(DeadlineExpired):
+        scheduler.run(lambda: "done", priority=0, deadline=time.monotonic() + 0.05)
+    del response
+
+    # Assert
+    assert scheduler.run(lambda: "done", priority=0, deadline=time.monotonic() + 0.05) == "done"
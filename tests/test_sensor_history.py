@@ -0,0 +1,38 @@
+import pytest
+
+from ai_care.sensor_history import SensorHistory
+
+
+def test_ring_buffer():
+    # Setup
+    history = SensorHistory(capacity=3)
+
+    # Action
+    for t in range(5):
+        history.append(float(t * 10), timestamp=float(t))
+
+    # Assert
+    assert len(history) == 3
+    assert history.readings() == [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)]
+    assert history.readings(window=1.5, now=4.0) == [(3.0, 30.0), (4.0, 40.0)]
+
+def test_aggregates():
+    # Setup
+    history = SensorHistory(capacity=8)
+    for t, value in [(0, 5.0), (1, 7.0), (2, 6.0), (3, 10.0)]:
+        history.append(value, timestamp=float(t))
+
+    # Action
+    aggregates = history.aggregates(now=4.0)
+    windowed = history.aggregates(window=1.5, now=4.0)
+
+    # Assert
+    assert aggregates is not None
+    assert aggregates["count"] == 4
+    assert aggregates["last"] == 10.0
+    assert aggregates["age"] == 1.0
+    assert aggregates["delta"] == 5.0
+    assert (aggregates["min"], aggregates["max"]) == (5.0, 10.0)
+    assert aggregates["slope"] == pytest.approx(1.4)
+    assert windowed == {"count": 1, "last": 10.0, "age": 1.0, "delta": 0.0, "min": 10.0, "max": 10.0, "slope": 0.0}
+    assert history.aggregates(window=0.5, now=4.0) is None
@@ -0,0 +1,54 @@
+from ai_care.sensor_payload import SensorSerializer
+
+
+def test_compact():
+    # Setup
+    serializer = SensorSerializer(max_bytes=None, float_digits=2, max_items=3, max_string_chars=5)
+
+    # Assert
+    assert serializer.compact(3.14159) == 3.14
+    assert serializer.compact("abcdefgh") == "abcd…"
+    assert serializer.compact(list(range(10))) == {"sample": [0, 4, 9], "total": 10}
+    assert serializer.compact({"b": 1.234, "a": [0.5], "c": None, "d": 4}) == {"a": [0.5], "b": 1.23, "c": None, "…": "1 more"}
+    assert serializer.compact(float("nan")) == "nan"
+
+def test_serialize_budgets():
+    # Setup
+    serializer = SensorSerializer(max_bytes=64, measure_input=True)
+    readings = {"log": ["line %d" % i for i in range(100)], "temperature": 21.123456, "raw": list(range(1000))}
+
+    # Action
+    text = serializer.serialize(
+        readings,
+        budgets={"raw": 40},
+        summarizers={"log": lambda lines: lines[-2:]},
+    )
+
+    # Assert
+    assert text == '{"log":["line 98","line 99"],"raw":{"sample":[0,333,666,999],"total":1000},"temperature":21.123}'
+    assert serializer.serialize(readings, budgets={"raw": 40}, summarizers={"log": lambda lines: lines[-2:]}) == text
+    stats = serializer.stats
+    assert stats["payloads"] == 2
+    assert stats["bytes_saved"] == stats["bytes_in"] - stats["bytes_out"] > 0
+
+def test_serialize_without_measuring_input():
+    # Setup
+    serializer = SensorSerializer()
+    readings = {"raw": list(range(1000))}
+
+    # Action
+    text = serializer.serialize(readings)
+
+    # Assert
+    assert serializer.stats == {"payloads": 1, "bytes_out": len(text.encode("utf-8"))}
+
+def test_serialize_fallback_to_text():
+    # Setup
+    serializer = SensorSerializer()
+
+    # Action
+    compacted = serializer.compact({"key": "a value that cannot fit"}, max_bytes=10)
+
+    # Assert
+    assert isinstance(compacted, str)
+    assert len(serializer.dumps(compacted).encode("utf-8")) <= 10
@@ -0,0 +1,133 @@
+import time
+from unittest.mock import Mock
+
+from ai_care import AICare, AICareSessions
+from ai_care.hibernation import FileSessionStore, SQLiteSessionStore
+
+
+def test_get_and_remove():
+    # Setup
+    factory = Mock(side_effect=lambda session_id: AICare())
+    sessions = AICareSessions(factory)
+
+    # Action
+    session = sessions.get("a")
+
+    # Assert
+    assert sessions.get("a") is session
+    assert factory.call_count == 1
+    assert "a" in sessions
+    assert list(sessions) == ["a"]
+
+    # Action
+    removed = sessions.remove("a")
+
+    # Assert
+    assert removed is session
+    assert "a" not in sessions
+    assert len(sessions) == 0
+
+def test_chat_update_many():
+    # Setup
+    sessions = AICareSessions(lambda session_id: AICare())
+    now = time.time()
+    events = [
+        ("a", ["a1"], now - 2),
+        ("b", ["b1"], now - 1),
+        ("a", ["a2"], now - 1),
+        ("a", ["a3"], now),
+    ]
+
+    # Action
+    sessions.chat_update_many(events)
+
+    # Assert
+    session_a = sessions.get("a")
+    session_b = sessions.get("b")
+    assert session_a.chat_context == ["a3"]
+    assert len(session_a._chat_intervals) == 2
+    assert session_a._task_num == 2
+    assert session_b.chat_context == ["b1"]
+    assert session_b._chat_intervals == []
+    for session_id in list(sessions):
+        sessions.remove(session_id)
+
+def test_hibernation(tmp_path):
+    # Setup
+    factory = Mock(side_effect=lambda session_id: AICare())
+    sessions = AICareSessions(factory)
+    sessions.register_hibernation(FileSessionStore(tmp_path), idle_timeout=0)
+    session = sessions.get("a/1")
+    session._chat_intervals = [1.0, 2.0]
+    session._last_chat_time = time.monotonic() - 10
+    session.chat_context = ["hello"]
+
+    # Action
+    hibernated = sessions.hibernate_idle()
+
+    # Assert
+    assert hibernated == 1
+    assert "a/1" not in sessions
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Action
+    rehydrated = sessions.get("a/1")
+
+    # Assert
+    assert rehydrated is not session
+    assert factory.call_count == 2
+    assert rehydrated.chat_context == ["hello"]
+    assert rehydrated._chat_intervals == [1.0, 2.0]
+    assert 10 <= time.monotonic() - rehydrated._last_chat_time < 11
+    assert sessions.stats == {"resident": 1, "hibernated": 1, "rehydrated": 1}
+    assert list(tmp_path.iterdir()) == []
+
+def test_hibernation_skips_busy_sessions(tmp_path):
+    # Setup
+    sessions = AICareSessions(lambda session_id: AICare())
+    store = SQLiteSessionStore(tmp_path / "sessions.sqlite3")
+    sessions.register_hibernation(store, idle_timeout=0.05)
+    busy_session = sessions.get("busy")
+    sessions.get("idle")
+    busy_session.set_timer(interval=10, function=lambda: None)
+
+    # Action
+    hibernated_early = sessions.hibernate_idle()
+    time.sleep(0.1)
+    hibernated = sessions.hibernate_idle()
+
+    # Assert
+    assert hibernated_early == 0
+    assert hibernated == 1
+    assert list(sessions) == ["busy"]
+    assert "idle" in store
+    busy_session.reset()
+    store.close()
+
+def test_hibernation_skips_asking_sessions(tmp_path):
+    # Setup
+    said = []
+    def create_session(session_id):
+        ai_care = AICare()
+        def to_llm_method(chat_context, to_llm_messages):
+            time.sleep(0.3)
+            return 'AA000303:{"delay": 0, "message": "hi"}'
+        ai_care.register_to_llm_method(to_llm_method)
+        ai_care.register_to_user_method(said.append)
+        ai_care.set_config("delay", 0.05)
+        return ai_care
+    sessions = AICareSessions(create_session)
+    sessions.register_hibernation(FileSessionStore(tmp_path), idle_timeout=0.05)
+    session = sessions.get("a")
+    session.chat_update(chat_context=[])
+
+    # Action
+    time.sleep(0.15)
+    hibernated_during_ask = sessions.hibernate_idle()
+    time.sleep(0.4)
+
+    # Assert
+    assert hibernated_during_ask == 0
+    assert said == ["hi"]
+    assert sessions.get("a") is session
+    assert session.idle
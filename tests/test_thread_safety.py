@@ -0,0 +1,131 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare
+from ai_care.abilities import Choice
+from ai_care.ai_care import AICareThread
+
+
+N_THREADS = 8
+N_OPERATIONS = 200
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def run_concurrently(target) -> None:
+    barrier = threading.Barrier(N_THREADS)
+    def worker():
+        barrier.wait()
+        for _ in range(N_OPERATIONS):
+            target()
+    threads = [threading.Thread(target=worker) for _ in range(N_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_chat_update(ai_care: AICare):
+    # Setup
+    ai_care.set_config(key="delay", value=100)
+    ai_care.ask = Mock()
+    initial_task_num = ai_care._task_num
+
+    # Action
+    run_concurrently(lambda: ai_care.chat_update(chat_context=[]))
+
+    # Assert
+    assert ai_care._task_num == initial_task_num + N_THREADS * N_OPERATIONS
+    assert ai_care._ask_timer._task_num == ai_care._task_num
+    assert len(ai_care._chat_intervals) == ai_care._config["n_chat_intervals"]
+    assert not ai_care.ask.called
+
+def test_concurrent_chat_update_context(ai_care: AICare):
+    # Setup
+    ai_care.set_config(key="delay", value=100)
+    ai_care.ask = Mock()
+    local = threading.local()
+    chat_contexts = {}
+    cancel_current_task = ai_care.cancel_current_task
+    def cancel_current_task_recorded():
+        task_num = cancel_current_task()
+        chat_contexts[task_num] = local.chat_context
+        return task_num
+    ai_care.cancel_current_task = cancel_current_task_recorded
+    def update():
+        local.chat_context = [object()]
+        ai_care.chat_update(chat_context=local.chat_context)
+
+    # Action
+    run_concurrently(update)
+
+    # Assert
+    assert ai_care.chat_context is chat_contexts[ai_care._task_num]
+
+def test_concurrent_stale_ask_context(ai_care: AICare):
+    # Setup
+    ai_care.set_config(key="delay", value=100)
+    ai_care.ask = Mock()
+    stop = threading.Event()
+    extended = []
+    def stale_ask():
+        while not stop.is_set():
+            extended.append(ai_care._extend_ask_context([{"role": "ai_care", "content": "stale"}]))
+        extended.append(ai_care._extend_ask_context([{"role": "ai_care", "content": "stale"}]))
+    stale_thread = AICareThread(target=stale_ask)
+    stale_thread._task_num = ai_care._task_num + 1
+    stale_thread.start()
+
+    # Action
+    run_concurrently(lambda: ai_care.chat_update(chat_context=[]))
+    stop.set()
+    stale_thread.join()
+
+    # Assert
+    assert ai_care._ask_context == []
+    assert extended[-1] is False
+
+def test_concurrent_timers(ai_care: AICare):
+    # Setup
+    def set_and_clear():
+        ai_care.set_timer(interval=100, function=Mock())
+        ai_care.set_timer(interval=100, function=Mock(), preserve=True)
+        ai_care.cancel_current_task()
+        ai_care.clear_timer(clear_preserved=False)
+
+    # Action
+    run_concurrently(set_and_clear)
+
+    # Assert
+    ai_care.clear_timer(clear_preserved=False)
+    assert len(ai_care.timers) == N_THREADS * N_OPERATIONS
+    assert all(timer._preserve_ for timer in ai_care.timers.values())
+    assert sum(len(bucket) for bucket in ai_care.timers._buckets[True].values()) == len(ai_care.timers)
+    assert ai_care.timers._buckets[False] == {}
+
+def test_concurrent_ask_context(ai_care: AICare):
+    # Action
+    run_concurrently(lambda: ai_care._extend_ask_context([{"role": "ai_care", "content": ""}] * 2))
+
+    # Assert
+    assert len(ai_care._ask_context) == 2 * N_THREADS * N_OPERATIONS
+
+def test_concurrent_choice_history(ai_care: AICare):
+    # Setup
+    choice_history = ai_care._choice_history
+    def append():
+        choice_history.append(Choice.STAY_SILENT, "pre_decision")
+        choice_history.append(Choice.SPEAK_NOW, "llm")
+
+    # Action
+    run_concurrently(append)
+
+    # Assert
+    assert len(choice_history) == choice_history.maxlen
+    assert all(choice == Choice.SPEAK_NOW for choice in choice_history.from_source("llm"))
+    assert all(choice == Choice.STAY_SILENT for choice in choice_history.from_source("pre_decision"))
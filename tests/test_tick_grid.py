@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from ai_care import AICare, AICareSessions, Detector, TickGrid
+
+
+class MockDetector(Detector):
+
+    def __init__(self, name: str, annotation: str, releases: list) -> None:
+        super().__init__(name=name, annotation=annotation)
+        self.releases = releases
+
+    def detect(self) -> bool:
+        self.releases.append((self.ai_care, time.monotonic()))
+        return False
+
+
+def repeat(interval: float, times: int):
+    for _ in range(times):
+        yield interval
+
+def test_tick_for():
+    # Setup
+    tick_grid = TickGrid(tolerance=0.5)
+
+    # Assert
+    assert tick_grid.tick_for(10.0) == 10.0
+    assert tick_grid.tick_for(10.1) == 10.5
+    with pytest.raises(ValueError):
+        TickGrid(tolerance=0)
+
+def test_cyclic_detection_on_tick_grid():
+    # Setup
+    tick_grid = TickGrid(tolerance=0.3)
+    sessions = AICareSessions(lambda session_id: AICare())
+    sessions.register_tick_grid(tick_grid)
+    releases: list = []
+    for session_id in ["a", "b", "c"]:
+        sessions.get(session_id).register_detector(MockDetector("detector", "A mock detector.", releases))
+
+    # Action
+    # Start just after a tick, so that the detections are due at different times within the same tick.
+    time.sleep(tick_grid.tick_for(time.monotonic()) - time.monotonic() + 0.01)
+    for i, session_id in enumerate(["a", "b", "c"]):
+        sessions.get(session_id).set_cyclic_detection(["detector"], repeat(0.3 + 0.01 * i, 2))
+    time.sleep(1.2)
+
+    # Assert
+    assert len(releases) == 6
+    assert tick_grid.stats == {"wakeups": 2, "fired": 6, "pending": 0}
+    release_times = sorted(release_time for _, release_time in releases)
+    assert release_times[2] - release_times[0] < 0.05
+    assert release_times[5] - release_times[3] < 0.05
+    assert all(sessions.get(session_id).idle for session_id in ["a", "b", "c"])
+
+def test_tick_grid_cancel():
+    # Setup
+    tick_grid = TickGrid(tolerance=0.1)
+    ai_care = AICare()
+    ai_care.register_tick_grid(tick_grid)
+    releases: list = []
+    ai_care.register_detector(MockDetector("detector", "A mock detector.", releases))
+
+    # Action
+    ai_care.set_cyclic_detection(["detector"], repeat(0.1, 3))
+    ai_care.clear_timer(clear_preserved=False)
+    time.sleep(0.3)
+
+    # Assert
+    assert releases == []
+    assert ai_care.idle
+    assert tick_grid.stats["fired"] == 0
+
+def test_tick_grid_task_num():
+    # Setup
+    tick_grid = TickGrid(tolerance=0.05)
+    task_nums = []
+    event = threading.Event()
+    def function():
+        task_nums.append(threading.current_thread()._task_num)
+        event.set()
+
+    # Action
+    tick_grid.schedule(0, function, task_num=7)
+    event.wait(1)
+
+    # Assert
+    assert task_nums == [7]
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from ai_care import AICare
+from ai_care.timer_queue import TimerQueue
+
+
+def test_timer_queue_order():
+    # Setup
+    timer_queue = TimerQueue()
+    fired = []
+    done = threading.Event()
+
+    # Action
+    timer_queue.schedule(0.1, lambda: (fired.append("b"), done.set()), task_num=1)
+    timer_queue.schedule(0.05, lambda: fired.append("a"), task_num=1)
+    cancelled = timer_queue.schedule(0.05, lambda: fired.append("cancelled"), task_num=1)
+    cancelled.cancel()
+    done.wait(1)
+
+    # Assert
+    assert fired == ["a", "b"]
+    assert timer_queue.stats["pending"] == 0
+
+def test_timer_queue_compaction():
+    # Setup
+    timer_queue = TimerQueue()
+    timers = [timer_queue.schedule(60, lambda: None, task_num=1) for _ in range(100)]
+
+    # Action
+    for timer in timers[:70]:
+        timer.cancel()
+
+    # Assert
+    # Compacted once 64 of the timers were cancelled.
+    assert len(timer_queue._heap) == 100 - 64
+    assert timer_queue.stats["pending"] == 30
+    for timer in timers[70:]:
+        timer.cancel()
+
+def test_set_timer_without_thread():
+    # Setup
+    ai_care = AICare()
+    called = threading.Event()
+    threads_before = threading.active_count()
+
+    # Action
+    for _ in range(20):
+        ai_care.set_timer(interval=60, function=lambda: None)
+    ai_care.set_timer(interval=0.05, function=called.set)
+
+    # Assert
+    assert threading.active_count() <= threads_before + 1
+    assert called.wait(1)
+    time.sleep(0.05)
+    assert len(ai_care.timers) == 20
+    ai_care.clear_timer()
+    assert ai_care.idle
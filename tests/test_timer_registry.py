@@ -0,0 +1,70 @@
+from unittest.mock import Mock
+
+from ai_care.timer_registry import TimerRegistry
+
+
+def make_timer(task_num: int, preserve: bool = False) -> Mock:
+    timer = Mock()
+    timer._task_num = task_num
+    timer._preserve_ = preserve
+    return timer
+
+def test_add_and_pop():
+    # Setup
+    registry = TimerRegistry()
+    timer1 = make_timer(1)
+    timer2 = make_timer(1)
+
+    # Action
+    registry.add(1, timer1)
+    registry.add(2, timer2)
+
+    # Assert
+    assert 1 in registry
+    assert len(registry) == 2
+    assert registry == {1: timer1, 2: timer2}
+
+    # Action
+    popped = registry.pop(1)
+
+    # Assert
+    assert popped is timer1
+    assert registry.pop(1) is None
+    assert registry == {2: timer2}
+    assert registry._task_nums[False] == [1]
+
+    # Action
+    registry.pop(2)
+
+    # Assert
+    assert registry == {}
+    assert registry._task_nums[False] == []
+    assert registry._buckets[False] == {}
+
+def test_pop_up_to():
+    # Setup
+    registry = TimerRegistry()
+    timers = {
+        1: make_timer(3),
+        2: make_timer(1),
+        3: make_timer(2, preserve=True),
+        4: make_timer(5),
+        5: make_timer(1, preserve=True),
+    }
+    for timer_id, timer in timers.items():
+        registry.add(timer_id, timer)
+
+    # Action
+    removed = registry.pop_up_to(3, include_preserved=False)
+
+    # Assert
+    assert sorted(removed, key=id) == sorted([timers[1], timers[2]], key=id)
+    assert set(registry) == {3, 4, 5}
+
+    # Action
+    removed = registry.pop_up_to(4, include_preserved=True)
+
+    # Assert
+    assert sorted(removed, key=id) == sorted([timers[3], timers[5]], key=id)
+    assert set(registry) == {4}
+    assert registry._task_nums == {False: [5], True: []}
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from ai_care import AICare
+from ai_care.abilities import Choice
+from ai_care.render_prompt import render_prompt_prefix
+from ai_care.tool_calling import parse_tool_call, render_ability_tools
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    ai_care.register_to_user_method(lambda message: None)
+    return ai_care
+
+def test_render_ability_tools(ai_care: AICare):
+    # Action
+    tools = render_ability_tools(ai_care)
+
+    # Assert
+    assert [tool["name"] for tool in tools] == [
+        "stay_silent",
+        "speak_now",
+        "speak_after",
+        "detect_env",
+        "release_detector",
+        "ask_later",
+        "cyclic_detection",
+    ]
+    tools_by_name = {tool["name"]: tool for tool in tools}
+    assert tools_by_name["stay_silent"]["parameters"] == {"type": "object", "properties": {}, "required": []}
+    detect_env = tools_by_name["detect_env"]["parameters"]
+    assert list(detect_env["properties"]) == ["delay", "sensors"]
+    assert detect_env["properties"]["delay"]["type"] == "number"
+    assert detect_env["properties"]["sensors"]["type"] == "array"
+    assert detect_env["required"] == ["delay", "sensors"]
+    # The depth is filled in by AICare.
+    assert "_depth_left" not in detect_env["properties"]
+
+def test_render_ability_tools_inactive(ai_care: AICare):
+    # Setup
+    ai_care._ask_later_count_left = 0
+
+    # Action
+    tools = render_ability_tools(ai_care, inactive_abilities_list=[Choice.CYCLIC_DETECTION])
+
+    # Assert
+    names = [tool["name"] for tool in tools]
+    assert "ask_later" not in names
+    assert "cyclic_detection" not in names
+
+def test_parse_tool_call(ai_care: AICare):
+    # Assert
+    assert parse_tool_call(ai_care, {"name": "stay_silent", "arguments": {}}) == ("01", "")
+    assert parse_tool_call(ai_care, {"name": "speak_now", "arguments": {"content": "Hi"}}) == ("02", "Hi")
+    assert parse_tool_call(ai_care, {"name": "speak_after", "arguments": '{"delay": 1, "message": "Hi"}'}) == (
+        "03",
+        {"delay": 1, "message": "Hi"},
+    )
+    assert parse_tool_call(ai_care, {"name": "fly", "arguments": {}}) == ("00", "")
+    assert (ai_care._valid_msg_count, ai_care._invalid_msg_count) == (3, 1)
+
+def test_tool_calling_llm_method(ai_care: AICare):
+    # Setup
+    received = {}
+    def tool_calling_llm_method(chat_context, messages, tools):
+        received["messages"] = messages
+        received["tools"] = tools
+        return {"name": "speak_after", "arguments": {"delay": 0.1, "message": "Hello"}}
+    said = []
+    ai_care.register_to_user_method(said.append)
+    ai_care.register_tool_calling_llm_method(tool_calling_llm_method)
+
+    # Action
+    ai_care.ask(messages_list=[{"role": "ai_care", "content": "test"}])
+    time.sleep(0.3)
+
+    # Assert
+    assert said == ["Hello"]
+    assert received["tools"] == render_ability_tools(ai_care)
+    assert ai_care._ask_context[-1] == {
+        "role": "assistant",
+        "content": '{"name": "speak_after", "arguments": {"delay": 0.1, "message": "Hello"}}',
+    }
+
+def test_tool_calling_missing_parameter(ai_care: AICare):
+    # Setup
+    responses = [
+        {"name": "speak_after", "arguments": {"delay": 1}},
+        {"name": "stay_silent", "arguments": {}},
+    ]
+    requests = []
+    def tool_calling_llm_method(chat_context, messages, tools):
+        requests.append(list(messages))
+        return responses[len(requests) - 1]
+    ai_care.register_tool_calling_llm_method(tool_calling_llm_method)
+    ai_care.set_config("ask_depth", 2)
+
+    # Action
+    ai_care.ask(messages_list=[])
+
+    # Assert
+    assert len(requests) == 2
+    assert "You did not provide the following parameters: {'message'}" in requests[1][-1]["content"]
+
+def test_tool_calling_prompt(ai_care: AICare):
+    # Setup
+    text_prefix = render_prompt_prefix(ai_care)
+    ai_care.register_tool_calling_llm_method(lambda chat_context, messages, tools: {"name": "stay_silent"})
+
+    # Action
+    tool_prefix = render_prompt_prefix(ai_care)
+
+    # Assert
+    assert "RESPONSE RULES" in text_prefix
+    assert "RESPONSE RULES" not in tool_prefix
+    assert "AA00" not in tool_prefix
+    assert len(tool_prefix) < len(text_prefix) / 2
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare
+from ai_care.tracing import InMemorySpanExporter, JsonlFileSpanExporter, Tracer
+
+
+@pytest.fixture
+def ai_care():
+    ai_care = AICare()
+    yield ai_care
+    ai_care.clear_timer(clear_preserved=True, default_task_num_authority_external="Highest")
+
+def test_span_tree():
+    # Setup
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, session_id="session")
+
+    # Action
+    with tracer.span("root", task_num=1):
+        with tracer.span("child", task_num=1, key="value"):
+            pass
+    def other_thread():
+        with tracer.span("hop", task_num=1):
+            pass
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+    with tracer.span("other task", task_num=2):
+        pass
+
+    # Assert
+    spans = {span.name: span for span in exporter.spans}
+    assert spans["root"].parent_id is None
+    assert spans["root"].trace_id == "session:1"
+    assert spans["child"].parent_id == spans["root"].span_id
+    assert spans["child"].attributes == {"key": "value"}
+    assert spans["hop"].parent_id == spans["root"].span_id
+    assert spans["other task"].parent_id is None
+    assert spans["other task"].trace_id == "session:2"
+    assert all(span.duration is not None and span.duration >= 0 for span in exporter.spans)
+
+def test_record_span():
+    # Setup
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+
+    # Action
+    tracer.record_span("delay", task_num=1, start_time=time.monotonic() - 1)
+
+    # Assert
+    assert exporter.spans[0].duration == pytest.approx(1, abs=0.05)
+
+def test_jsonl_file_span_exporter(tmp_path):
+    # Setup
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(JsonlFileSpanExporter(path), session_id="session")
+
+    # Action
+    with tracer.span("span1", task_num=1):
+        pass
+    with tracer.span("span2", task_num=1):
+        pass
+
+    # Assert
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["span1", "span2"]
+    assert lines[1]["parent_id"] == lines[0]["span_id"]
+
+def test_trace_decision_cycle(ai_care: AICare):
+    # Setup
+    exporter = InMemorySpanExporter()
+    ai_care.register_tracer(Tracer(exporter))
+    ai_care.register_to_llm_method(Mock(return_value=(x for x in ["AA00", "0202:", "hi"])))
+    ai_care.register_to_user_method(lambda message: "".join(message))
+    ai_care.set_config(key="delay", value=0.1)
+
+    # Action
+    ai_care.chat_update(chat_context=[])
+    time.sleep(0.2)
+
+    # Assert
+    spans = {span.name: span for span in exporter.spans}
+    assert {"decision_cycle", "timer_delay", "render_basic_prompt", "ask", "to_llm_method", "parse_response", "choice_execute"} <= set(spans)
+    assert len({span.trace_id for span in exporter.spans}) == 1
+    root = spans["decision_cycle"]
+    assert root.parent_id is None
+    assert spans["ask"].parent_id == root.span_id
+    assert spans["to_llm_method"].parent_id == spans["ask"].span_id
+    assert spans["to_llm_method"].events[0][0] == "first_chunk"
+    assert spans["timer_delay"].duration == pytest.approx(0.1, abs=0.05)
@@ -0,0 +1,73 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ai_care import AICare, AICareSessions
+from ai_care.vectorized import SECONDS_SINCE_LAST_CHAT, BatchDetector, BatchDetectorRunner
+
+np = pytest.importorskip("numpy")
+
+
+class IdleHotDetector(BatchDetector):
+    def __init__(self) -> None:
+        super().__init__(name="idle_hot", sensors=["temperature"])
+
+    def condition(self, inputs):
+        return (inputs[SECONDS_SINCE_LAST_CHAT] > 60) & (inputs["temperature"] > 30)
+
+    def messages(self, session_id, values):
+        return [{"role": "ai_care", "content": f"It is {values['temperature']} degrees."}]
+
+
+def test_batch_detector():
+    # Setup
+    sessions = AICareSessions(lambda session_id: AICare())
+    readings = {"a": (120, 35), "b": (10, 35), "c": (120, 20), "d": (120, None)}
+    for session_id, (seconds_since_last_chat, temperature) in readings.items():
+        ai_care = sessions.get(session_id)
+        ai_care._last_chat_time = time.monotonic() - seconds_since_last_chat
+        if temperature is not None:
+            ai_care.register_sensor("temperature", lambda temperature=temperature: temperature, "Temperature.")
+        ai_care.trigger = Mock()
+    runner = BatchDetectorRunner(sessions)
+    runner.register_detector(IdleHotDetector())
+
+    # Action
+    triggered = runner.evaluate()
+    time.sleep(0.05)
+
+    # Assert
+    assert triggered == {"idle_hot": ["a"]}
+    sessions.get("a").trigger.assert_called_once_with(messages_list=[{"role": "ai_care", "content": "It is 35.0 degrees."}])
+    assert not sessions.get("b").trigger.called
+    assert runner.stats == {"evaluations": 1, "triggers": 1}
+
+def test_batch_detector_runner_survives_failures():
+    # Setup
+    sessions = AICareSessions(lambda session_id: AICare())
+    ai_care = sessions.get("a")
+    ai_care._last_chat_time = time.monotonic() - 120
+    ai_care.register_sensor("temperature", lambda: "hot", "Temperature.")
+    ai_care.trigger = Mock()
+    detector = IdleHotDetector()
+    calls = []
+    def condition(inputs):
+        calls.append(inputs)
+        if len(calls) == 1:
+            raise RuntimeError("The first evaluation fails.")
+        return IdleHotDetector.condition(detector, inputs)
+    detector.condition = condition
+    runner = BatchDetectorRunner(sessions)
+    runner.register_detector(detector)
+
+    # Action
+    inputs = runner._gather(sessions.items(), {"temperature"})
+    runner.start(interval=0.05)
+    time.sleep(0.3)
+    runner.stop()
+
+    # Assert
+    assert np.isnan(inputs["temperature"][0])
+    assert runner.stats["evaluations"] >= 2
+    assert not ai_care.trigger.called